@@ -22,6 +22,11 @@ sys.path.insert(0, PROJECT_ROOT)
 KNOWLEDGE_BASE_DIR = os.path.join(PROJECT_ROOT, 'knowledge_base')
 sys.path.insert(0, KNOWLEDGE_BASE_DIR)
 
+# 意图分类引擎、聊天导出读取与智能客服共用（smart_customer_agent/src/intent、src/data_processing）
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+from src.intent.classifier import IntentClassifier
+
 # 问题分类关键词
 CATEGORY_KEYWORDS = {
     '产品咨询类': {
@@ -50,7 +55,8 @@ def load_data(file_path):
     """Load data from Excel file."""
     print(f"Loading data from file: {file_path}")
     try:
-        df = pd.read_excel(file_path)
+        # 源文件内容不变时直接读列式缓存，首次读取时分块解析并写入缓存
+        df = load_export(file_path)
         print(f"Successfully loaded {len(df)} records from {file_path}")
         return df
     except Exception as e:
@@ -65,35 +71,25 @@ def preprocess_text(text):
     text = str(text).lower().strip()
     return text
 
+# 问题分类规则，按优先级排列
+QUESTION_CATEGORY_RULES = [
+    ("产品咨询类", ['价格', '多少钱', '型号', '什么型号', '产品', '功能', '参数', '配置',
+                   '支持', '兼容', '新品', '上市', '什么时候']),
+    ("服务支持类", ['如何使用', '怎么用', '使用方法', '操作步骤', '流程', '服务', '维修',
+                   '售后', '保修', '质保', '退货', '换货', '物流', '快递', '运费',
+                   '上门', '预约', '安装', '人工', '客服']),
+    ("技术问题类", ['不能开机', '黑屏', '无法充电', '没反应', '蓝屏', '死机', '卡顿',
+                   '闪退', '无信号', '连不上', '无法连接', '升级', '更新', '系统',
+                   '软件', '应用', '程序', '设置', '清除', '格式化', '重置']),
+    ("业务咨询类", ['合作', '招商', '加盟', '代理', '批发', '采购', '企业', '公司',
+                   '资质', '执照', '证书', '认证']),
+]
+
+question_classifier = IntentClassifier.from_keywords(QUESTION_CATEGORY_RULES, default="其他类",
+                                                     preprocess=preprocess_text)
+
 def categorize_question(question):
-    # 定义关键词列表
-    product_keywords = ['价格', '多少钱', '型号', '什么型号', '产品', '功能', '参数', '配置', 
-                        '支持', '兼容', '新品', '上市', '什么时候']
-    
-    service_keywords = ['如何使用', '怎么用', '使用方法', '操作步骤', '流程', '服务', '维修', 
-                       '售后', '保修', '质保', '退货', '换货', '物流', '快递', '运费', 
-                       '上门', '预约', '安装', '人工', '客服']
-    
-    technical_keywords = ['不能开机', '黑屏', '无法充电', '没反应', '蓝屏', '死机', '卡顿', 
-                         '闪退', '无信号', '连不上', '无法连接', '升级', '更新', '系统', 
-                         '软件', '应用', '程序', '设置', '清除', '格式化', '重置']
-    
-    business_keywords = ['合作', '招商', '加盟', '代理', '批发', '采购', '企业', '公司', 
-                        '资质', '执照', '证书', '认证']
-    
-    # 检查关键词匹配
-    question = preprocess_text(question)
-    
-    if any(keyword in question for keyword in product_keywords):
-        return "产品咨询类"
-    elif any(keyword in question for keyword in service_keywords):
-        return "服务支持类"
-    elif any(keyword in question for keyword in technical_keywords):
-        return "技术问题类"
-    elif any(keyword in question for keyword in business_keywords):
-        return "业务咨询类"
-    else:
-        return "其他类"
+    return question_classifier.classify(question)
 
 def basic_analysis(df):
     """进行基础数据分析"""
@@ -144,7 +140,7 @@ def analyze_questions(df):
         results.append(f"{i}. \"{question}\" - {count} occurrences")
     
     # Categorize each question
-    categories = user_df['send_content'].dropna().apply(categorize_question)
+    categories = question_classifier.classify_many(user_df['send_content'].dropna())
     category_counts = Counter(categories)
     
     # Display category distribution
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -21,6 +22,10 @@ plt.rcParams['axes.unicode_minus'] = False    # 解决保存图像时负号'-'
 # 获取项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 # 停用词集合
 STOPWORDS = set(['的', '了', '是', '在', '我', '有', '和', '就', '不', '人', '都', 
                 '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', 
@@ -40,7 +45,7 @@ def load_data():
     """加载Excel数据"""
     try:
         file_path = os.path.join(PROJECT_ROOT, "data", "merged_chat_records.xlsx")
-        df = pd.read_excel(file_path)
+        df = load_export(file_path)
         return df
     except Exception as e:
         print(f"加载数据失败: {e}")
@@ -9,6 +9,7 @@ from collections import Counter
 import jieba
 import jieba.analyse
 import os
+import sys
 import re
 import json
 from datetime import datetime
@@ -16,14 +17,18 @@ from datetime import datetime
 # 设置项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 # 设置jieba分词的停用词
 STOP_WORDS = set(['的', '了', '是', '我', '你', '他', '她', '它', '这', '那', '啊', '呢', '吗', '吧', '，', '。', '？', '！', '：', '；', '、'])
 
-def load_data(file_path):
-    """加载Excel文件数据"""
+def load_data(file_path, columns=None):
+    """加载Excel文件数据，columns为只读取的列"""
     try:
         print(f"Loading data from {file_path}...")
-        df = pd.read_excel(file_path)
+        df = load_export(file_path, columns=columns)
         print(f"Successfully loaded {len(df)} records.")
         return df
     except Exception as e:
@@ -462,7 +467,7 @@ def main():
     file_path = os.path.join(PROJECT_ROOT, "data", "merged_chat_records.xlsx")
     
     # 加载数据
-    df = load_data(file_path)
+    df = load_data(file_path, columns=['touch_id', 'seq_no', 'sender_type', 'send_content'])
     if df is None:
         return
     
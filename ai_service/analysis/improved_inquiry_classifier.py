@@ -5,6 +5,7 @@ import pandas as pd
 import numpy as np
 import os
 import re
+import sys
 from collections import Counter, defaultdict
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -12,6 +13,12 @@ import seaborn as sns
 # 设置项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 意图分类引擎与智能客服API共用（smart_customer_agent/src/intent）
+# 聊天导出读取同样共用（src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+from src.intent.classifier import IntentClassifier
+
 # 分类体系定义
 CLASSIFICATION_SYSTEM = {
     "订单与物流类": {
@@ -84,36 +91,45 @@ def preprocess_text(text):
     text = text.lower()
     return text
 
+def build_query_classifiers(classification_system):
+    """把分类体系编译为 (问候语分类器, 一级分类器, {一级分类: 二级分类器})"""
+    greeting_classifier = IntentClassifier.from_keywords(
+        [("问候语", classification_system["问候语"]["keywords"])])
+    category_classifier = IntentClassifier.from_keywords(
+        [(category, info["keywords"]) for category, info in classification_system.items()
+         if category not in ["问候语", "其他"]])
+    subcategory_classifiers = {
+        category: IntentClassifier.from_keywords(list(info["subcategories"].items()), default=f"{category}-其他")
+        for category, info in classification_system.items()
+    }
+    return greeting_classifier, category_classifier, subcategory_classifiers
+
+QUERY_CLASSIFIERS = build_query_classifiers(CLASSIFICATION_SYSTEM)
+
 def categorize_query(text, classification_system=CLASSIFICATION_SYSTEM):
     """对用户问题进行多层次分类"""
+    if classification_system is CLASSIFICATION_SYSTEM:
+        greeting_classifier, category_classifier, subcategory_classifiers = QUERY_CLASSIFIERS
+    else:
+        greeting_classifier, category_classifier, subcategory_classifiers = build_query_classifiers(classification_system)
+    
     text = preprocess_text(text)
     if not text:
         return "其他", "未分类"
     
-    # 检查问候语
-    if any(greeting in text for greeting in classification_system["问候语"]["keywords"]):
-        if len(text) < 10 and not any(keyword in text for category in ["订单与物流类", "产品咨询类", "售后服务类", "账户管理类", "服务咨询类"] 
-                               for keyword in classification_system[category]["keywords"]):
-            return "问候语", "问候语"
-    
     # 一级分类匹配
-    for category, info in classification_system.items():
-        if category in ["问候语", "其他"]:
-            continue
-            
-        for keyword in info["keywords"]:
-            if keyword in text:
-                # 进行二级分类匹配
-                for subcategory, subkeywords in info["subcategories"].items():
-                    for subkeyword in subkeywords:
-                        if subkeyword in text:
-                            return category, subcategory
-                
-                # 若未匹配到二级分类，返回默认二级分类
-                return category, f"{category}-其他"
+    category = category_classifier.classify(text)
+    
+    # 检查问候语：短文本且不含任何业务关键词
+    if category is None and len(text) < 10 and greeting_classifier.classify(text):
+        return "问候语", "问候语"
     
     # 未匹配到任何分类
-    return "其他", "未分类"
+    if category is None:
+        return "其他", "未分类"
+    
+    # 二级分类匹配，未匹配到时返回默认二级分类
+    return category, subcategory_classifiers[category].classify(text)
 
 def analyze_conversation_context(df):
     """通过对话上下文改进分类"""
@@ -233,7 +249,8 @@ def main():
     try:
         # 设置较大的样本量
         sample_size = 100000
-        df = pd.read_excel(file_path, nrows=sample_size)
+        df = load_export(file_path, columns=['touch_id', 'group_name', 'seq_no', 'sender_type', 'send_content'],
+                         nrows=sample_size)
         print(f"成功加载数据，共 {len(df)} 行")
         
         # 分析对话上下文，改进分类
@@ -4,6 +4,7 @@ from collections import Counter
 import jieba
 import jieba.analyse
 import os
+import sys
 import re
 import json
 import time
@@ -18,6 +19,10 @@ from sklearn.decomposition import IncrementalPCA
 # 设置项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 # 设置jieba分词的停用词
 STOP_WORDS = set(['的', '了', '是', '我', '你', '他', '她', '它', '这', '那', '啊', '呢', '吗', '吧', '，', '。', '？', '！', '：', '；', '、'])
 
@@ -26,7 +31,7 @@ def load_data(file_path):
     try:
         print(f"Loading data from {file_path}...")
         start_time = time.time()
-        df = pd.read_excel(file_path)
+        df = load_export(file_path)
         elapsed_time = time.time() - start_time
         print(f"Successfully loaded {len(df)} records in {elapsed_time:.2f} seconds.")
         return df
@@ -4,6 +4,7 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import re
 from datetime import datetime
 from collections import Counter
@@ -11,13 +12,17 @@ from collections import Counter
 # 设置项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 def analyze_sample(sample_size):
     """分析指定样本量的数据"""
     print(f"\n=== 分析 {sample_size} 条样本 ===")
     
     # 加载数据
     file_path = os.path.join(PROJECT_ROOT, "data", "merged_chat_records.xlsx")
-    df = pd.read_excel(file_path, nrows=sample_size)
+    df = load_export(file_path, nrows=sample_size)
     print(f"实际读取：{len(df)}行")
     
     # 字段缺失率
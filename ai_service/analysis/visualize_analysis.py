@@ -3,6 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
 import json
 from datetime import datetime
 from collections import defaultdict
@@ -25,6 +26,10 @@ from plotly.subplots import make_subplots
 # 设置项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 # 设置中文字体
 try:
     font_path = '/System/Library/Fonts/PingFang.ttc'  # macOS 上的字体
@@ -49,7 +54,7 @@ def load_data(file_path):
     """加载Excel文件数据"""
     try:
         print(f"Loading data from {file_path}...")
-        df = pd.read_excel(file_path)
+        df = load_export(file_path)
         print(f"Successfully loaded {len(df)} records.")
         return df
     except Exception as e:
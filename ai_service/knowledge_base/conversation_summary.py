@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import pandas as pd
 import numpy as np
@@ -13,11 +14,15 @@ from collections import Counter
 # 项目根目录
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+sys.path.insert(0, os.path.join(os.path.dirname(PROJECT_ROOT), 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 def load_data(excel_path):
     """加载Excel数据文件"""
     try:
         print(f"正在加载数据: {excel_path}")
-        df = pd.read_excel(excel_path)
+        df = load_export(excel_path)
         print(f"成功加载 {len(df)} 条记录")
         return df
     except Exception as e:
@@ -14,6 +14,15 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 from collections import Counter
 import os
+import sys
+
+# 分块流式读取聊天导出与智能客服数据处理共用（smart_customer_agent/src/data_processing）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'smart_customer_agent'))
+from src.data_processing.ingestion import UnsortedInputError, iter_conversation_batches, read_table
+from src.data_processing.manifest import (MANIFEST_FILE, changed_conversations, conversation_hashes, discard_manifest,
+                                          load_manifest, merge_records, save_manifest)
+from src.data_processing.parallel import ParallelMap
+from src.data_processing.records import RecordWriter, iter_records, record_path, write_records
 
 # 文件路径
 DATA_FILE = '/Users/boxie/cursor/ai_service/data/raw/250407.xlsx'
@@ -22,7 +31,7 @@ OUTPUT_DIR = '/Users/boxie/cursor/intent_test'
 def load_data(file_path):
     """加载Excel数据文件"""
     print(f"正在加载数据: {file_path}")
-    df = pd.read_excel(file_path)
+    df = read_table(file_path)
     print(f"数据加载完成，共 {len(df)} 行")
     return df
 
@@ -100,12 +109,13 @@ def analyze_raw_data(df):
     
     return report
 
-def clean_data(df):
+def clean_data(df, mapper=None):
     """
     数据清洗函数，处理原始数据中的各种问题
     
     参数:
     - df: 原始数据DataFrame
+    - mapper: ParallelMap，设置后在其进程池中按块清洗文本内容
     
     返回:
     - 清洗后的DataFrame
@@ -130,7 +140,10 @@ def clean_data(df):
         # 将非字符串内容转换为字符串
         df['send_content'] = df['send_content'].apply(lambda x: str(x) if not pd.isna(x) else "")
         # 清洗文本内容
-        df['clean_content'] = df['send_content'].apply(clean_text)
+        if mapper is not None:
+            df['clean_content'] = pd.Series(mapper.map(clean_text, df['send_content']), index=df.index, dtype=object)
+        else:
+            df['clean_content'] = df['send_content'].apply(clean_text)
     
     # 4. 处理重复数据
     df = df.drop_duplicates(subset=['touch_id', 'seq_no'], keep='first')
@@ -192,12 +205,76 @@ def clean_text(text):
     
     return text
 
-def identify_sender_type(df):
+# 客服常用语
+SERVICER_PATTERNS = [
+    r'您好',
+    r'请问有什么可以帮到您',
+    r'感谢您的咨询',
+    r'请稍等',
+    r'很高兴为您服务',
+    r'请问还有其他问题吗',
+    r'祝您生活愉快',
+    r'回收宝客服'
+]
+
+SERVICER_REGEX = re.compile('|'.join(SERVICER_PATTERNS))
+
+def name_in_content(names, contents):
+    """
+    逐行判断名字是否出现在消息内容中
+    
+    参数:
+    - names: 名字Series
+    - contents: 消息内容Series，与names索引一致
+    
+    返回:
+    - 布尔数组，名字缺失的行为False
+    """
+    has_name = names.notna().to_numpy()
+    return np.array([ok and str(name) in str(content)
+                     for ok, name, content in zip(has_name, names.to_numpy(), contents.to_numpy())], dtype=bool)
+
+def infer_alternating_senders(touch_ids, senders):
+    """
+    按对话内消息交替的规律推断未知发送者
+    
+    对话的第一条消息未知时视为用户；之后每条未知消息取上一条消息的另一方，
+    即从最近一条已知消息起按距离奇偶交替。最近的已知消息既不是用户也不是客服（如系统消息、缺失值）时保持未知。
+    
+    参数:
+    - touch_ids: 已按对话和消息序号排序的对话ID数组
+    - senders: 对应的sender_type数组，0表示未知，原地修改
+    
+    返回:
+    - 修改后的senders
+    """
+    n = len(senders)
+    if n == 0:
+        return senders
+    
+    # 每个对话的第一条消息
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = touch_ids[1:] != touch_ids[:-1]
+    senders[starts & (senders == 0)] = 1
+    
+    # 每条消息之前（含自身）最近一条已知消息的位置；对话第一条消息已知，不会跨对话
+    positions = np.arange(n)
+    unknown = senders == 0
+    anchors = np.maximum.accumulate(np.where(unknown, -1, positions))
+    anchor_senders = senders[anchors]
+    
+    fill = unknown & ((anchor_senders == 1) | (anchor_senders == 2))
+    same_side = (positions - anchors) % 2 == 0
+    senders[fill] = np.where(same_side[fill], anchor_senders[fill], 3 - anchor_senders[fill])
+    return senders
+
+def identify_sender_type(df, seed=42):
     """
     识别发送者类型（用户或客服）
     
     参数:
     - df: 数据DataFrame
+    - seed: 仍无法识别的消息按比例随机分配时使用的随机种子
     
     返回:
     - 添加或修正sender_type的DataFrame
@@ -217,70 +294,48 @@ def identify_sender_type(df):
     
     # 基于消息内容和其他特征识别发送者类型
     # 1 = 用户，2 = 客服
+    senders = df['sender_type'].to_numpy(copy=True)
     
-    # 1. 基于用户名和客服名识别
+    # 1. 基于用户名和客服名识别（只需检查未知的消息）
     if 'user_name' in df.columns and 'servicer_name' in df.columns:
         # 如果消息发送者与user_name相同，则为用户消息
-        user_name_mask = df.apply(lambda row: not pd.isna(row['user_name']) and str(row['user_name']) in str(row['send_content']), axis=1)
-        df.loc[user_name_mask & (df['sender_type'] == 0), 'sender_type'] = 1
+        unknown = np.flatnonzero(senders == 0)
+        user_name_mask = name_in_content(df['user_name'].iloc[unknown], df['send_content'].iloc[unknown])
+        senders[unknown[user_name_mask]] = 1
         
         # 如果消息发送者与servicer_name相同，则为客服消息
-        servicer_name_mask = df.apply(lambda row: not pd.isna(row['servicer_name']) and str(row['servicer_name']) in str(row['send_content']), axis=1)
-        df.loc[servicer_name_mask & (df['sender_type'] == 0), 'sender_type'] = 2
-    
-    # 2. 基于消息内容特征识别
-    # 客服常用语
-    servicer_patterns = [
-        r'您好',
-        r'请问有什么可以帮到您',
-        r'感谢您的咨询',
-        r'请稍等',
-        r'很高兴为您服务',
-        r'请问还有其他问题吗',
-        r'祝您生活愉快',
-        r'回收宝客服'
-    ]
+        unknown = np.flatnonzero(senders == 0)
+        servicer_name_mask = name_in_content(df['servicer_name'].iloc[unknown], df['send_content'].iloc[unknown])
+        senders[unknown[servicer_name_mask]] = 2
     
-    for pattern in servicer_patterns:
-        pattern_mask = df['send_content'].str.contains(pattern, na=False)
-        df.loc[pattern_mask & (df['sender_type'] == 0), 'sender_type'] = 2
+    # 2. 基于消息内容特征识别：包含任一客服常用语即为客服消息
+    unknown = np.flatnonzero(senders == 0)
+    pattern_mask = np.array([isinstance(content, str) and SERVICER_REGEX.search(content) is not None
+                             for content in df['send_content'].to_numpy()[unknown]], dtype=bool)
+    senders[unknown[pattern_mask]] = 2
     
     # 3. 基于对话模式识别
     # 通常对话是交替进行的，可以根据这个特点来推断
-    for touch_id in df['touch_id'].unique():
-        touch_df = df[df['touch_id'] == touch_id].sort_values('seq_no')
-        
-        # 如果第一条消息sender_type未知，假设为用户
-        if touch_df.iloc[0]['sender_type'] == 0:
-            df.loc[touch_df.iloc[0].name, 'sender_type'] = 1
-        
-        # 遍历该对话的所有消息
-        prev_sender = None
-        for idx, row in touch_df.iterrows():
-            if row['sender_type'] == 0:  # 如果sender_type未知
-                if prev_sender == 1:
-                    df.loc[idx, 'sender_type'] = 2  # 如果上一条是用户消息，则这条是客服消息
-                elif prev_sender == 2:
-                    df.loc[idx, 'sender_type'] = 1  # 如果上一条是客服消息，则这条是用户消息
-            prev_sender = df.loc[idx, 'sender_type']
+    order = pd.DataFrame({'touch_id': df['touch_id'].to_numpy(), 'seq_no': df['seq_no'].to_numpy()}).sort_values(
+        ['touch_id', 'seq_no'], kind='stable').index.to_numpy()
+    senders[order] = infer_alternating_senders(df['touch_id'].to_numpy()[order], senders[order])
     
     # 4. 处理剩余未识别的消息
     # 如果还有未识别的消息，根据整体分布进行推断
-    if (df['sender_type'] == 0).any():
+    unidentified = np.flatnonzero(senders == 0)
+    if len(unidentified):
         # 计算已识别消息中用户和客服的比例
-        identified_df = df[df['sender_type'] != 0]
-        user_ratio = (identified_df['sender_type'] == 1).mean()
+        user_ratio = (senders[senders != 0] == 1).mean()
         
-        # 根据比例随机分配
-        unidentified_indices = df[df['sender_type'] == 0].index
-        user_count = int(len(unidentified_indices) * user_ratio)
-        
-        # 随机选择一部分作为用户消息
-        user_indices = np.random.choice(unidentified_indices, user_count, replace=False)
-        df.loc[user_indices, 'sender_type'] = 1
+        # 根据比例随机分配，固定随机种子保证结果可复现
+        user_count = int(len(unidentified) * user_ratio)
+        user_positions = np.random.RandomState(seed).choice(unidentified, user_count, replace=False)
+        senders[user_positions] = 1
         
         # 剩余的作为客服消息
-        df.loc[df['sender_type'] == 0, 'sender_type'] = 2
+        senders[senders == 0] = 2
+    
+    df['sender_type'] = senders
     
     # 统计结果
     user_count = (df['sender_type'] == 1).sum()
@@ -293,10 +348,80 @@ def identify_sender_type(df):
     
     return df
 
+# 订单号模式（通常为18位数字）
+ORDER_PATTERN = r'\b\d{18}\b'
+
+# 物流单号模式（常见快递公司的物流单号格式），按顺序取第一个有匹配的模式
+LOGISTICS_PATTERNS = [
+    r'\b[A-Za-z]{2}\d{9}[A-Za-z]{2}\b',  # 顺丰
+    r'\b\d{13}\b',  # 申通、圆通
+    r'\b\d{10,12}\b',  # EMS、中通、韵达
+    r'\b[A-Za-z0-9]{10,15}\b'  # 其他
+]
+
+# 产品信息模式，按顺序取第一个有匹配的模式（品牌模式只提取品牌名）
+PRODUCT_PATTERNS = [
+    r'(iPhone\s*\d+\s*[A-Za-z]*\s*[\d]*\s*[A-Za-z]*)',
+    r'(华为|荣耀|小米|OPPO|vivo|三星|魅族|一加)[\s\S]{0,10}?[\w\d]+',
+    r'(\d+GB|\d+TB|\d+寸|\d+英寸)'
+]
+
+# 价格信息模式
+PRICE_PATTERN = r'(\d+(?:\.\d+)?元|\d+(?:\.\d+)?块钱|\d+(?:\.\d+)?[元块]|\¥\s*\d+(?:\.\d+)?)'
+
+def combine_first_match(patterns):
+    """
+    把按优先级排列的多个模式合并为一个正则
+    
+    每个分支以 .*? 开头并锚定在文本开头，前一个分支在文本任何位置都不能匹配时才尝试下一个分支，
+    因此匹配到的分组与"依次对每个模式 re.findall，取第一个有结果的模式的第一个匹配"一致。
+    
+    参数:
+    - patterns: 模式列表，每个模式最多含一个捕获组，不含捕获组时整个匹配作为结果
+    
+    返回:
+    - 编译后的正则，第i个捕获组对应第i个模式
+    """
+    branches = []
+    for pattern in patterns:
+        if re.compile(pattern).groups == 0:
+            pattern = f'({pattern})'
+        branches.append(f'.*?{pattern}')
+    return re.compile('^(?:' + '|'.join(branches) + ')', re.DOTALL)
+
+STRUCTURED_INFO_REGEXES = {
+    'order_number': combine_first_match([ORDER_PATTERN]),
+    # 物流单号最长15位，不会与18位订单号相同，原实现中排除订单号的判断不会生效
+    'logistics_number': combine_first_match(LOGISTICS_PATTERNS),
+    'product_info': combine_first_match(PRODUCT_PATTERNS),
+    'price_info': combine_first_match([PRICE_PATTERN]),
+}
+
+def extract_first_match(text, regex):
+    """
+    对每条文本取 combine_first_match 合并正则的匹配结果
+    
+    参数:
+    - text: 字符串Series
+    - regex: combine_first_match 返回的正则
+    
+    返回:
+    - Series，没有匹配的行为NaN
+    """
+    extracted = text.str.extract(regex, expand=True)
+    # 每行最多只有一个分组有值
+    values = extracted.iloc[:, 0]
+    for i in range(1, extracted.shape[1]):
+        values = values.fillna(extracted.iloc[:, i])
+    return values
+
 def extract_structured_info(df):
     """
     提取结构化信息（订单号、物流单号等）
     
+    每列用一个合并后的正则对整列文本做一次 str.extract，
+    再按 touch_id 分组取第一个非空值，填充到该对话中没有提取到信息的消息。
+    
     参数:
     - df: 数据DataFrame
     
@@ -305,91 +430,217 @@ def extract_structured_info(df):
     """
     print("提取结构化信息...")
     
-    # 添加结构化信息列
-    df['order_number'] = None
-    df['logistics_number'] = None
-    df['product_info'] = None
-    df['price_info'] = None
-    
-    # 订单号模式（通常为18位数字）
-    order_pattern = r'\b\d{18}\b'
-    
-    # 物流单号模式（常见快递公司的物流单号格式）
-    logistics_patterns = [
-        r'\b[A-Za-z]{2}\d{9}[A-Za-z]{2}\b',  # 顺丰
-        r'\b\d{13}\b',  # 申通、圆通
-        r'\b\d{10,12}\b',  # EMS、中通、韵达
-        r'\b[A-Za-z0-9]{10,15}\b'  # 其他
-    ]
+    # 缺失内容按空字符串处理，其他非字符串值按 str() 转换
+    content = df['send_content']
+    text = content.where(content.notna(), '').map(str) if content.dtype == object else content.fillna('').astype(str)
     
-    # 产品信息模式
-    product_patterns = [
-        r'(iPhone\s*\d+\s*[A-Za-z]*\s*[\d]*\s*[A-Za-z]*)',
-        r'(华为|荣耀|小米|OPPO|vivo|三星|魅族|一加)[\s\S]{0,10}?[\w\d]+',
-        r'(\d+GB|\d+TB|\d+寸|\d+英寸)'
-    ]
-    
-    # 价格信息模式
-    price_pattern = r'(\d+(?:\.\d+)?元|\d+(?:\.\d+)?块钱|\d+(?:\.\d+)?[元块]|\¥\s*\d+(?:\.\d+)?)'
-    
-    # 遍历每一行提取结构化信息
-    for idx, row in df.iterrows():
-        content = str(row['send_content']) if not pd.isna(row['send_content']) else ""
-        
-        # 提取订单号
-        order_matches = re.findall(order_pattern, content)
-        if order_matches:
-            df.at[idx, 'order_number'] = order_matches[0]
+    for col, regex in STRUCTURED_INFO_REGEXES.items():
+        values = extract_first_match(text, regex)
         
-        # 提取物流单号
-        for pattern in logistics_patterns:
-            logistics_matches = re.findall(pattern, content)
-            if logistics_matches:
-                # 过滤掉可能与订单号重复的物流单号
-                if not order_matches or logistics_matches[0] not in order_matches:
-                    df.at[idx, 'logistics_number'] = logistics_matches[0]
-                    break
+        # 在对话内传播结构化信息
+        # 例如，如果一个对话中的某条消息提到了订单号，那么这个订单号应该与整个对话关联
+        first_values = values.groupby(df['touch_id']).transform('first')
+        values = values.where(values.notna(), first_values)
         
-        # 提取产品信息
-        for pattern in product_patterns:
-            product_matches = re.findall(pattern, content)
-            if product_matches:
-                df.at[idx, 'product_info'] = product_matches[0]
-                break
-        
-        # 提取价格信息
-        price_matches = re.findall(price_pattern, content)
-        if price_matches:
-            df.at[idx, 'price_info'] = price_matches[0]
+        # 与逐行赋值的结果保持一致：object列，缺失为None
+        df[col] = values.astype(object).where(values.notna(), None)
     
-    # 在对话内传播结构化信息
-    # 例如，如果一个对话中的某条消息提到了订单号，那么这个订单号应该与整个对话关联
-    for touch_id, group in df.groupby('touch_id'):
-        # 收集该对话中的所有结构化信息
-        order_numbers = group['order_number'].dropna().unique()
-        logistics_numbers = group['logistics_number'].dropna().unique()
-        product_infos = group['product_info'].dropna().unique()
-        price_infos = group['price_info'].dropna().unique()
-        
-        # 如果该对话中有结构化信息，将其传播到对话的所有消息中
-        if len(order_numbers) > 0:
-            df.loc[df['touch_id'] == touch_id, 'order_number'] = df.loc[df['touch_id'] == touch_id, 'order_number'].fillna(order_numbers[0])
-        
-        if len(logistics_numbers) > 0:
-            df.loc[df['touch_id'] == touch_id, 'logistics_number'] = df.loc[df['touch_id'] == touch_id, 'logistics_number'].fillna(logistics_numbers[0])
+    return df
+
+# 消息的基本字段，不参与原始数据统计
+DIALOG_CORE_COLUMNS = ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time']
+
+STRUCTURED_INFO_COLUMNS = ['order_number', 'logistics_number', 'product_info', 'price_info']
+
+# 取对话第一条消息的值作为元数据的字段
+DIALOG_METADATA_COLUMNS = ['group_name', 'servicer_name', 'user_name', 'new_feedback_name', 'create_time',
+                           'user_start_time', 'user_end_time']
+
+# pd.to_numeric 能解析的字符串只由这些字符组成（如 " 12"、"1e5"、"-Infinity"），
+# 不满足的字符串必然解析失败，可以跳过解析直接统计唯一值
+NUMERIC_LIKE_REGEX = re.compile(r'[\s+\-.0-9einfaty]*', re.IGNORECASE)
+
+def json_safe_value(value):
+    """numpy标量转为Python原生类型，其他值转为字符串"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def may_be_numeric(value):
+    """pd.to_numeric 是否可能把该值解析为数值（宽松判断，返回False时一定无法解析）"""
+    if isinstance(value, str):
+        return NUMERIC_LIKE_REGEX.fullmatch(value) is not None
+    return not isinstance(value, (datetime, pd.Timedelta, np.datetime64, np.timedelta64))
+
+def scalar_values(series):
+    """
+    逐个取出整列的值，与 series.iloc[i] 返回的标量相同
+    
+    numpy类型的列为numpy标量，category列为类别Index中的元素，时间、字符串等扩展类型为其装箱后的值。
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind not in 'mM':
+        return list(series.to_numpy())
+    array = series.array
+    if isinstance(array, pd.Categorical):
+        categories = array.categories
+        boxed = [categories[i] for i in range(len(categories))] + [np.nan]
+        return [boxed[code] for code in array.codes.tolist()]
+    if pd.api.types.is_datetime64_any_dtype(series) or isinstance(series.dtype, pd.StringDtype):
+        return list(array)
+    return [array[i] for i in range(len(array))]
+
+def message_values(series, convert):
+    """
+    整列转换为消息字段的值，缺失为None
+    
+    convert 的参数与 iterrows 得到的行中的值相同（整表先转为object：numpy数值为Python原生类型，
+    时间为Timestamp），非object列中相同的值只转换一次。
+    
+    参数:
+    - series: 整列数据
+    - convert: 单个非缺失值的转换函数
+    
+    返回:
+    - 转换后的值列表
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iufb':
+        values = series.to_numpy()
+        missing = np.isnan(values).tolist() if dtype.kind == 'f' else [False] * len(values)
+        return [None if m else convert(v) for v, m in zip(values.tolist(), missing)]
+    if dtype != object:
+        codes, uniques = pd.factorize(series)
+        converted = [convert(v) for v in uniques.astype(object)] + [None]
+        return [converted[code] for code in codes.tolist()]
+    values = series.to_numpy()
+    return [None if m else convert(v) for v, m in zip(values, pd.isna(values).tolist())]
+
+def format_times(series):
+    """时间列格式化为 '%Y-%m-%d %H:%M:%S'，缺失为None"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        formatted = series.dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+        return [None if m else v for v, m in zip(formatted, series.isna().tolist())]
+    return message_values(series, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+
+def numeric_values(series):
+    """
+    可以直接用numpy统计的列（int64/uint64/float64/时间）返回 pd.to_numeric 转换后的数组，其他列返回None
+    
+    时间列按 pd.to_numeric 的规则转为该列时间单位下的int64。
+    """
+    dtype = series.dtype
+    if not isinstance(dtype, np.dtype) or dtype.itemsize != 8:
+        return None
+    if dtype.kind in 'mM':
+        return series.to_numpy().view(np.int64)
+    if dtype.kind in 'iuf':
+        return series.to_numpy()
+    return None
+
+def summarize_unique_values(col, unique_values, summary):
+    """唯一值不超过5个时记录唯一值，否则只记录唯一值数量"""
+    if len(unique_values) <= 5:
+        # 确保所有值都是JSON可序列化的
+        summary[col + "_values"] = [json_safe_value(v) for v in unique_values]
+    else:
+        summary[col + "_unique_count"] = int(len(unique_values))
+
+def summarize_column(col, non_null_values, summary):
+    """
+    统计一个对话中某列的非空值，写入 summary
+    
+    参数:
+    - col: 列名
+    - non_null_values: 该对话中该列的非空值Series
+    - summary: 对话的 original_data 字典
+    """
+    try:
+        # 尝试转换为数值型
+        numeric = pd.to_numeric(non_null_values)
+        # 确保值是JSON可序列化的
+        summary[col + "_avg"] = float(numeric.mean())
+        summary[col + "_min"] = float(numeric.min())
+        summary[col + "_max"] = float(numeric.max())
+    except Exception:
+        # 如果不是数值型，则保存唯一值
+        summarize_unique_values(col, non_null_values.unique(), summary)
+
+def column_summarizer(col, series, starts):
+    """
+    按列类型准备逐个对话统计该列的函数，结果与对每个对话的非空值调用 summarize_column 相同
+    
+    - int64/uint64/float64/时间列：直接对对话的数值切片求均值、最小值和最大值，
+      求和方式与 Series.mean 相同（按float64累加再除以个数）
+    - 文本列（object/str/category）：对话中有值必然无法解析为数值时直接统计唯一值，否则仍调用 summarize_column
+    - 其他类型：逐个对话调用 summarize_column
+    
+    参数:
+    - col: 列名
+    - series: 已按对话排序的整列数据
+    - starts: 每个对话在 series 中的起始位置
+    
+    返回:
+    - summarize(对话序号, original_data字典)
+    """
+    present = np.flatnonzero(series.notna().to_numpy())
+    # 第g个对话的非空值为 present[bounds[g]:bounds[g + 1]]
+    bounds = np.searchsorted(present, np.append(starts, len(series))).tolist()
+    
+    numbers = numeric_values(series)
+    if numbers is not None:
+        numbers = numbers[present]
+        # 最小值、最大值与求和顺序无关，对所有非空对话一次计算
+        nonempty = [g for g in range(len(starts)) if bounds[g] < bounds[g + 1]]
+        offsets = [bounds[g] for g in nonempty]
+        minimums = dict(zip(nonempty, np.minimum.reduceat(numbers, offsets).tolist())) if nonempty else {}
+        maximums = dict(zip(nonempty, np.maximum.reduceat(numbers, offsets).tolist())) if nonempty else {}
         
-        if len(product_infos) > 0:
-            df.loc[df['touch_id'] == touch_id, 'product_info'] = df.loc[df['touch_id'] == touch_id, 'product_info'].fillna(product_infos[0])
+        def summarize(g, summary):
+            begin, end = bounds[g], bounds[g + 1]
+            if begin < end:
+                summary[col + "_avg"] = float(numbers[begin:end].sum(dtype=np.float64) / np.float64(end - begin))
+                summary[col + "_min"] = float(minimums[g])
+                summary[col + "_max"] = float(maximums[g])
+        return summarize
+    
+    non_null = series.iloc[present]
+    if series.dtype == object or isinstance(series.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+        try:
+            codes, uniques = pd.factorize(non_null)
+        except TypeError:
+            # 含有不可哈希的值，逐个对话调用 summarize_column
+            codes = None
+    else:
+        codes = None
+    
+    if codes is not None:
+        # 与遍历 unique() 结果得到的值相同（category列为Python原生类型）
+        values = list(non_null.array) if isinstance(series.dtype, pd.CategoricalDtype) else non_null.to_numpy()
+        # 每个不同的值只判断一次
+        rejected = np.array([not may_be_numeric(value) for value in uniques], dtype=bool)[codes]
+        rejected_before = np.concatenate([[0], np.cumsum(rejected)]).tolist()
         
-        if len(price_infos) > 0:
-            df.loc[df['touch_id'] == touch_id, 'price_info'] = df.loc[df['touch_id'] == touch_id, 'price_info'].fillna(price_infos[0])
-    
-    return df
+        def summarize(g, summary):
+            begin, end = bounds[g], bounds[g + 1]
+            if begin == end:
+                return
+            if rejected_before[end] > rejected_before[begin]:
+                summarize_unique_values(col, list(dict.fromkeys(values[begin:end])), summary)
+            else:
+                summarize_column(col, non_null.iloc[begin:end], summary)
+        return summarize
+    
+    def summarize(g, summary):
+        begin, end = bounds[g], bounds[g + 1]
+        if begin < end:
+            summarize_column(col, non_null.iloc[begin:end], summary)
+    return summarize
 
 def organize_dialogs(df):
     """
     将扁平数据组织为对话结构
     
+    按 (touch_id, seq_no) 稳定排序一次，用每个对话的起止位置切分各列数组构建消息；
+    各列的取值转换和统计方式按列类型预先确定，不逐条消息、逐个对话判断。
+    
     参数:
     - df: 预处理后的DataFrame
     
@@ -399,83 +650,77 @@ def organize_dialogs(df):
     print("组织对话...")
     
     # 确保所有必要的列都存在
-    required_columns = ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time']
-    for col in required_columns:
+    for col in DIALOG_CORE_COLUMNS:
         if col not in df.columns:
             raise ValueError(f"缺少必要的列: {col}")
     
     # 获取所有原始列名
     original_columns = df.columns.tolist()
     
-    # 按对话ID分组
+    # 与 groupby 一致，丢弃没有对话ID的行；对话按ID升序，对话内按消息序号升序
+    df = df[df['touch_id'].notna()].sort_values(['touch_id', 'seq_no'], kind='stable')
+    if not len(df):
+        print("对话组织完成，共 0 个对话")
+        return []
+    
+    # 每个对话在排序后数据中的起止位置
+    touch_ids = df['touch_id'].to_numpy()
+    starts = np.concatenate([[0], np.flatnonzero(touch_ids[1:] != touch_ids[:-1]) + 1])
+    ends = np.append(starts[1:], len(df))
+    
+    # 对话元数据
+    time_range = df['send_time'].groupby(np.repeat(np.arange(len(starts)), ends - starts)).agg(['min', 'max'])
+    start_times = format_times(time_range['min'])
+    end_times = format_times(time_range['max'])
+    metadata_columns = []
+    for col in DIALOG_METADATA_COLUMNS:
+        if col in df.columns:
+            # 确保值是JSON可序列化的
+            first_values = scalar_values(df[col].iloc[starts])
+            metadata_columns.append((col, ["" if pd.isna(v) else json_safe_value(v) for v in first_values]))
+    
+    # 消息字段，每列一次性转换
+    ids = [str(label) for label in df.index]
+    seq_nos = [float(v) for v in df['seq_no'].to_numpy(dtype=object)]
+    sender_types = [int(v) for v in df['sender_type'].to_numpy(dtype=object)]
+    contents = ["" if v is None else v for v in message_values(df['send_content'], str)]
+    clean_contents = ["" if v is None else v for v in message_values(df['clean_content'], str)]
+    send_times = ["" if v is None else v for v in format_times(df['send_time'])]
+    
+    # 结构化信息在前，其他字段按原始列顺序在后；缺失为None，不写入消息
+    optional_columns = [(col, message_values(df[col], str)) for col in STRUCTURED_INFO_COLUMNS if col in df.columns]
+    for col in original_columns:
+        if col not in DIALOG_CORE_COLUMNS and col not in STRUCTURED_INFO_COLUMNS:
+            # 确保值是JSON可序列化的
+            optional_columns.append((col, message_values(df[col], json_safe_value)))
+    
+    summarizers = [column_summarizer(col, df[col], starts) for col in original_columns if col not in DIALOG_CORE_COLUMNS]
+    
     dialogs = []
-    for touch_id, group in df.groupby('touch_id'):
-        # 按消息序号排序
-        group = group.sort_values('seq_no')
-        
-        # 创建元数据
-        metadata = {
-            "start_time": group['send_time'].min().strftime('%Y-%m-%d %H:%M:%S') if 'send_time' in group.columns else "",
-            "end_time": group['send_time'].max().strftime('%Y-%m-%d %H:%M:%S') if 'send_time' in group.columns else "",
-        }
-        
-        # 添加所有可能有用的元数据字段
-        for col in ['group_name', 'servicer_name', 'user_name', 'new_feedback_name', 'create_time', 
-                   'user_start_time', 'user_end_time']:
-            if col in group.columns:
-                # 确保值是JSON可序列化的
-                value = group[col].iloc[0]
-                if pd.isna(value):
-                    metadata[col] = ""
-                else:
-                    # 将numpy类型转换为Python原生类型
-                    if hasattr(value, 'item'):
-                        metadata[col] = value.item()
-                    else:
-                        metadata[col] = str(value)
+    for g, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        metadata = {"start_time": start_times[g], "end_time": end_times[g]}
+        for col, values in metadata_columns:
+            metadata[col] = values[g]
         
         # 创建消息列表
         messages = []
-        for _, row in group.iterrows():
+        for i in range(start, end):
             message = {
-                "id": str(row.name),
-                "seq_no": float(row['seq_no']),
-                "sender_type": int(row['sender_type']),
-                "content": str(row['send_content']) if not pd.isna(row['send_content']) else "",
-                "clean_content": str(row['clean_content']) if not pd.isna(row['clean_content']) else "",
-                "send_time": row['send_time'].strftime('%Y-%m-%d %H:%M:%S') if not pd.isna(row['send_time']) else ""
+                "id": ids[i],
+                "seq_no": seq_nos[i],
+                "sender_type": sender_types[i],
+                "content": contents[i],
+                "clean_content": clean_contents[i],
+                "send_time": send_times[i]
             }
-            
-            # 添加结构化信息
-            if 'order_number' in row and not pd.isna(row['order_number']):
-                message["order_number"] = str(row['order_number'])
-            
-            if 'logistics_number' in row and not pd.isna(row['logistics_number']):
-                message["logistics_number"] = str(row['logistics_number'])
-            
-            if 'product_info' in row and not pd.isna(row['product_info']):
-                message["product_info"] = str(row['product_info'])
-            
-            if 'price_info' in row and not pd.isna(row['price_info']):
-                message["price_info"] = str(row['price_info'])
-            
-            # 添加其他可能有用的字段
-            for col in original_columns:
-                if col not in ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time', 
-                              'order_number', 'logistics_number', 'product_info', 'price_info']:
-                    if col in row and not pd.isna(row[col]):
-                        # 确保值是JSON可序列化的
-                        value = row[col]
-                        if hasattr(value, 'item'):
-                            message[col] = value.item()
-                        else:
-                            message[col] = str(value)
-            
+            for col, values in optional_columns:
+                if values[i] is not None:
+                    message[col] = values[i]
             messages.append(message)
         
         # 创建对话结构
         dialog = {
-            "conversation_id": str(touch_id),
+            "conversation_id": str(touch_ids[start]),
             "metadata": metadata,
             "messages": messages,
             "structured_info": {
@@ -493,32 +738,8 @@ def organize_dialogs(df):
         }
         
         # 添加原始数据统计
-        for col in original_columns:
-            if col not in ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time']:
-                non_null_values = group[col].dropna()
-                if len(non_null_values) > 0:
-                    # 根据数据类型选择合适的统计方法
-                    try:
-                        # 尝试转换为数值型
-                        numeric_values = pd.to_numeric(non_null_values)
-                        # 确保值是JSON可序列化的
-                        dialog["original_data"][col + "_avg"] = float(numeric_values.mean())
-                        dialog["original_data"][col + "_min"] = float(numeric_values.min())
-                        dialog["original_data"][col + "_max"] = float(numeric_values.max())
-                    except:
-                        # 如果不是数值型，则保存唯一值
-                        unique_values = non_null_values.unique()
-                        if len(unique_values) <= 5:  # 只保存少量唯一值
-                            # 确保所有值都是JSON可序列化的
-                            json_safe_values = []
-                            for v in unique_values:
-                                if hasattr(v, 'item'):
-                                    json_safe_values.append(v.item())
-                                else:
-                                    json_safe_values.append(str(v))
-                            dialog["original_data"][col + "_values"] = json_safe_values
-                        else:
-                            dialog["original_data"][col + "_unique_count"] = int(len(unique_values))
+        for summarize in summarizers:
+            summarize(g, dialog["original_data"])
         
         dialogs.append(dialog)
     
@@ -979,6 +1200,99 @@ def calculate_business_relevance(dialog):
     
     return relevance_score
 
+# 增强清洗（enhanced_content_cleaning）对每条消息都会调用，用到的正则和替换表在模块加载时准备好
+
+# 业务信息：订单号、产品、价格与结构化信息提取使用相同的模式
+BUSINESS_ORDER_REGEX = re.compile(ORDER_PATTERN)
+BUSINESS_LOGISTICS_REGEX = re.compile(r'\b[A-Za-z0-9]{10,15}\b')
+BUSINESS_PHONE_REGEX = re.compile(r'\b1[3-9]\d{9}\b')
+BUSINESS_PRODUCT_REGEXES = [re.compile(pattern) for pattern in PRODUCT_PATTERNS]
+BUSINESS_PRICE_REGEX = re.compile(PRICE_PATTERN)
+
+# 系统提示，按顺序依次移除（不同标记嵌套时合并为一个正则的结果会不同）
+SYSTEM_PROMPT_REGEXES = [re.compile(pattern, re.DOTALL) for pattern in [
+    r'\[系统提示\].*?\[\/系统提示\]',
+    r'\[系统消息\].*?\[\/系统消息\]',
+    r'\[自动回复\].*?\[\/自动回复\]',
+    r'\[自动消息\].*?\[\/自动消息\]',
+    r'【系统提示】.*?【\/系统提示】',
+    r'【系统消息】.*?【\/系统消息】',
+    r'【自动回复】.*?【\/自动回复】',
+    r'【自动消息】.*?【\/自动消息】'
+]]
+# 每种系统提示都包含其中一个词，都不包含时无需匹配
+SYSTEM_PROMPT_KEYWORDS = ('系统', '自动')
+
+# 格式标记，按顺序依次处理
+FORMAT_MARK_REGEXES = [re.compile(pattern) for pattern in [
+    r'\*\*.*?\*\*',  # Markdown加粗
+    r'\*.*?\*',      # Markdown斜体
+    r'\~\~.*?\~\~',  # Markdown删除线
+    r'\`.*?\`',      # Markdown代码
+    r'\<.*?\>',      # HTML标签
+    r'\[.*?\]\(.*?\)'  # Markdown链接
+]]
+# 每种格式标记都以其中一个字符开头，都不包含时无需匹配
+FORMAT_MARK_STARTS = '*~`<['
+# 去掉标记符号，保留标记内的内容
+FORMAT_MARK_TABLE = str.maketrans('', '', '*~`<>[]()')
+
+# 中英文标点映射，逐个字符替换
+# 原映射中的引号条目两侧都是半角引号（其中两个单引号条目在源码里连成了一个三引号字符串键，只能匹配那段源码文本本身），
+# 不会改变实际消息内容，这里不再保留
+PUNCTUATION_TABLE = str.maketrans({
+    '，': ',',
+    '。': '.',
+    '！': '!',
+    '？': '?',
+    '；': ';',
+    '：': ':',
+    '（': '(',
+    '）': ')',
+    '【': '[',
+    '】': ']',
+    '《': '<',
+    '》': '>',
+    '—': '-'
+})
+ELLIPSIS_REGEX = re.compile(r'\.{2,}')
+REPEATED_MARK_REGEX = re.compile(r'([!?])\1+')
+MISSING_SPACE_REGEX = re.compile(r'([.,!?;:])([\u4e00-\u9fa5a-zA-Z0-9])')
+
+# 常见缩写和网络用语的标准表达
+EXPRESSION_MAP = {
+    r'\b回收宝\b': '回收宝',
+    r'\bhsb\b': '回收宝',
+    r'\b咨询\b': '咨询',
+    r'\b订单\b': '订单',
+    r'\b物流\b': '物流',
+    r'\b快递\b': '快递',
+    r'\b发货\b': '发货',
+    r'\b收货\b': '收货',
+    r'\b退款\b': '退款',
+    r'\b价格\b': '价格',
+    r'\b估价\b': '估价',
+    r'\b检测\b': '检测',
+    r'\b回收\b': '回收',
+    r'\b维修\b': '维修',
+    r'\b换新\b': '换新',
+    r'\b保修\b': '保修',
+    r'\b质量\b': '质量',
+    r'\b售后\b': '售后',
+    r'\b支付\b': '支付',
+    r'\b付款\b': '付款',
+    r'\b取消\b': '取消',
+    r'\b修改\b': '修改',
+    r'\b投诉\b': '投诉',
+    r'\b建议\b': '建议'
+}
+# 把词替换为自身（且不区分大小写也不影响结果）的条目不改变内容，不需要匹配
+EXPRESSION_REGEXES = [
+    (re.compile(pattern, re.IGNORECASE), replacement)
+    for pattern, replacement in EXPRESSION_MAP.items()
+    if not (pattern == rf'\b{re.escape(replacement)}\b' and replacement.lower() == replacement.upper())
+]
+
 def enhanced_content_cleaning(content):
     """
     增强版消息内容清洗
@@ -1008,6 +1322,30 @@ def enhanced_content_cleaning(content):
     
     return final_content
 
+def clean_many(contents):
+    """
+    批量增强清洗，结果与逐条调用 enhanced_content_cleaning 相同
+    
+    客服常用语、自动回复等内容大量重复，相同的文本只清洗一次。
+    
+    参数:
+    - contents: 消息内容列表
+    
+    返回:
+    - 清洗后的内容列表，顺序与输入相同
+    """
+    cache = {}
+    results = []
+    for content in contents:
+        if isinstance(content, str):
+            cleaned = cache.get(content)
+            if cleaned is None:
+                cleaned = cache[content] = enhanced_content_cleaning(content)
+        else:
+            cleaned = enhanced_content_cleaning(content)
+        results.append(cleaned)
+    return results
+
 def extract_business_info(content):
     """
     提取消息中的关键业务信息
@@ -1018,8 +1356,6 @@ def extract_business_info(content):
     返回:
     - 提取的业务信息字典
     """
-    import re
-    
     business_info = {
         "order_ids": [],
         "logistics_ids": [],
@@ -1029,38 +1365,26 @@ def extract_business_info(content):
     }
     
     # 1. 提取订单号 (通常为18位数字)
-    order_pattern = r'\b\d{18}\b'
-    order_matches = re.findall(order_pattern, content)
+    order_matches = BUSINESS_ORDER_REGEX.findall(content)
     business_info["order_ids"] = order_matches
     
     # 2. 提取物流单号 (通常为10-15位数字字母组合)
-    logistics_pattern = r'\b[A-Za-z0-9]{10,15}\b'
-    logistics_matches = re.findall(logistics_pattern, content)
+    logistics_matches = BUSINESS_LOGISTICS_REGEX.findall(content)
     # 过滤掉订单号，避免重复
     logistics_matches = [m for m in logistics_matches if m not in order_matches]
     business_info["logistics_ids"] = logistics_matches
     
     # 3. 提取手机号 (11位数字，通常以1开头)
-    phone_pattern = r'\b1[3-9]\d{9}\b'
-    phone_matches = re.findall(phone_pattern, content)
-    business_info["phone_numbers"] = phone_matches
+    business_info["phone_numbers"] = BUSINESS_PHONE_REGEX.findall(content)
     
     # 4. 提取产品信息 (包含型号的文本片段)
-    product_patterns = [
-        r'(iPhone\s*\d+\s*[A-Za-z]*\s*[\d]*\s*[A-Za-z]*)',
-        r'(华为|荣耀|小米|OPPO|vivo|三星|魅族|一加)[\s\S]{0,10}?[\w\d]+',
-        r'(\d+GB|\d+TB|\d+寸|\d+英寸)'
-    ]
-    
-    for pattern in product_patterns:
-        matches = re.findall(pattern, content)
+    for regex in BUSINESS_PRODUCT_REGEXES:
+        matches = regex.findall(content)
         if matches:
             business_info["product_info"].extend(matches)
     
     # 5. 提取价格信息
-    price_pattern = r'(\d+(?:\.\d+)?元|\d+(?:\.\d+)?块钱|\d+(?:\.\d+)?[元块]|\¥\s*\d+(?:\.\d+)?)'
-    price_matches = re.findall(price_pattern, content)
-    business_info["price_info"] = price_matches
+    business_info["price_info"] = BUSINESS_PRICE_REGEX.findall(content)
     
     return business_info
 
@@ -1074,24 +1398,10 @@ def remove_system_prompts(content):
     返回:
     - 移除系统提示后的内容
     """
-    import re
-    
-    # 常见的系统提示模式
-    system_patterns = [
-        r'\[系统提示\].*?\[\/系统提示\]',
-        r'\[系统消息\].*?\[\/系统消息\]',
-        r'\[自动回复\].*?\[\/自动回复\]',
-        r'\[自动消息\].*?\[\/自动消息\]',
-        r'【系统提示】.*?【\/系统提示】',
-        r'【系统消息】.*?【\/系统消息】',
-        r'【自动回复】.*?【\/自动回复】',
-        r'【自动消息】.*?【\/自动消息】'
-    ]
-    
-    # 移除系统提示
     cleaned_content = content
-    for pattern in system_patterns:
-        cleaned_content = re.sub(pattern, '', cleaned_content, flags=re.DOTALL)
+    if any(keyword in content for keyword in SYSTEM_PROMPT_KEYWORDS):
+        for regex in SYSTEM_PROMPT_REGEXES:
+            cleaned_content = regex.sub('', cleaned_content)
     
     return cleaned_content.strip()
 
@@ -1105,27 +1415,14 @@ def remove_format_marks(content):
     返回:
     - 移除格式标记后的内容
     """
-    import re
-    
-    # 常见的格式标记
-    format_patterns = [
-        r'\*\*.*?\*\*',  # Markdown加粗
-        r'\*.*?\*',      # Markdown斜体
-        r'\~\~.*?\~\~',  # Markdown删除线
-        r'\`.*?\`',      # Markdown代码
-        r'\<.*?\>',      # HTML标签
-        r'\[.*?\]\(.*?\)'  # Markdown链接
-    ]
-    
     # 移除格式标记，但保留内容
     cleaned_content = content
-    for pattern in format_patterns:
-        # 提取内容并替换标记
-        matches = re.findall(pattern, cleaned_content)
-        for match in matches:
-            # 提取标记内的实际内容
-            inner_content = re.sub(r'[\*\~\`\<\>\[\]\(\)]', '', match)
-            cleaned_content = cleaned_content.replace(match, inner_content)
+    if any(mark in content for mark in FORMAT_MARK_STARTS):
+        for regex in FORMAT_MARK_REGEXES:
+            # 提取内容并替换标记
+            for match in regex.findall(cleaned_content):
+                # 提取标记内的实际内容
+                cleaned_content = cleaned_content.replace(match, match.translate(FORMAT_MARK_TABLE))
     
     return cleaned_content.strip()
 
@@ -1139,39 +1436,15 @@ def standardize_punctuation(content):
     返回:
     - 标准化标点后的内容
     """
-    import re
-    
     # 1. 统一中英文标点
-    punctuation_map = {
-        '，': ',',
-        '。': '.',
-        '！': '!',
-        '？': '?',
-        '；': ';',
-        '：': ':',
-        '"': '"',
-        '"': '"',
-        ''': "'",
-        ''': "'",
-        '（': '(',
-        '）': ')',
-        '【': '[',
-        '】': ']',
-        '《': '<',
-        '》': '>',
-        '—': '-'
-    }
-    
-    standardized_content = content
-    for ch_punct, en_punct in punctuation_map.items():
-        standardized_content = standardized_content.replace(ch_punct, en_punct)
+    standardized_content = content.translate(PUNCTUATION_TABLE)
     
     # 2. 处理重复标点
-    standardized_content = re.sub(r'\.{2,}', '...', standardized_content)  # 将多个点替换为省略号
-    standardized_content = re.sub(r'([!?])\1+', r'\1', standardized_content)  # 减少重复的感叹号和问号
+    standardized_content = ELLIPSIS_REGEX.sub('...', standardized_content)  # 将多个点替换为省略号
+    standardized_content = REPEATED_MARK_REGEX.sub(r'\1', standardized_content)  # 减少重复的感叹号和问号
     
     # 3. 确保标点后有空格
-    standardized_content = re.sub(r'([.,!?;:])([\u4e00-\u9fa5a-zA-Z0-9])', r'\1 \2', standardized_content)
+    standardized_content = MISSING_SPACE_REGEX.sub(r'\1 \2', standardized_content)
     
     return standardized_content.strip()
 
@@ -1185,37 +1458,10 @@ def standardize_expressions(content):
     返回:
     - 标准化表达后的内容
     """
-    # 1. 标准化常见缩写和网络用语
-    expression_map = {
-        r'\b回收宝\b': '回收宝',
-        r'\bhsb\b': '回收宝',
-        r'\b咨询\b': '咨询',
-        r'\b订单\b': '订单',
-        r'\b物流\b': '物流',
-        r'\b快递\b': '快递',
-        r'\b发货\b': '发货',
-        r'\b收货\b': '收货',
-        r'\b退款\b': '退款',
-        r'\b价格\b': '价格',
-        r'\b估价\b': '估价',
-        r'\b检测\b': '检测',
-        r'\b回收\b': '回收',
-        r'\b维修\b': '维修',
-        r'\b换新\b': '换新',
-        r'\b保修\b': '保修',
-        r'\b质量\b': '质量',
-        r'\b售后\b': '售后',
-        r'\b支付\b': '支付',
-        r'\b付款\b': '付款',
-        r'\b取消\b': '取消',
-        r'\b修改\b': '修改',
-        r'\b投诉\b': '投诉',
-        r'\b建议\b': '建议'
-    }
-    
+    # 标准化常见缩写和网络用语
     standardized_content = content
-    for pattern, replacement in expression_map.items():
-        standardized_content = re.sub(pattern, replacement, standardized_content, flags=re.IGNORECASE)
+    for regex, replacement in EXPRESSION_REGEXES:
+        standardized_content = regex.sub(replacement, standardized_content)
     
     return standardized_content.strip()
 
@@ -1285,35 +1531,22 @@ def restore_business_info(content, business_info):
     
     return restored_content.strip()
 
-def preprocess_data(file_path, output_dir=None, filter_quality=True):
+def preprocess_frame(df, filter_quality=True, id_offset=0, mapper=None):
     """
-    数据预处理主函数
+    对一批完整对话的消息执行清洗、结构化和过滤（预处理第2-8步）
     
     参数:
-    - file_path: 原始数据文件路径
-    - output_dir: 输出目录
+    - df: 原始消息DataFrame，其中每个对话的消息都是完整的
     - filter_quality: 是否过滤低质量对话
+    - id_offset: 消息ID的起始值，分批处理时传入之前各批的消息行数，使ID与整表处理时一致
+    - mapper: ParallelMap，设置后文本清洗和增强清洗在其进程池中按块进行，结果与单进程相同
     
     返回:
-    - 预处理后的对话列表
+    - (预处理后的对话列表, 本批结构化后的消息行数)
     """
-    print(f"开始预处理数据: {file_path}")
-    
-    # 1. 读取原始数据
-    if file_path.endswith('.xlsx'):
-        df = pd.read_excel(file_path)
-    elif file_path.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    else:
-        raise ValueError("不支持的文件格式，请提供.xlsx或.csv文件")
-    
-    # 打印原始列名，帮助理解数据结构
-    print(f"原始数据列名: {df.columns.tolist()}")
-    print(f"原始数据形状: {df.shape}")
-    
     # 2. 数据清洗
     print("开始数据清洗...")
-    df = clean_data(df)
+    df = clean_data(df, mapper)
     print(f"数据清洗后形状: {df.shape}")
     
     # 3. 识别发送者类型
@@ -1327,6 +1560,7 @@ def preprocess_data(file_path, output_dir=None, filter_quality=True):
     # 5. 增强对话结构
     print("增强对话结构...")
     df = enhance_dialog_structure(df)
+    df.index += id_offset
     
     # 6. 组织对话
     print("组织对话...")
@@ -1340,27 +1574,156 @@ def preprocess_data(file_path, output_dir=None, filter_quality=True):
     
     # 8. 增强消息内容清洗
     print("增强消息内容清洗...")
-    for dialog in dialogs:
-        for msg in dialog["messages"]:
-            msg["enhanced_content"] = enhanced_content_cleaning(msg["content"])
+    messages = [msg for dialog in dialogs for msg in dialog["messages"]]
+    contents = [msg["content"] for msg in messages]
+    enhanced_contents = mapper.map(clean_many, contents, batched=True) if mapper is not None else clean_many(contents)
+    for msg, enhanced_content in zip(messages, enhanced_contents):
+        msg["enhanced_content"] = enhanced_content
     
-    # 9. 保存预处理后的数据
+    return dialogs, len(df)
+
+def numpy_json_default(obj):
+    """json序列化时把numpy标量和数组转为Python原生类型"""
+    if isinstance(obj, (np.integer, np.floating, np.bool_)):
+        return obj.item()
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def select_changed_rows(df, previous, input_hashes, changed_ids):
+    """
+    增量预处理时筛选需要处理的消息
+    
+    参数:
+    - df: 原始消息DataFrame，其中每个对话的消息都是完整的
+    - previous: 上次清单中的 {对话ID: 摘要}，为None时全量处理
+    - input_hashes: 记录本次输入中各对话摘要的字典（原地更新），为None时不计算摘要
+    - changed_ids: 记录新增或内容变化对话ID的集合（原地更新）
+    
+    返回:
+    - 需要处理的消息DataFrame，全量处理时为df本身
+    """
+    if input_hashes is None:
+        return df
+    hashes = conversation_hashes(df)
+    input_hashes.update(hashes)
+    if previous is None:
+        return df
+    changed = changed_conversations(hashes, previous)
+    changed_ids.update(changed)
+    if len(changed) == len(hashes):
+        return df
+    return df[df['touch_id'].astype(str).isin(changed)]
+
+def preprocess_data(file_path, output_dir=None, filter_quality=True, chunk_size=None, output_format='json',
+                    incremental=False, workers=1):
+    """
+    数据预处理主函数
+    
+    参数:
+    - file_path: 原始数据文件路径
+    - output_dir: 输出目录
+    - filter_quality: 是否过滤低质量对话
+    - chunk_size: 设置后按块流式读取，每批只处理若干条完整对话，内存占用与文件大小无关；
+      为None时一次读入整个文件
+    - output_format: 输出格式，json为JSON数组，jsonl / jsonl.zst为每行一个对话的JSON Lines；
+      流式读取时每批对话处理完立即写出
+    - incremental: 为True时只处理与output_dir下清单相比新增或内容变化的对话，合并到上次的预处理结果中
+      （上次的对话按原顺序保留，本次处理的对话追加在后面，消息ID接着上次的编号）；
+      清单或上次的结果不存在时全量处理
+    - workers: 文本清洗和增强清洗的进程数，大于1时消息按块在多个进程中清洗，结果与单进程相同
+    
+    返回:
+    - 预处理后的对话列表（增量处理时为合并后的全部对话）
+    """
+    print(f"开始预处理数据: {file_path}")
+    
+    if not file_path.endswith(('.xlsx', '.csv')):
+        raise ValueError("不支持的文件格式，请提供.xlsx或.csv文件")
+    
+    output_file = None
+    manifest_file = None
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, "preprocessed_dialogs.json")
+        output_file = record_path(os.path.join(output_dir, "preprocessed_dialogs"), output_format)
+        manifest_file = os.path.join(output_dir, MANIFEST_FILE)
+    
+    # 增量处理：读取上次的清单，只处理新增或内容变化的对话
+    manifest = None
+    if incremental and output_file and os.path.exists(output_file):
+        manifest = load_manifest(manifest_file)
+    if incremental and manifest is None:
+        print("未找到上次的预处理结果或清单，全量处理")
+    previous = manifest["conversations"] if manifest else None
+    id_offset = manifest.get("next_message_id", 0) if manifest else 0
+    # 输出文件即将被改写，中途中断时不能留下与输出不一致的清单（成功后重新写入）
+    if manifest_file:
+        discard_manifest(manifest_file)
+    # 没有输出目录时不需要清单
+    input_hashes = {} if output_file else None
+    changed_ids = set()
+    
+    # 文本清洗的进程池在各批数据间复用
+    with ParallelMap(workers, warmup=(clean_text, enhanced_content_cleaning)) as mapper:
+        # 全量处理时流式写出；增量处理时最后再与上次的结果合并
+        saved = False
+        if chunk_size:
+            # 1. 按块读取原始数据，每批包含若干条完整对话
+            try:
+                dialogs = []
+                processed_rows = 0
+                writer = RecordWriter(output_file, default=numpy_json_default) if output_file and previous is None else None
+                try:
+                    for batch in iter_conversation_batches(file_path, chunk_size=chunk_size):
+                        batch = select_changed_rows(batch, previous, input_hashes, changed_ids)
+                        if not len(batch):
+                            continue
+                        print(f"处理数据批次: {batch.shape}")
+                        batch_dialogs, batch_rows = preprocess_frame(batch, filter_quality, id_offset + processed_rows,
+                                                                     mapper)
+                        dialogs.extend(batch_dialogs)
+                        processed_rows += batch_rows
+                        if writer:
+                            writer.write_all(batch_dialogs)
+                finally:
+                    if writer:
+                        writer.close()
+                saved = writer is not None
+            except UnsortedInputError as e:
+                # 文件未按对话排列时无法边读边处理，改为读完整个文件后处理
+                print(f"{e}，改为读取整个文件后再处理")
+                if input_hashes is not None:
+                    input_hashes.clear()
+                changed_ids.clear()
+                df = select_changed_rows(read_table(file_path), previous, input_hashes, changed_ids)
+                dialogs, processed_rows = preprocess_frame(df, filter_quality, id_offset, mapper) if len(df) else ([], 0)
+        else:
+            # 1. 读取原始数据
+            df = read_table(file_path)
         
-        # 确保JSON序列化安全
-        class NumpyEncoder(json.JSONEncoder):
-            def default(self, obj):
-                if isinstance(obj, (np.integer, np.floating, np.bool_)):
-                    return obj.item()
-                elif isinstance(obj, np.ndarray):
-                    return obj.tolist()
-                return super(NumpyEncoder, self).default(obj)
+            # 打印原始列名，帮助理解数据结构
+            print(f"原始数据列名: {df.columns.tolist()}")
+            print(f"原始数据形状: {df.shape}")
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(dialogs, f, ensure_ascii=False, indent=2, cls=NumpyEncoder)
+            df = select_changed_rows(df, previous, input_hashes, changed_ids)
+            dialogs, processed_rows = preprocess_frame(df, filter_quality, id_offset, mapper) if len(df) else ([], 0)
+    
+    # 9. 保存预处理后的数据
+    if output_file:
+        if previous is not None:
+            print(f"增量处理: {len(changed_ids)} 个新增或变化的对话，"
+                  f"跳过 {len(input_hashes) - len(changed_ids)} 个未变化的对话")
+            merge_records(output_file, dialogs, changed_ids, key=lambda dialog: dialog["conversation_id"],
+                          default=numpy_json_default)
+            dialogs = list(iter_records(output_file))
+        elif not saved:
+            write_records(dialogs, output_file, default=numpy_json_default)
         print(f"预处理数据已保存至: {output_file}")
+        
+        # 输入中没有出现的对话保留上次的摘要，导出文件只包含新一天的数据时也可以增量处理
+        hashes = dict(previous or {})
+        hashes.update(input_hashes)
+        save_manifest(manifest_file, hashes, next_message_id=id_offset + processed_rows)
     
     print("数据预处理完成!")
     return dialogs
@@ -9,12 +9,17 @@
 import os
 import json
 import time
+import argparse
 import pandas as pd
 from data_preprocessing import preprocess_data
 
 # 文件路径
 DATA_FILE = '/Users/boxie/cursor/ai_service/data/raw/250407.xlsx'
 OUTPUT_DIR = '/Users/boxie/cursor/intent_test'
+# 按块流式读取的行数，月度导出可达数百万行，整表读入会耗尽内存
+CHUNK_SIZE = 100000
+# 增量预处理的输出目录固定，每次运行只处理新增或变化的对话并合并到其中
+INCREMENTAL_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "complete_preprocessing_incremental")
 
 def save_sample_csv(dialogs, output_file, sample_size=100):
     """
@@ -100,25 +105,42 @@ def save_sample_csv(dialogs, output_file, sample_size=100):
     df_chinese.to_csv(chinese_file, index=False, encoding='utf-8')
     print(f"中文列名版本已保存至: {chinese_file}")
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='完整维度数据预处理')
+    parser.add_argument('--input', default=DATA_FILE, help='原始数据文件路径')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'只处理新增或内容变化的对话，合并到 {INCREMENTAL_OUTPUT_DIR}')
+    parser.add_argument('--workers', type=int, default=1, help='文本清洗的进程数，大于1时消息按块在多个进程中清洗')
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    args = parse_args()
+    
     print("=" * 50)
     print("回收宝智能客服系统 - 完整维度数据预处理")
     print("=" * 50)
     
     # 当前时间戳，用于区分不同测试结果
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    output_dir = os.path.join(OUTPUT_DIR, f"complete_preprocessing_{timestamp}")
+    if args.incremental:
+        output_dir = INCREMENTAL_OUTPUT_DIR
+    else:
+        output_dir = os.path.join(OUTPUT_DIR, f"complete_preprocessing_{timestamp}")
     
-    print(f"原始数据文件: {DATA_FILE}")
+    print(f"原始数据文件: {args.input}")
     print(f"输出目录: {output_dir}")
     
     # 使用增强版数据预处理函数处理原始数据
     print("\n开始完整维度数据预处理...")
     dialogs = preprocess_data(
-        file_path=DATA_FILE,
+        file_path=args.input,
         output_dir=output_dir,
-        filter_quality=True  # 启用低质量对话过滤
+        filter_quality=True,  # 启用低质量对话过滤
+        chunk_size=CHUNK_SIZE,
+        incremental=args.incremental,
+        workers=args.workers
     )
     
     # 保存预处理结果统计信息
@@ -9,12 +9,14 @@ import jieba
 import numpy as np
 from datetime import datetime
 
+from src.data_processing.export_cache import load_export
+
 def analyze_conversations(file_path, sample_size=1000):
     """深入分析客服对话数据"""
     try:
         # 读取Excel文件
         print(f"正在读取文件: {file_path}")
-        df = pd.read_excel(file_path)
+        df = load_export(file_path)
         print(f"数据加载完成，共 {df.shape[0]} 行，{df.shape[1]} 列")
         
         # 数据预处理
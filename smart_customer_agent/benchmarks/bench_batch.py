@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量聊天接口回放基准测试
+
+生成合成知识库和一批历史问题，在子进程中启动模拟LLM服务和API服务，对比两种回放方式的总耗时：
+  - 逐条调用 /api/chat（离线脚本原来的做法）
+  - 按 --batch-size 分批调用 /api/chat/batch
+两种方式都关闭回答缓存，并核对回答是否一致。
+最后另启动一个不配置LLM的API服务（回答使用兜底内容，排除LLM并发上限造成的排队），在连续处理批量请求期间
+持续发送单条 /api/chat 请求，校验其最长耗时不超过单个批量请求耗时的 --max-stall-ratio 倍：
+批量接口的检索和序列化在独立线程中执行，单条请求不应被挂起到整批处理完成。
+
+用法:
+    python benchmarks/bench_batch.py --questions 2000 --batch-size 500 --ranking semantic
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.load_test import start_api_server  # noqa: E402
+from benchmarks.mock_llm_server import start_mock_server  # noqa: E402
+from benchmarks.synthetic_kb import generate_queries, write_knowledge_base  # noqa: E402
+from src.retrieval.dense_index import build_dense_index  # noqa: E402
+
+
+def replay_sequential(client, queries, ranking):
+    answers = []
+    for business_group, question in queries:
+        response = client.post("/api/chat", json={
+            "business_group": business_group, "message": question, "ranking": ranking})
+        response.raise_for_status()
+        answers.append(response.json()["answer"])
+    return answers
+
+
+def replay_batch(client, queries, ranking, batch_size):
+    answers = []
+    for offset in range(0, len(queries), batch_size):
+        response = client.post("/api/chat/batch", json={
+            "ranking": ranking,
+            "questions": [{"business_group": business_group, "message": question}
+                          for business_group, question in queries[offset:offset + batch_size]]})
+        response.raise_for_status()
+        answers.extend(item["answer"] for item in response.json()["results"])
+    return answers
+
+
+def probe_latencies(client, queries, ranking, stop=None, count=20):
+    """依次发送单条 /api/chat 请求，返回各请求耗时；给定 stop 时一直发送到 stop 被设置"""
+    latencies = []
+    i = 0
+    while (stop is None and i < count) or (stop is not None and not stop.is_set()):
+        business_group, question = queries[i % len(queries)]
+        start = time.perf_counter()
+        client.post("/api/chat", json={
+            "business_group": business_group, "message": question, "ranking": ranking}).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    return latencies
+
+
+def latency_during_batch(api_url, queries, ranking, batch_size, batches):
+    """返回 (空闲时的单条请求耗时, 连续处理 batches 个批量请求期间的单条请求耗时, 各批量请求耗时)"""
+    probe_queries = queries[:20]
+    with httpx.Client(base_url=api_url, timeout=600) as client:
+        idle = probe_latencies(client, probe_queries, ranking)
+        stop = threading.Event()
+        batch_times = []
+
+        def run_batches():
+            with httpx.Client(base_url=api_url, timeout=600) as batch_client:
+                for _ in range(batches):
+                    start = time.perf_counter()
+                    replay_batch(batch_client, queries[:batch_size], ranking, batch_size)
+                    batch_times.append(time.perf_counter() - start)
+            stop.set()
+
+        thread = threading.Thread(target=run_batches)
+        thread.start()
+        busy = probe_latencies(client, probe_queries, ranking, stop=stop)
+        thread.join()
+    return idle, busy, batch_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量聊天接口回放基准测试")
+    parser.add_argument("--questions", type=int, default=2000, help="回放的问题数")
+    parser.add_argument("--batch-size", type=int, default=500, help="每次批量请求的问题数")
+    parser.add_argument("--qa-count", type=int, default=50000, help="合成QA对数量")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="模拟LLM的响应延迟（秒）")
+    parser.add_argument("--ranking", default="keyword", choices=["keyword", "bm25", "semantic"], help="检索方式")
+    parser.add_argument("--latency-batches", type=int, default=5, help="校验单条请求延迟时连续发送的批量请求数")
+    parser.add_argument("--max-stall-ratio", type=float, default=0.5,
+                        help="批量请求处理期间单条请求最长耗时相对单个批量请求耗时的最大比例")
+    args = parser.parse_args()
+
+    queries = generate_queries(args.questions)
+    with tempfile.TemporaryDirectory() as data_dir:
+        print(f"生成合成知识库: {args.qa_count} 条QA对")
+        write_knowledge_base(data_dir, args.qa_count)
+        if args.ranking == "semantic":
+            build_dense_index(f"{data_dir}/knowledge_base", f"{data_dir}/processed", f"{data_dir}/index")
+
+        llm_url, llm_process = start_mock_server(args.llm_latency)
+        api_url, api_process = start_api_server(data_dir, llm_url, workers=1, cache=False)
+        try:
+            with httpx.Client(base_url=api_url, timeout=600) as client:
+                start = time.perf_counter()
+                sequential = replay_sequential(client, queries, args.ranking)
+                sequential_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                batched = replay_batch(client, queries, args.ranking, args.batch_size)
+                batch_time = time.perf_counter() - start
+        finally:
+            api_process.terminate()
+            api_process.wait()
+            llm_process.terminate()
+
+        api_url, api_process = start_api_server(data_dir, None, workers=1, cache=False)
+        try:
+            idle, busy, batch_times = latency_during_batch(
+                api_url, queries, args.ranking, args.batch_size, args.latency_batches)
+        finally:
+            api_process.terminate()
+            api_process.wait()
+
+    mismatches = sum(a != b for a, b in zip(sequential, batched))
+    print(f"\n回放 {len(queries)} 个问题（{args.ranking}，模拟LLM延迟 {args.llm_latency * 1000:.0f}ms）:")
+    print(f"  逐条 /api/chat        {sequential_time:8.2f}s  {len(queries) / sequential_time:8.1f} 问/s")
+    print(f"  批量 /api/chat/batch  {batch_time:8.2f}s  {len(queries) / batch_time:8.1f} 问/s  "
+          f"({sequential_time / batch_time:.1f}x)")
+    print(f"  回答不一致: {mismatches}")
+
+    batch_p50 = statistics.median(batch_times)
+    print(f"\n单条 /api/chat 延迟（不调用LLM，中位数/最大），单个批量请求耗时 {batch_p50 * 1000:.1f}ms:")
+    print(f"  空闲时                {statistics.median(idle) * 1000:8.1f}ms  {max(idle) * 1000:8.1f}ms  ({len(idle)} 次)")
+    print(f"  批量请求处理期间      {statistics.median(busy) * 1000:8.1f}ms  {max(busy) * 1000:8.1f}ms  ({len(busy)} 次)")
+    assert max(busy) <= batch_p50 * args.max_stall_ratio, \
+        f"批量请求处理期间单条请求最长耗时为批量请求耗时的 {max(busy) / batch_p50:.2f} 倍，超过 {args.max_stall_ratio}"
+
+
+if __name__ == "__main__":
+    main()
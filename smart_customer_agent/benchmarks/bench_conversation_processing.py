@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ConversationProcessor 并行处理对话的基准测试
+
+在合成聊天导出上对比：
+  - legacy:     原实现，groupby 后逐个对话 sort_values，逐条消息 iterrows
+  - workers=N:  按 touch_id 切成连续分片，process_conversation_batch 按列数组遍历消息，N 个进程并行
+并校验各种进程数下的对话、QA对和FAQ候选与原实现完全一致（含顺序）。
+进程数超过本机CPU核数时加速比没有意义，输出中会标出。
+
+用法:
+    python benchmarks/bench_conversation_processing.py --conversations 50000 --workers 1 2 4 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_export import generate_chat_export  # noqa: E402
+from src.data_processing.process_conversation_data import ConversationProcessor  # noqa: E402
+
+
+def legacy_process_all(processor, conversations):
+    """原 ConversationProcessor._process_all 的实现（去掉进度条）"""
+    processed_conversations = []
+    qa_pairs = []
+    faq_candidates = []
+
+    for conv_id, group in conversations:
+        conversation = group.sort_values('seq_no')
+        conv_metadata = {
+            'conversation_id': conv_id,
+            'business_group': conversation['group_name'].iloc[0],
+            'start_time': conversation['user_start_time'].iloc[0],
+            'end_time': conversation['user_end_time'].iloc[0],
+            'duration_min': (conversation['user_end_time'].iloc[0] - conversation['user_start_time'].iloc[0]).total_seconds() / 60 if pd.notna(conversation['user_end_time'].iloc[0]) else None,
+            'turn_count': len(conversation)
+        }
+
+        messages = []
+        current_qa_pair = {'question': None, 'answer': None, 'context': []}
+
+        for _, msg in conversation.iterrows():
+            if pd.isna(msg['send_content']):
+                continue
+
+            sender = msg.get('sender_category', '未知')
+            content = msg.get('send_content', '')
+            timestamp = msg.get('send_time', None)
+
+            message = {
+                'sender': sender,
+                'content': content,
+                'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S') if timestamp else None
+            }
+            messages.append(message)
+
+            if sender == '用户' and len(content.strip()) > 0:
+                if current_qa_pair['question'] is not None and current_qa_pair['answer'] is not None:
+                    if len(current_qa_pair['question'].strip()) > 0 and len(current_qa_pair['answer'].strip()) > 0:
+                        qa_pairs.append(current_qa_pair)
+                        if processor.is_faq_candidate(current_qa_pair):
+                            faq_candidates.append(current_qa_pair)
+
+                current_qa_pair = {
+                    'conversation_id': conv_id,
+                    'business_group': conv_metadata['business_group'],
+                    'question': content,
+                    'answer': None,
+                    'context': [],
+                    'intent': processor.classify_intent(content)
+                }
+
+            elif sender == '客服' and current_qa_pair['question'] is not None and current_qa_pair['answer'] is None:
+                current_qa_pair['answer'] = content
+
+            if current_qa_pair['question'] is not None:
+                current_qa_pair['context'].append(message)
+
+        if current_qa_pair['question'] is not None and current_qa_pair['answer'] is not None:
+            if len(current_qa_pair['question'].strip()) > 0 and len(current_qa_pair['answer'].strip()) > 0:
+                qa_pairs.append(current_qa_pair)
+                if processor.is_faq_candidate(current_qa_pair):
+                    faq_candidates.append(current_qa_pair)
+
+        processed_conversations.append({
+            'metadata': conv_metadata,
+            'messages': messages
+        })
+
+    return processed_conversations, qa_pairs, faq_candidates
+
+
+def make_processor(df, output_dir, workers=1):
+    processor = ConversationProcessor("synthetic.xlsx", output_dir, workers=workers)
+    processor.df = processor.prepare_frame(df.copy())
+    return processor
+
+
+class ConversationCollector(list):
+    """代替 RecordWriter 收集 _process_all 写出的对话，计时不包含序列化和写文件"""
+
+    def write_all(self, records):
+        self.extend(records)
+
+
+def run_current(df, output_dir, workers):
+    """返回 (结果, 耗时)；屏蔽进度输出"""
+    processor = make_processor(df, output_dir, workers)
+    conversations = ConversationCollector()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        start = time.perf_counter()
+        _, qa_pairs, faq_candidates = processor._process_all(processor.iter_batches(), conversations)
+        elapsed = time.perf_counter() - start
+    return (conversations, qa_pairs, faq_candidates), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ConversationProcessor 并行处理对话的基准测试")
+    parser.add_argument("--conversations", type=int, default=50000, help="合成对话数（每个对话4-16条消息）")
+    parser.add_argument("--legacy-conversations", type=int, default=5000, help="原实现计时并校验一致性的对话数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="测试的进程数")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as output_dir:
+        # 打乱行顺序，覆盖按 touch_id 排序和对话内按 seq_no 排序的逻辑
+        sample = generate_chat_export(args.legacy_conversations)
+        sample = sample.sample(frac=1, random_state=0).reset_index(drop=True)
+        processor = make_processor(sample, output_dir)
+        start = time.perf_counter()
+        expected = legacy_process_all(processor, processor.df.groupby('touch_id'))
+        legacy_time = time.perf_counter() - start
+        sample_times = {}
+        for workers in args.workers:
+            actual, sample_times[workers] = run_current(sample, output_dir, workers)
+            assert actual == expected, f"workers={workers} 的结果与原实现不一致"
+        print(f"{args.legacy_conversations} 个对话上各进程数的输出与原实现一致")
+
+        print(f"生成 {args.conversations} 个对话...")
+        df = generate_chat_export(args.conversations)
+        times = {workers: run_current(df, output_dir, workers)[1] for workers in args.workers}
+
+    print(f"\n本机CPU核数: {cpu_count}")
+    print(f"  原实现          {args.legacy_conversations:>8} 个对话  {legacy_time:8.2f}s")
+    for workers in args.workers:
+        print(f"  workers={workers:<2}      {args.legacy_conversations:>8} 个对话  {sample_times[workers]:8.2f}s"
+              f"  ({legacy_time / sample_times[workers]:.1f}x)")
+    base = times[args.workers[0]]
+    for workers in args.workers:
+        note = "  （超过CPU核数）" if workers > cpu_count else ""
+        print(f"  workers={workers:<2}      {args.conversations:>8} 个对话  {times[workers]:8.2f}s"
+              f"  相对 workers={args.workers[0]} 加速 {base / times[workers]:.2f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
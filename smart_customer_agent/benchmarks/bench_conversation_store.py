@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+对话存储基准测试
+
+模拟前端的请求方式（每次带上最近5条历史，且包含本次问题），对比：
+  - 原先的模块级字典：历史被反复追加，内存随请求数无限增长
+  - MemoryConversationStore：去重 + 条目数/消息数上限
+  - SQLiteConversationStore：攒批异步写入的吞吐和读取延迟
+
+用法:
+    python benchmarks/bench_conversation_store.py --conversations 5000 --turns 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_kb import generate_question  # noqa: E402
+from src.api.conversation_store import MemoryConversationStore, SQLiteConversationStore  # noqa: E402
+
+
+def generate_requests(conversations, turns, seed=42):
+    """生成按轮次交错的请求：(对话ID, 问题, 回答, prev_messages)"""
+    rng = random.Random(seed)
+    histories = [[] for _ in range(conversations)]
+    requests = []
+    for _ in range(turns):
+        for cid, history in enumerate(histories):
+            question = {"role": "user", "content": generate_question(rng)[1], "created_at": "2024-01-01T00:00:00"}
+            answer = {"role": "assistant", "content": "您好，" + generate_question(rng)[1],
+                      "created_at": "2024-01-01T00:00:00"}
+            history.append(question)
+            requests.append((f"conv-{cid}", question, answer, history[-5:]))
+            history.append(answer)
+    return requests
+
+
+def legacy_store(requests):
+    """原 app.py 的写法：prev_messages 每次都整段追加"""
+    conversations = {}
+    for cid, question, answer, prev in requests:
+        conversation = conversations.setdefault(cid, {"id": cid, "business_group": "回收宝", "messages": []})
+        conversation["messages"].extend(dict(message) for message in prev)
+        conversation["messages"].append(question)
+        conversation["messages"].append(answer)
+    return conversations
+
+
+async def fill_store(store, requests):
+    for cid, question, answer, prev in requests:
+        await store.append(cid, "回收宝", [question], prev_messages=prev)
+        await store.append(cid, "回收宝", [answer])
+
+
+def measure_memory(func):
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024 / 1024
+
+
+async def bench_sqlite(requests, conversations, max_conversations, max_messages):
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = SQLiteConversationStore(os.path.join(data_dir, "conversations.db"),
+                                        max_conversations, max_messages)
+        await store.start()
+        start = time.perf_counter()
+        await fill_store(store, requests)
+        append_time = time.perf_counter() - start
+        await store.flush()
+        flush_time = time.perf_counter() - start
+
+        # 随机读取，缓存容量小于对话数时部分读取需要回库
+        rng = random.Random(0)
+        latencies = []
+        for _ in range(2000):
+            cid = f"conv-{rng.randrange(conversations)}"
+            start = time.perf_counter()
+            await store.get(cid)
+            latencies.append(time.perf_counter() - start)
+        stats = store.stats()
+        await store.close()
+
+    ms = np.array(latencies) * 1000
+    print(f"  SQLite: 追加 {len(requests) * 2 / append_time:,.0f} 条/s（含落盘 {flush_time:.2f}s），"
+          f"{stats['batches']} 个事务写入 {stats['written']} 条")
+    print(f"  SQLite读取: p50 {np.percentile(ms, 50):.3f}ms  p99 {np.percentile(ms, 99):.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对话存储基准测试")
+    parser.add_argument("--conversations", type=int, default=5000, help="对话数")
+    parser.add_argument("--turns", type=int, default=10, help="每个对话的轮数")
+    parser.add_argument("--max-conversations", type=int, default=10000, help="内存中最多保留的对话数")
+    parser.add_argument("--max-messages", type=int, default=200, help="单个对话最多保留的消息数")
+    args = parser.parse_args()
+
+    requests = generate_requests(args.conversations, args.turns)
+    print(f"{args.conversations} 个对话 x {args.turns} 轮 = {len(requests)} 个请求")
+
+    legacy, legacy_mb = measure_memory(lambda: legacy_store(requests))
+    legacy_count = sum(len(c["messages"]) for c in legacy.values())
+    del legacy
+
+    store = MemoryConversationStore(args.max_conversations, args.max_messages)
+    _, store_mb = measure_memory(lambda: asyncio.run(fill_store(store, requests)) or store)
+    store_count = sum(len(entry.messages) for entry in store._data.values())
+
+    print(f"  原字典: {len(requests) // args.turns} 个对话, {legacy_count} 条消息, {legacy_mb:.1f} MB")
+    print(f"  内存存储: {len(store)} 个对话, {store_count} 条消息, {store_mb:.1f} MB "
+          f"(淘汰 {store.evictions})")
+
+    asyncio.run(bench_sqlite(requests, args.conversations, args.max_conversations, args.max_messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+聊天导出列式缓存基准测试
+
+生成合成聊天导出（.xlsx），对比以下读取方式的耗时：
+  - read_excel:  pd.read_excel 整表读取（分析脚本原来的做法）
+  - cold:        load_export 首次读取，包含解析xlsx、类型规范化和写缓存
+  - warm:        load_export 命中缓存，读取全部列
+  - warm+cols:   load_export 命中缓存，只读取 touch_id/sender_type/send_content 三列
+并核对缓存读出的数据与直接读取源文件再规范化类型的结果一致。
+
+用法:
+    python benchmarks/bench_export_cache.py --conversations 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_export import generate_chat_export, write_chat_export  # noqa: E402
+from src.data_processing.export_cache import CACHE_FORMAT, load_export, normalize_export  # noqa: E402
+
+PROJECTED_COLUMNS = ['touch_id', 'sender_type', 'send_content']
+
+
+def timed(func, repeat=1):
+    """返回 (结果, 最短耗时)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聊天导出列式缓存基准测试")
+    parser.add_argument("--conversations", type=int, default=20000, help="合成对话数（每个对话4-16条消息）")
+    parser.add_argument("--input", default=None, help="使用已有的导出文件，不再生成")
+    parser.add_argument("--repeat", type=int, default=3, help="命中缓存时的重复次数，取最短耗时")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = args.input
+        if path is None:
+            path = os.path.join(data_dir, "chat_export.xlsx")
+            print(f"生成合成聊天导出: {args.conversations} 个对话")
+            write_chat_export(generate_chat_export(args.conversations, missing_sender_ratio=0.001), path)
+        print(f"{path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB，缓存格式: {CACHE_FORMAT}")
+        cache_dir = os.path.join(data_dir, "cache")
+
+        original, excel_time = timed(lambda: pd.read_excel(path))
+        cold, cold_time = timed(lambda: load_export(path, cache_dir=cache_dir))
+        warm, warm_time = timed(lambda: load_export(path, cache_dir=cache_dir), args.repeat)
+        projected, projected_time = timed(
+            lambda: load_export(path, columns=PROJECTED_COLUMNS, cache_dir=cache_dir), args.repeat)
+
+    expected = normalize_export(original.copy())
+    pd.testing.assert_frame_equal(warm, expected, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(cold, warm)
+    pd.testing.assert_frame_equal(projected, warm[PROJECTED_COLUMNS])
+
+    print(f"\n{len(warm)} 行:")
+    print(f"  read_excel  {excel_time:8.3f}s")
+    print(f"  cold        {cold_time:8.3f}s")
+    print(f"  warm        {warm_time:8.3f}s  ({excel_time / warm_time:.0f}x)")
+    print(f"  warm+cols   {projected_time:8.3f}s  ({excel_time / projected_time:.0f}x)")
+    print(f"  内存占用: 原始 {original.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB，"
+          f"规范化后 {warm.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
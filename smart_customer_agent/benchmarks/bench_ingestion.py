@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+聊天导出读取方式基准测试
+
+生成合成聊天导出（.xlsx 或 .csv），在独立子进程中分别用以下方式读取并按 touch_id 遍历全部对话，
+统计耗时和进程峰值内存（/proc/self/status 中的 VmHWM）：
+  - full:      pd.read_excel / pd.read_csv 整表读入后 groupby（原做法）
+  - streaming: src.data_processing.ingestion.iter_conversations 按块流式读取
+
+用法:
+    python benchmarks/bench_ingestion.py --conversations 20000 --format xlsx --chunk-size 50000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def run_mode(mode, path, chunk_size):
+    """在当前进程中读取并遍历全部对话，返回 (对话数, 消息数)"""
+    import pandas as pd
+
+    from src.data_processing.ingestion import iter_conversations
+
+    if mode == "full":
+        df = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path)
+        conversations = df.groupby('touch_id')
+    else:
+        conversations = iter_conversations(path, chunk_size=chunk_size)
+
+    count = rows = 0
+    for _, group in conversations:
+        count += 1
+        rows += len(group)
+    return count, rows
+
+
+def peak_memory_mb():
+    """当前进程的峰值RSS（MB）
+
+    不使用 ru_maxrss：Linux下它会继承父进程在fork前的峰值，而VmHWM在exec后重新计算。
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(mode, path, chunk_size):
+    """在子进程中运行，避免前一种方式的内存占用影响峰值统计"""
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--child", mode, "--input", path, "--chunk-size", str(chunk_size)],
+        cwd=PROJECT_ROOT)
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聊天导出读取方式基准测试")
+    parser.add_argument("--conversations", type=int, default=20000, help="合成对话数（每个对话4-16条消息）")
+    parser.add_argument("--format", default="xlsx", choices=["xlsx", "csv"], help="导出文件格式")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="流式读取每块的行数")
+    parser.add_argument("--input", default=None, help="使用已有的导出文件，不再生成")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        start = time.perf_counter()
+        count, rows = run_mode(args.child, args.input, args.chunk_size)
+        print(json.dumps({
+            "conversations": count,
+            "rows": rows,
+            "seconds": time.perf_counter() - start,
+            "peak_mb": peak_memory_mb(),
+        }))
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = args.input
+        if path is None:
+            from benchmarks.synthetic_export import generate_chat_export, write_chat_export
+
+            path = os.path.join(data_dir, f"chat_export.{args.format}")
+            print(f"生成合成聊天导出: {args.conversations} 个对话")
+            write_chat_export(generate_chat_export(args.conversations), path)
+        print(f"{path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        results = {mode: measure(mode, path, args.chunk_size) for mode in ("full", "streaming")}
+
+    full, streaming = results["full"], results["streaming"]
+    assert (full["conversations"], full["rows"]) == (streaming["conversations"], streaming["rows"])
+    print(f"\n{full['conversations']} 个对话，{full['rows']} 条消息:")
+    for mode, result in results.items():
+        print(f"  {mode:<10} {result['seconds']:8.2f}s  峰值内存 {result['peak_mb']:8.1f} MB")
+    print(f"  峰值内存降低 {(1 - streaming['peak_mb'] / full['peak_mb']) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
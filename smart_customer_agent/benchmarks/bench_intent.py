@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+意图分类基准测试
+
+对比原 classify_intent 的 re.search 级联、预编译的 IntentClassifier.classify 逐条分类，
+以及 classify_many 在 pandas Series 上的批量分类，并校验三者结果一致。
+
+用法:
+    python benchmarks/bench_intent.py --messages 1000000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_kb import generate_question  # noqa: E402
+from src.intent.classifier import customer_service_classifier  # noqa: E402
+
+# 聊天中大量出现的短句
+CHAT_PHRASES = ["你好", "您好", "在吗", "好的", "谢谢", "嗯嗯", "收到", "人工", "知道了", "好的谢谢",
+                "没有了", "可以", "行", "稍等", "？", "[图片]", "我看看", "怎么还没到账"]
+
+
+def legacy_classify_intent(question):
+    """原 app.py 中的实现"""
+    question = question.lower()
+    if re.search(r'(订单|单号|我的订单|查(询|一下)订单)', question):
+        return "订单查询"
+    elif re.search(r'(多少钱|价格|价值|回收价|估价|报价)', question):
+        return "价格咨询"
+    elif re.search(r'(怎么|如何|流程|步骤|操作|使用)', question):
+        return "流程咨询"
+    elif re.search(r'(物流|快递|运费|邮费|顺丰|寄|邮寄|收货|发货)', question):
+        return "物流查询"
+    elif re.search(r'(手机|设备|产品|型号|配置|参数)', question):
+        return "产品信息"
+    elif re.search(r'(投诉|不满|差评|退款|维权|不好|问题)', question):
+        return "投诉反馈"
+    elif re.search(r'(你好|您好|在吗|请问|谢谢|感谢)', question):
+        return "问候闲聊"
+    else:
+        return "其他咨询"
+
+
+def generate_messages(count, seed=42):
+    rng = random.Random(seed)
+    return [rng.choice(CHAT_PHRASES) if rng.random() < 0.4 else generate_question(rng)[1]
+            for _ in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="意图分类基准测试")
+    parser.add_argument("--messages", type=int, default=1000000, help="消息数量")
+    args = parser.parse_args()
+
+    messages = pd.Series(generate_messages(args.messages))
+    print(f"{len(messages)} 条消息，其中不同文本 {messages.nunique()} 条")
+
+    legacy, legacy_time = timed(lambda: messages.apply(legacy_classify_intent))
+    single, single_time = timed(lambda: messages.apply(customer_service_classifier.classify))
+    many, many_time = timed(lambda: customer_service_classifier.classify_many(messages))
+
+    assert legacy.equals(single) and legacy.equals(many), "分类结果不一致"
+    print(f"  原级联 re.search   {legacy_time:7.2f}s")
+    print(f"  预编译逐条分类     {single_time:7.2f}s  ({legacy_time / single_time:.1f}x)")
+    print(f"  classify_many      {many_time:7.2f}s  ({legacy_time / many_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
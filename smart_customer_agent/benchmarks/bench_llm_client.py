@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+LLM客户端基准测试
+
+在子进程中启动 mock_llm_server，对比：
+  - 每个请求新建 httpx.AsyncClient（原 ask_claude 中注释掉的写法）
+  - 长连接复用的 LLMClient（连接池 + 并发上限）
+的吞吐和延迟；并在有错误率的场景下统计重试、熔断和兜底次数。
+
+用法:
+    python benchmarks/bench_llm_client.py --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_llm_server import start_mock_server  # noqa: E402
+from src.api.llm_client import CircuitBreaker, LLMClient  # noqa: E402
+
+SYSTEM = "你是一个专业的客服助手。"
+
+
+async def drive(call, total, concurrency):
+    """以固定并发发出 total 个请求，返回 (各请求耗时, 失败数, 总耗时)"""
+    latencies = []
+    failures = 0
+    queue = iter(range(total))
+
+    async def worker():
+        nonlocal failures
+        for i in queue:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures, time.perf_counter() - start
+
+
+def report(name, latencies, failures, elapsed):
+    ms = np.array(latencies) * 1000
+    print(f"  {name:<12} {len(latencies) / elapsed:8.1f} req/s  "
+          f"p50 {np.percentile(ms, 50):7.1f}ms  p99 {np.percentile(ms, 99):7.1f}ms  失败 {failures}")
+
+
+async def bench_per_request_client(base_url, total, concurrency):
+    async def call(i):
+        payload = {"model": "mock", "max_tokens": 100, "system": SYSTEM,
+                   "messages": [{"role": "user", "content": f"问题{i}"}]}
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{base_url}/v1/messages", json=payload,
+                                         headers={"x-api-key": "test"})
+            response.raise_for_status()
+
+    return await drive(call, total, concurrency)
+
+
+async def bench_pooled_client(base_url, total, concurrency, max_concurrency, **kwargs):
+    client = LLMClient("test", base_url=base_url, max_concurrency=max_concurrency, **kwargs)
+    await client.start()
+
+    async def call(i):
+        await client.complete(SYSTEM, [{"role": "user", "content": f"问题{i}"}], max_tokens=100)
+
+    try:
+        return (*await drive(call, total, concurrency), client)
+    finally:
+        await client.close()
+
+
+async def main_async(args):
+    base_url, server = start_mock_server(args.latency, 0.0)
+    print(f"无错误场景: {args.requests} 个请求, 并发 {args.concurrency}, 模拟延迟 {args.latency * 1000:.0f}ms")
+    report("每次新建", *await bench_per_request_client(base_url, args.requests, args.concurrency))
+    *result, _ = await bench_pooled_client(base_url, args.requests, args.concurrency, args.concurrency)
+    report("连接池", *result)
+    server.terminate()
+
+    base_url, server = start_mock_server(args.latency, args.error_rate)
+    print(f"\n错误场景: 错误率 {args.error_rate:.0%}")
+    *result, client = await bench_pooled_client(
+        base_url, args.requests, args.concurrency, args.concurrency,
+        backoff_base=0.05, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1.0))
+    report("连接池", *result)
+    print(f"  重试 {client.retries} 次, 兜底 {result[1]} 次, 熔断器状态 {client.breaker.state}")
+    server.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM客户端基准测试")
+    parser.add_argument("--requests", type=int, default=2000, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=64, help="并发数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务响应延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="错误场景下的错误率")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
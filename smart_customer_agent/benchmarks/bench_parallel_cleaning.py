@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多进程文本清洗（src/data_processing/parallel.py 的 ParallelMap）基准测试
+
+在合成聊天导出的消息内容上，分别用 1/2/4/8 个进程执行各清洗函数：
+  - clean_text:         intent_test/data_preprocessing.py 的文本清洗
+  - clean_many:         intent_test/data_preprocessing.py 的增强清洗（按块调用，块内相同内容只清洗一次）
+  - clean_message_content: smart_service_agent/scripts/data_processing/clean_data.py 的 clean_text + anonymize_sensitive_info
+校验各进程数下的结果与单进程逐条调用完全一致（含顺序），并输出自动确定的分块大小。
+进程数超过本机CPU核数时加速比没有意义，输出中会标出。
+
+用法:
+    python benchmarks/bench_parallel_cleaning.py --messages 1000000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT.parent / "intent_test"))
+sys.path.insert(0, str(PROJECT_ROOT.parent / "smart_service_agent" / "scripts" / "data_processing"))
+
+import clean_data  # noqa: E402
+import data_preprocessing  # noqa: E402
+from benchmarks.synthetic_export import generate_chat_export  # noqa: E402
+from src.data_processing.parallel import ParallelMap  # noqa: E402
+
+# (名称, 函数, 是否按块调用, 单条调用的函数)
+FUNCTIONS = [
+    ("clean_text", data_preprocessing.clean_text, False, data_preprocessing.clean_text),
+    ("clean_many", data_preprocessing.clean_many, True, data_preprocessing.enhanced_content_cleaning),
+    ("clean_message_content", clean_data.clean_message_content, False, clean_data.clean_message_content),
+]
+
+
+def generate_messages(messages, seed=42):
+    """合成导出中的消息内容，缺失为空字符串"""
+    df = generate_chat_export(max(1, messages // 10), seed=seed)
+    return [str(c) if not pd.isna(c) else "" for c in df['send_content'].iloc[:messages]]
+
+
+def run(func, batched, contents, workers):
+    """返回 (结果, 耗时, 分块大小)，计时包含进程池启动和预热"""
+    start = time.perf_counter()
+    with ParallelMap(workers, warmup=(data_preprocessing.clean_text, data_preprocessing.enhanced_content_cleaning,
+                                      clean_data.clean_message_content)) as mapper:
+        result = mapper.map(func, contents, batched=batched)
+    elapsed = time.perf_counter() - start
+    chunk_size = mapper.tune_chunk_size(func, batched, len(contents)) if workers > 1 else len(contents)
+    return result, elapsed, chunk_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程文本清洗基准测试")
+    parser.add_argument("--messages", type=int, default=1000000, help="清洗的消息条数")
+    parser.add_argument("--check-messages", type=int, default=50000, help="与单进程逐条调用校验一致性的消息条数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="测试的进程数")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    sample = generate_messages(args.check_messages)
+    for name, func, batched, single in FUNCTIONS:
+        expected = [single(content) for content in sample]
+        for workers in args.workers:
+            assert run(func, batched, sample, workers)[0] == expected, f"{name} workers={workers} 的结果与单进程不一致"
+    print(f"{args.check_messages} 条消息上各进程数的结果与单进程逐条调用一致")
+
+    print(f"生成 {args.messages} 条消息...")
+    contents = generate_messages(args.messages)
+
+    print(f"\n本机CPU核数: {cpu_count}")
+    for name, func, batched, _ in FUNCTIONS:
+        print(f"{name}:")
+        base = None
+        for workers in args.workers:
+            _, elapsed, chunk_size = run(func, batched, contents, workers)
+            base = base or elapsed
+            note = "  （超过CPU核数）" if workers > cpu_count else ""
+            print(f"  workers={workers:<2}  {len(contents):>9} 条  {elapsed:8.2f}s  {len(contents) / elapsed:>12,.0f} 条/s"
+                  f"  分块 {chunk_size:>7}  相对 workers={args.workers[0]} 加速 {base / elapsed:.2f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+QA数据按业务组预划分的内存与延迟对比
+
+before: 常驻原始QA字典列表，每次请求遍历全部QA并按业务组过滤、逐行重新提取关键词
+after:  加载时按业务组划分为紧凑的 KnowledgeRecord（__slots__，预先转小写），
+        请求只访问本业务组的数据（分别给出组内扫描和倒排索引两种访问方式）
+
+用法:
+    python benchmarks/bench_partition.py --qa-count 500000 --queries 200
+"""
+
+import argparse
+import gc
+import json
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_kb import generate_qa_pairs, generate_queries  # noqa: E402
+from src.retrieval.inverted_index import InvertedIndex  # noqa: E402
+from src.retrieval.loader import partition_qa_data  # noqa: E402
+
+
+def scan_before(question, business_group, qa_data):
+    """原先 search_knowledge_base 中的第二段循环"""
+    results = []
+    for qa in qa_data:
+        if qa['business_group'] == business_group:
+            score = 0
+            keywords = re.findall(r'\w+', question.lower())
+            for kw in keywords:
+                if kw in qa['question'].lower():
+                    score += 1
+            if score > 0:
+                results.append((qa['question'], score / len(keywords) * 0.8))
+    return results
+
+
+def scan_partitioned(question, business_group, qa_groups):
+    """只遍历本业务组的预处理记录"""
+    results = []
+    keywords = re.findall(r'\w+', question.lower())
+    for qa in qa_groups.get(business_group, ()):
+        score = 0
+        for kw in keywords:
+            if kw in qa.question_lower:
+                score += 1
+        if score > 0:
+            results.append((qa.question, score / len(keywords) * 0.8))
+    return results
+
+
+def search_indexed(question, business_group, qa_groups, qa_indexes):
+    """通过倒排索引只访问命中的记录"""
+    keywords = re.findall(r'\w+', question.lower())
+    if business_group not in qa_indexes:
+        return []
+    group_qa = qa_groups[business_group]
+    return [(group_qa[doc_id].question, score / len(keywords) * 0.8)
+            for doc_id, score in qa_indexes[business_group].search(keywords)]
+
+
+def traced(build):
+    """返回 build() 的结果及其常驻内存（MB）"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1024 / 1024
+
+
+def measure(func, queries):
+    latencies = []
+    for business_group, question in queries:
+        start = time.perf_counter()
+        func(question, business_group)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies = np.array(latencies)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QA数据按业务组预划分的内存与延迟对比")
+    parser.add_argument("--qa-count", type=int, default=500000, help="合成QA对数量")
+    parser.add_argument("--queries", type=int, default=200, help="查询次数")
+    args = parser.parse_args()
+
+    print(f"生成合成语料: {args.qa_count} 条QA对")
+    # 通过JSON序列化往返，模拟从 qa_pairs.json 加载得到的独立对象
+    payload = json.dumps(generate_qa_pairs(args.qa_count), ensure_ascii=False)
+
+    qa_data, raw_mb = traced(lambda: json.loads(payload))
+    qa_groups, partition_mb = traced(lambda: partition_qa_data(json.loads(payload)))
+    qa_indexes, index_mb = traced(lambda: {
+        group: InvertedIndex([qa.question_lower for qa in group_qa])
+        for group, group_qa in qa_groups.items()
+    })
+    del payload
+
+    print("\n常驻内存:")
+    print(f"  before 原始QA字典列表:        {raw_mb:8.1f} MB")
+    print(f"  after  按业务组划分的记录:     {partition_mb:8.1f} MB")
+    print(f"  after  倒排索引（额外）:       {index_mb:8.1f} MB")
+
+    queries = generate_queries(args.queries)
+    rows = [
+        ("before 全量扫描+过滤", lambda q, g: scan_before(q, g, qa_data)),
+        ("after  组内扫描", lambda q, g: scan_partitioned(q, g, qa_groups)),
+        ("after  组内倒排索引", lambda q, g: search_indexed(q, g, qa_groups, qa_indexes)),
+    ]
+    print("\n单次查询延迟:")
+    for name, func in rows:
+        p50, p99 = measure(func, queries)
+        print(f"  {name:<16} p50={p50:10.3f}ms  p99={p99:10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
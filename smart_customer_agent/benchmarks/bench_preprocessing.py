@@ -0,0 +1,609 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+意图测试数据预处理（intent_test/data_preprocessing.py）各步骤基准测试
+
+在合成聊天导出上对比原逐行实现与当前向量化实现的耗时，并在较小的数据上校验两者输出完全一致：
+  - extract: extract_structured_info（逐行 re.findall + 按对话整表过滤传播 vs 合并正则 str.extract + groupby传播）
+  - sender:  identify_sender_type（逐行 apply + 按对话整表过滤 iterrows vs 只检查未知消息 + 排序后一次交替推断）
+  - organize: organize_dialogs（groupby 后逐条消息 iterrows、逐个对话逐列 pd.to_numeric
+              vs 一次排序后按对话起止位置切分列数组，按列类型预先确定转换和统计方式）
+  - enhanced: enhanced_content_cleaning（每条消息每个环节现场编译正则、逐个替换标点、逐个匹配表达映射
+              vs 预编译的正则与 str.translate 替换表，跳过不可能匹配的环节，clean_many 对重复内容只清洗一次）
+
+原实现按对话整表过滤（O(行数 × 对话数)）或逐条消息 iterrows，百万行上需要数分钟到数小时，因此只在 --legacy-rows 行上运行，
+当前实现在 --rows 行上单独计时。
+
+用法:
+    python benchmarks/bench_preprocessing.py --stage extract --rows 1000000 --legacy-rows 50000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT.parent / "intent_test"))
+
+import data_preprocessing  # noqa: E402
+from benchmarks.synthetic_export import generate_chat_export  # noqa: E402
+
+# 合成数据覆盖不到的边界情况，追加到校验数据中
+EDGE_CONTENTS = [
+    None, float('nan'), 12345678901, 3.5, "",
+    "顺丰单号 SF123456789CN 请查收",
+    "订单 123456789012345678 物流 1234567890123",
+    "订单号123456789012345678后面紧跟中文",
+    "单号:YT1234567890 运单 ab12345678901",
+    "报价 ¥ 99.5 还是 1200块钱？",
+    "华为 Mate60 Pro 512GB 想卖2000元",
+    "多行\n小米\n14 Ultra 1TB",
+    "iPhone15ProMax 256GB",
+    "全角数字１２３４５６７８９０１２",
+    "EMS 12345678901，另一个 98765432109876",
+]
+
+
+def legacy_extract_structured_info(df):
+    """原 data_preprocessing.py 中的实现"""
+    df['order_number'] = None
+    df['logistics_number'] = None
+    df['product_info'] = None
+    df['price_info'] = None
+
+    order_pattern = r'\b\d{18}\b'
+    logistics_patterns = [
+        r'\b[A-Za-z]{2}\d{9}[A-Za-z]{2}\b',
+        r'\b\d{13}\b',
+        r'\b\d{10,12}\b',
+        r'\b[A-Za-z0-9]{10,15}\b'
+    ]
+    product_patterns = [
+        r'(iPhone\s*\d+\s*[A-Za-z]*\s*[\d]*\s*[A-Za-z]*)',
+        r'(华为|荣耀|小米|OPPO|vivo|三星|魅族|一加)[\s\S]{0,10}?[\w\d]+',
+        r'(\d+GB|\d+TB|\d+寸|\d+英寸)'
+    ]
+    price_pattern = r'(\d+(?:\.\d+)?元|\d+(?:\.\d+)?块钱|\d+(?:\.\d+)?[元块]|\¥\s*\d+(?:\.\d+)?)'
+
+    for idx, row in df.iterrows():
+        content = str(row['send_content']) if not pd.isna(row['send_content']) else ""
+        order_matches = re.findall(order_pattern, content)
+        if order_matches:
+            df.at[idx, 'order_number'] = order_matches[0]
+        for pattern in logistics_patterns:
+            logistics_matches = re.findall(pattern, content)
+            if logistics_matches:
+                if not order_matches or logistics_matches[0] not in order_matches:
+                    df.at[idx, 'logistics_number'] = logistics_matches[0]
+                    break
+        for pattern in product_patterns:
+            product_matches = re.findall(pattern, content)
+            if product_matches:
+                df.at[idx, 'product_info'] = product_matches[0]
+                break
+        price_matches = re.findall(price_pattern, content)
+        if price_matches:
+            df.at[idx, 'price_info'] = price_matches[0]
+
+    for touch_id, group in df.groupby('touch_id'):
+        for col in ['order_number', 'logistics_number', 'product_info', 'price_info']:
+            values = group[col].dropna().unique()
+            if len(values) > 0:
+                df.loc[df['touch_id'] == touch_id, col] = df.loc[df['touch_id'] == touch_id, col].fillna(values[0])
+    return df
+
+
+def legacy_identify_sender_type(df, seed=42):
+    """原 data_preprocessing.py 中的实现，随机分配前设置全局随机种子以便与当前实现对比"""
+    if 'sender_type' not in df.columns:
+        df['sender_type'] = 0
+
+    if 'user_name' in df.columns and 'servicer_name' in df.columns:
+        user_name_mask = df.apply(lambda row: not pd.isna(row['user_name']) and str(row['user_name']) in str(row['send_content']), axis=1)
+        df.loc[user_name_mask & (df['sender_type'] == 0), 'sender_type'] = 1
+        servicer_name_mask = df.apply(lambda row: not pd.isna(row['servicer_name']) and str(row['servicer_name']) in str(row['send_content']), axis=1)
+        df.loc[servicer_name_mask & (df['sender_type'] == 0), 'sender_type'] = 2
+
+    for pattern in data_preprocessing.SERVICER_PATTERNS:
+        pattern_mask = df['send_content'].str.contains(pattern, na=False)
+        df.loc[pattern_mask & (df['sender_type'] == 0), 'sender_type'] = 2
+
+    for touch_id in df['touch_id'].unique():
+        touch_df = df[df['touch_id'] == touch_id].sort_values('seq_no')
+        if touch_df.iloc[0]['sender_type'] == 0:
+            df.loc[touch_df.iloc[0].name, 'sender_type'] = 1
+        prev_sender = None
+        for idx, row in touch_df.iterrows():
+            if row['sender_type'] == 0:
+                if prev_sender == 1:
+                    df.loc[idx, 'sender_type'] = 2
+                elif prev_sender == 2:
+                    df.loc[idx, 'sender_type'] = 1
+            prev_sender = df.loc[idx, 'sender_type']
+
+    if (df['sender_type'] == 0).any():
+        identified_df = df[df['sender_type'] != 0]
+        user_ratio = (identified_df['sender_type'] == 1).mean()
+        unidentified_indices = df[df['sender_type'] == 0].index
+        user_count = int(len(unidentified_indices) * user_ratio)
+        np.random.seed(seed)
+        user_indices = np.random.choice(unidentified_indices, user_count, replace=False)
+        df.loc[user_indices, 'sender_type'] = 1
+        df.loc[df['sender_type'] == 0, 'sender_type'] = 2
+    return df
+
+
+def prepare_sender_input(df, seed=42):
+    """模拟需要推断发送者的数据：部分消息发送者未知（0），少量为系统消息（4）或缺失，部分内容包含用户名/客服名，
+    行顺序打乱以覆盖按对话和序号排序的逻辑"""
+    rng = np.random.RandomState(seed)
+    senders = df['sender_type'].to_numpy(dtype=float, copy=True)
+    draw = rng.rand(len(df))
+    senders[draw < 0.3] = 0
+    senders[(draw >= 0.3) & (draw < 0.31)] = 4
+    senders[(draw >= 0.31) & (draw < 0.315)] = np.nan
+    df['sender_type'] = senders
+
+    contents = df['send_content'].astype(object).to_numpy(copy=True)
+    draw = rng.rand(len(df))
+    for column, low, high in (('user_name', 0, 0.01), ('servicer_name', 0.01, 0.02)):
+        names = df[column].to_numpy()
+        for i in np.flatnonzero((draw >= low) & (draw < high)):
+            contents[i] = f"{names[i]}：{contents[i]}"
+    df['send_content'] = contents
+    return df.iloc[rng.permutation(len(df))]
+
+
+def legacy_organize_dialogs(df):
+    """原 data_preprocessing.py 中的实现"""
+    print("组织对话...")
+
+    # 确保所有必要的列都存在
+    required_columns = ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time']
+    for col in required_columns:
+        if col not in df.columns:
+            raise ValueError(f"缺少必要的列: {col}")
+
+    # 获取所有原始列名
+    original_columns = df.columns.tolist()
+
+    # 按对话ID分组
+    dialogs = []
+    for touch_id, group in df.groupby('touch_id'):
+        # 按消息序号排序
+        group = group.sort_values('seq_no')
+
+        # 创建元数据
+        metadata = {
+            "start_time": group['send_time'].min().strftime('%Y-%m-%d %H:%M:%S') if 'send_time' in group.columns else "",
+            "end_time": group['send_time'].max().strftime('%Y-%m-%d %H:%M:%S') if 'send_time' in group.columns else "",
+        }
+
+        # 添加所有可能有用的元数据字段
+        for col in ['group_name', 'servicer_name', 'user_name', 'new_feedback_name', 'create_time',
+                   'user_start_time', 'user_end_time']:
+            if col in group.columns:
+                # 确保值是JSON可序列化的
+                value = group[col].iloc[0]
+                if pd.isna(value):
+                    metadata[col] = ""
+                else:
+                    # 将numpy类型转换为Python原生类型
+                    if hasattr(value, 'item'):
+                        metadata[col] = value.item()
+                    else:
+                        metadata[col] = str(value)
+
+        # 创建消息列表
+        messages = []
+        for _, row in group.iterrows():
+            message = {
+                "id": str(row.name),
+                "seq_no": float(row['seq_no']),
+                "sender_type": int(row['sender_type']),
+                "content": str(row['send_content']) if not pd.isna(row['send_content']) else "",
+                "clean_content": str(row['clean_content']) if not pd.isna(row['clean_content']) else "",
+                "send_time": row['send_time'].strftime('%Y-%m-%d %H:%M:%S') if not pd.isna(row['send_time']) else ""
+            }
+
+            # 添加结构化信息
+            if 'order_number' in row and not pd.isna(row['order_number']):
+                message["order_number"] = str(row['order_number'])
+
+            if 'logistics_number' in row and not pd.isna(row['logistics_number']):
+                message["logistics_number"] = str(row['logistics_number'])
+
+            if 'product_info' in row and not pd.isna(row['product_info']):
+                message["product_info"] = str(row['product_info'])
+
+            if 'price_info' in row and not pd.isna(row['price_info']):
+                message["price_info"] = str(row['price_info'])
+
+            # 添加其他可能有用的字段
+            for col in original_columns:
+                if col not in ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time',
+                              'order_number', 'logistics_number', 'product_info', 'price_info']:
+                    if col in row and not pd.isna(row[col]):
+                        # 确保值是JSON可序列化的
+                        value = row[col]
+                        if hasattr(value, 'item'):
+                            message[col] = value.item()
+                        else:
+                            message[col] = str(value)
+
+            messages.append(message)
+
+        # 创建对话结构
+        dialog = {
+            "conversation_id": str(touch_id),
+            "metadata": metadata,
+            "messages": messages,
+            "structured_info": {
+                "order_numbers": list(set([msg.get("order_number", "") for msg in messages if "order_number" in msg and msg["order_number"]])),
+                "logistics_numbers": list(set([msg.get("logistics_number", "") for msg in messages if "logistics_number" in msg and msg["logistics_number"]])),
+                "product_infos": list(set([msg.get("product_info", "") for msg in messages if "product_info" in msg and msg["product_info"]])),
+                "price_infos": list(set([msg.get("price_info", "") for msg in messages if "price_info" in msg and msg["price_info"]]))
+            },
+            "original_data": {
+                "total_messages": len(messages),
+                "user_messages": sum(1 for msg in messages if msg["sender_type"] == 1),
+                "service_messages": sum(1 for msg in messages if msg["sender_type"] == 2),
+                "avg_message_length": float(sum(len(msg["content"]) for msg in messages) / max(1, len(messages)))
+            }
+        }
+
+        # 添加原始数据统计
+        for col in original_columns:
+            if col not in ['touch_id', 'seq_no', 'sender_type', 'send_content', 'clean_content', 'send_time']:
+                non_null_values = group[col].dropna()
+                if len(non_null_values) > 0:
+                    # 根据数据类型选择合适的统计方法
+                    try:
+                        # 尝试转换为数值型
+                        numeric_values = pd.to_numeric(non_null_values)
+                        # 确保值是JSON可序列化的
+                        dialog["original_data"][col + "_avg"] = float(numeric_values.mean())
+                        dialog["original_data"][col + "_min"] = float(numeric_values.min())
+                        dialog["original_data"][col + "_max"] = float(numeric_values.max())
+                    except:
+                        # 如果不是数值型，则保存唯一值
+                        unique_values = non_null_values.unique()
+                        if len(unique_values) <= 5:  # 只保存少量唯一值
+                            # 确保所有值都是JSON可序列化的
+                            json_safe_values = []
+                            for v in unique_values:
+                                if hasattr(v, 'item'):
+                                    json_safe_values.append(v.item())
+                                else:
+                                    json_safe_values.append(str(v))
+                            dialog["original_data"][col + "_values"] = json_safe_values
+                        else:
+                            dialog["original_data"][col + "_unique_count"] = int(len(unique_values))
+
+        dialogs.append(dialog)
+
+    print(f"对话组织完成，共 {len(dialogs)} 个对话")
+    return dialogs
+
+
+def prepare_organize_input(df):
+    """模拟组织对话前的数据：消息已清洗（seq_no 为浮点数、有 clean_content），并已提取结构化信息"""
+    df['seq_no'] = df['seq_no'].astype(float)
+    df['clean_content'] = df['send_content'].map(data_preprocessing.clean_text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return data_preprocessing.extract_structured_info(df)
+
+
+
+def legacy_enhanced_content_cleaning(content):
+    """原 data_preprocessing.py 中的实现"""
+    if not content or pd.isna(content):
+        return ""
+
+    # 1. 提取并保留关键业务信息
+    preserved_info = legacy_extract_business_info(content)
+
+    # 2. 移除无关信息
+    cleaned_content = legacy_remove_system_prompts(content)
+    cleaned_content = legacy_remove_format_marks(cleaned_content)
+
+    # 3. 标准化处理
+    cleaned_content = legacy_standardize_punctuation(cleaned_content)
+    cleaned_content = legacy_standardize_expressions(cleaned_content)
+
+    # 4. 恢复关键业务信息
+    final_content = data_preprocessing.restore_business_info(cleaned_content, preserved_info)
+
+    return final_content
+
+
+def legacy_extract_business_info(content):
+    """原 data_preprocessing.py 中的实现"""
+    business_info = {
+        "order_ids": [],
+        "logistics_ids": [],
+        "phone_numbers": [],
+        "product_info": [],
+        "price_info": []
+    }
+
+    # 1. 提取订单号 (通常为18位数字)
+    order_pattern = r'\b\d{18}\b'
+    order_matches = re.findall(order_pattern, content)
+    business_info["order_ids"] = order_matches
+
+    # 2. 提取物流单号 (通常为10-15位数字字母组合)
+    logistics_pattern = r'\b[A-Za-z0-9]{10,15}\b'
+    logistics_matches = re.findall(logistics_pattern, content)
+    # 过滤掉订单号，避免重复
+    logistics_matches = [m for m in logistics_matches if m not in order_matches]
+    business_info["logistics_ids"] = logistics_matches
+
+    # 3. 提取手机号 (11位数字，通常以1开头)
+    phone_pattern = r'\b1[3-9]\d{9}\b'
+    phone_matches = re.findall(phone_pattern, content)
+    business_info["phone_numbers"] = phone_matches
+
+    # 4. 提取产品信息 (包含型号的文本片段)
+    product_patterns = [
+        r'(iPhone\s*\d+\s*[A-Za-z]*\s*[\d]*\s*[A-Za-z]*)',
+        r'(华为|荣耀|小米|OPPO|vivo|三星|魅族|一加)[\s\S]{0,10}?[\w\d]+',
+        r'(\d+GB|\d+TB|\d+寸|\d+英寸)'
+    ]
+
+    for pattern in product_patterns:
+        matches = re.findall(pattern, content)
+        if matches:
+            business_info["product_info"].extend(matches)
+
+    # 5. 提取价格信息
+    price_pattern = r'(\d+(?:\.\d+)?元|\d+(?:\.\d+)?块钱|\d+(?:\.\d+)?[元块]|\¥\s*\d+(?:\.\d+)?)'
+    price_matches = re.findall(price_pattern, content)
+    business_info["price_info"] = price_matches
+
+    return business_info
+
+
+def legacy_remove_system_prompts(content):
+    """原 data_preprocessing.py 中的实现"""
+    # 常见的系统提示模式
+    system_patterns = [
+        r'\[系统提示\].*?\[\/系统提示\]',
+        r'\[系统消息\].*?\[\/系统消息\]',
+        r'\[自动回复\].*?\[\/自动回复\]',
+        r'\[自动消息\].*?\[\/自动消息\]',
+        r'【系统提示】.*?【\/系统提示】',
+        r'【系统消息】.*?【\/系统消息】',
+        r'【自动回复】.*?【\/自动回复】',
+        r'【自动消息】.*?【\/自动消息】'
+    ]
+
+    # 移除系统提示
+    cleaned_content = content
+    for pattern in system_patterns:
+        cleaned_content = re.sub(pattern, '', cleaned_content, flags=re.DOTALL)
+
+    return cleaned_content.strip()
+
+
+def legacy_remove_format_marks(content):
+    """原 data_preprocessing.py 中的实现"""
+    # 常见的格式标记
+    format_patterns = [
+        r'\*\*.*?\*\*',  # Markdown加粗
+        r'\*.*?\*',      # Markdown斜体
+        r'\~\~.*?\~\~',  # Markdown删除线
+        r'\`.*?\`',      # Markdown代码
+        r'\<.*?\>',      # HTML标签
+        r'\[.*?\]\(.*?\)'  # Markdown链接
+    ]
+
+    # 移除格式标记，但保留内容
+    cleaned_content = content
+    for pattern in format_patterns:
+        # 提取内容并替换标记
+        matches = re.findall(pattern, cleaned_content)
+        for match in matches:
+            # 提取标记内的实际内容
+            inner_content = re.sub(r'[\*\~\`\<\>\[\]\(\)]', '', match)
+            cleaned_content = cleaned_content.replace(match, inner_content)
+
+    return cleaned_content.strip()
+
+
+def legacy_standardize_punctuation(content):
+    """原 data_preprocessing.py 中的实现"""
+    # 1. 统一中英文标点
+    punctuation_map = {
+        '，': ',',
+        '。': '.',
+        '！': '!',
+        '？': '?',
+        '；': ';',
+        '：': ':',
+        '"': '"',
+        '"': '"',
+        ''': "'",
+        ''': "'",
+        '（': '(',
+        '）': ')',
+        '【': '[',
+        '】': ']',
+        '《': '<',
+        '》': '>',
+        '—': '-'
+    }
+
+    standardized_content = content
+    for ch_punct, en_punct in punctuation_map.items():
+        standardized_content = standardized_content.replace(ch_punct, en_punct)
+
+    # 2. 处理重复标点
+    standardized_content = re.sub(r'\.{2,}', '...', standardized_content)  # 将多个点替换为省略号
+    standardized_content = re.sub(r'([!?])\1+', r'\1', standardized_content)  # 减少重复的感叹号和问号
+
+    # 3. 确保标点后有空格
+    standardized_content = re.sub(r'([.,!?;:])([\u4e00-\u9fa5a-zA-Z0-9])', r'\1 \2', standardized_content)
+
+    return standardized_content.strip()
+
+
+def legacy_standardize_expressions(content):
+    """原 data_preprocessing.py 中的实现"""
+    # 1. 标准化常见缩写和网络用语
+    expression_map = {
+        r'\b回收宝\b': '回收宝',
+        r'\bhsb\b': '回收宝',
+        r'\b咨询\b': '咨询',
+        r'\b订单\b': '订单',
+        r'\b物流\b': '物流',
+        r'\b快递\b': '快递',
+        r'\b发货\b': '发货',
+        r'\b收货\b': '收货',
+        r'\b退款\b': '退款',
+        r'\b价格\b': '价格',
+        r'\b估价\b': '估价',
+        r'\b检测\b': '检测',
+        r'\b回收\b': '回收',
+        r'\b维修\b': '维修',
+        r'\b换新\b': '换新',
+        r'\b保修\b': '保修',
+        r'\b质量\b': '质量',
+        r'\b售后\b': '售后',
+        r'\b支付\b': '支付',
+        r'\b付款\b': '付款',
+        r'\b取消\b': '取消',
+        r'\b修改\b': '修改',
+        r'\b投诉\b': '投诉',
+        r'\b建议\b': '建议'
+    }
+
+    standardized_content = content
+    for pattern, replacement in expression_map.items():
+        standardized_content = re.sub(pattern, replacement, standardized_content, flags=re.IGNORECASE)
+
+    return standardized_content.strip()
+
+
+# 增强清洗（enhanced_content_cleaning）各环节的边界情况
+ENHANCED_EDGE_CONTENTS = [
+    "[系统提示]请稍候[/系统提示]您好",
+    "【自动回复】您好，现在是非工作时间【/自动回复】订单123456789012345678怎么样了",
+    "[系统消息]外层[自动回复]内层[/系统消息]剩余[/自动回复]结尾",
+    "[自动消息]多行\n提示[/自动消息]用户：hsb靠谱吗",
+    "系统升级中，请稍后再试",
+    "**加粗** *斜体* ~~删除~~ `代码` <b>标签</b> [链接](http://example.com)",
+    "*a*b*c* 和 ** 未闭合",
+    "价格多少钱？？？！！！真的吗。。。。好吧......",
+    "HSB、Hsb 和 hsb123，回收宝hsb",
+    "（括号）【方括号】《书名号》——破折号",
+    "快递单号 YT1234567890 物流怎么查",
+    "订单123456789012345678的价格是多少钱，iPhone 15 Pro 256GB 手机 ¥ 5999",
+    "联系电话13812345678，a,b.c!d?e;f:g",
+    "   ",
+]
+
+
+def prepare_enhanced_input(df):
+    """模拟组织对话后的消息内容（缺失为空字符串，其余转为字符串），追加增强清洗各环节的边界情况"""
+    contents = np.array([str(c) if not pd.isna(c) else "" for c in df['send_content']], dtype=object)
+    for i, content in enumerate(ENHANCED_EDGE_CONTENTS):
+        contents[(i * 37) % len(contents)::len(ENHANCED_EDGE_CONTENTS) * 7] = content
+    df['send_content'] = contents
+    return df
+
+
+def legacy_clean_contents(df):
+    return [legacy_enhanced_content_cleaning(content) for content in df['send_content']]
+
+
+def clean_contents(df):
+    return data_preprocessing.clean_many(df['send_content'].tolist())
+
+
+STAGES = {
+    "extract": (legacy_extract_structured_info, data_preprocessing.extract_structured_info, None),
+    "sender": (legacy_identify_sender_type, data_preprocessing.identify_sender_type, prepare_sender_input),
+    "organize": (legacy_organize_dialogs, data_preprocessing.organize_dialogs, prepare_organize_input),
+    "enhanced": (legacy_clean_contents, clean_contents, prepare_enhanced_input),
+}
+
+
+def generate_rows(rows, seed=42, edge_cases=False, prepare=None):
+    """生成约 rows 行的合成导出，索引不连续以模拟清洗后的数据"""
+    df = generate_chat_export(max(1, rows // 10), seed=seed)
+    df = df.iloc[:rows].copy()
+    if prepare is not None:
+        df = prepare(df)
+    elif edge_cases:
+        # 边界内容轮流替换到各对话的消息中，同一对话可能带多个不同的结构化信息
+        df['send_content'] = df['send_content'].astype(object)
+        for i, content in enumerate(EDGE_CONTENTS):
+            df.iloc[(i * 37) % len(df)::len(EDGE_CONTENTS) * 7, df.columns.get_loc('send_content')] = content
+    df.index = df.index * 2 + 1
+    return df
+
+
+def run(func, df):
+    """运行一个实现，返回 (结果, 耗时)；屏蔽函数内的进度输出"""
+    df = df.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(df)
+        elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def assert_same_output(stage, expected, actual):
+    if stage == "extract":
+        pd.testing.assert_frame_equal(expected, actual)
+        for col in ['order_number', 'logistics_number', 'product_info', 'price_info']:
+            # 缺失值同为None，而不是NaN
+            assert [repr(v) for v in expected[col]] == [repr(v) for v in actual[col]], col
+    elif stage == "sender":
+        pd.testing.assert_frame_equal(expected, actual)
+    elif stage == "enhanced":
+        assert expected == actual
+    elif stage == "organize":
+        # 写出的JSON逐字节一致（同一进程内由相同顺序构建的集合，转为列表后顺序也相同）
+        assert json.dumps(expected, ensure_ascii=False) == json.dumps(actual, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据预处理各步骤基准测试")
+    parser.add_argument("--stage", default="extract", choices=sorted(STAGES), help="测试的预处理步骤")
+    parser.add_argument("--rows", type=int, default=1000000, help="当前实现计时的消息行数")
+    parser.add_argument("--legacy-rows", type=int, default=50000, help="原实现计时并校验一致性的消息行数")
+    args = parser.parse_args()
+
+    legacy, current, prepare = STAGES[args.stage]
+
+    sample = generate_rows(args.legacy_rows, edge_cases=True, prepare=prepare)
+    expected, legacy_time = run(legacy, sample)
+    actual, current_small_time = run(current, sample)
+    assert_same_output(args.stage, expected, actual)
+    print(f"{args.stage}: {len(sample)} 行上输出一致")
+
+    print(f"生成 {args.rows} 行合成数据...")
+    df = generate_rows(args.rows, prepare=prepare)
+    _, current_time = run(current, df)
+
+    print(f"\n{args.stage}:")
+    print(f"  原实现   {len(sample):>9} 行  {legacy_time:9.2f}s  {len(sample) / legacy_time:>12,.0f} 行/s")
+    print(f"  当前实现 {len(sample):>9} 行  {current_small_time:9.2f}s  {len(sample) / current_small_time:>12,.0f} 行/s"
+          f"  ({legacy_time / current_small_time:.0f}x)")
+    print(f"  当前实现 {len(df):>9} 行  {current_time:9.2f}s  {len(df) / current_time:>12,.0f} 行/s")
+
+
+if __name__ == "__main__":
+    main()
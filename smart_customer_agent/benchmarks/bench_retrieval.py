@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+知识库检索微基准测试
+
+对比倒排索引检索（search_knowledge_base）与原先线性扫描实现的 p50/p99 延迟，
+并校验两者返回结果完全一致；同时给出BM25排序模式的延迟作为参考。
+
+用法:
+    python benchmarks/bench_retrieval.py --qa-count 50000 --queries 2000
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_kb import generate_queries, write_knowledge_base  # noqa: E402
+from src.api import app as app_module  # noqa: E402
+from src.retrieval.loader import load_faqs, load_qa_data  # noqa: E402
+
+
+def scan_knowledge_base(question, business_group, faqs, qa_data, top_k=3):
+    """原先的线性扫描实现，作为基准对照"""
+    results = []
+    intent = app_module.classify_intent(question)
+
+    if business_group in faqs:
+        keywords = re.findall(r'\w+', question.lower())
+        for faq in faqs[business_group]:
+            score = 0
+            for kw in keywords:
+                if kw in faq['question'].lower():
+                    score += 1
+            if score > 0:
+                results.append({
+                    'question': faq['question'],
+                    'answer': faq['answer'],
+                    'score': score / len(keywords),
+                    'intent': faq.get('intent', intent),
+                    'business_group': business_group
+                })
+
+    if len(results) < top_k:
+        for qa in qa_data:
+            if qa['business_group'] == business_group:
+                score = 0
+                keywords = re.findall(r'\w+', question.lower())
+                for kw in keywords:
+                    if kw in qa['question'].lower():
+                        score += 1
+                if score > 0:
+                    results.append({
+                        'question': qa['question'],
+                        'answer': qa['answer'],
+                        'score': score / len(keywords) * 0.8,
+                        'intent': qa.get('intent', intent),
+                        'business_group': business_group
+                    })
+
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results[:top_k]
+
+
+def measure(func, queries):
+    """逐条执行查询，返回每次调用的耗时（毫秒）和结果"""
+    latencies = []
+    outputs = []
+    for business_group, question in queries:
+        start = time.perf_counter()
+        outputs.append(func(question, business_group))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies), outputs
+
+
+def report(name, latencies):
+    print(f"{name:<10} p50={np.percentile(latencies, 50):8.3f}ms  "
+          f"p99={np.percentile(latencies, 99):8.3f}ms  "
+          f"mean={latencies.mean():8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库检索微基准测试")
+    parser.add_argument("--qa-count", type=int, default=50000, help="合成QA对数量")
+    parser.add_argument("--faq-per-group", type=int, default=200, help="每个业务组的FAQ数量")
+    parser.add_argument("--queries", type=int, default=2000, help="查询次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        print(f"生成合成知识库: {args.qa_count} 条QA对")
+        write_knowledge_base(data_dir, args.qa_count, args.faq_per_group)
+        app_module.KB_DIR = Path(data_dir) / "knowledge_base"
+        app_module.PROCESSED_DIR = Path(data_dir) / "processed"
+
+        start = time.perf_counter()
+        app_module.load_knowledge_base()
+        print(f"知识库加载及索引构建耗时: {time.perf_counter() - start:.2f}s")
+
+        # 线性扫描基准使用原始的字典结构
+        faqs = load_faqs(app_module.KB_DIR)
+        qa_data = load_qa_data(app_module.PROCESSED_DIR)
+
+    queries = generate_queries(args.queries)
+
+    scan_latencies, scan_outputs = measure(
+        lambda q, g: scan_knowledge_base(q, g, faqs, qa_data), queries)
+    index_latencies, index_outputs = measure(app_module.search_knowledge_base, queries)
+    bm25_latencies, _ = measure(
+        lambda q, g: app_module.search_knowledge_base(q, g, ranking="bm25"), queries)
+
+    mismatches = sum(a != b for a, b in zip(scan_outputs, index_outputs))
+    report("scan", scan_latencies)
+    report("index", index_latencies)
+    report("bm25", bm25_latencies)
+    print(f"p50加速比: {np.percentile(scan_latencies, 50) / np.percentile(index_latencies, 50):.1f}x")
+    print(f"结果不一致的查询数: {mismatches}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
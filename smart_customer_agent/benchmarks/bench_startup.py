@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+知识库启动加载耗时基准测试
+
+对比从 JSON（faq_*.json + qa_pairs.json）与从二进制快照（kb_snapshot.bin）加载知识条目的耗时。
+默认只计时数据加载阶段；加 --full 时额外计时包含全部索引构建的 KnowledgeBase.build。
+
+用法:
+    python benchmarks/bench_startup.py --qa-count 1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.synthetic_kb import generate_faqs, generate_qa_pairs  # noqa: E402
+from src.retrieval.knowledge_base import KnowledgeBase  # noqa: E402
+from src.retrieval.loader import (  # noqa: E402
+    knowledge_base_fingerprint, load_faqs, load_qa_data, partition_qa_data, to_records
+)
+from src.retrieval.snapshot import SNAPSHOT_FILE, read_snapshot, write_snapshot  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def load_from_json(kb_dir, processed_dir):
+    faqs = {group: to_records(group_faqs) for group, group_faqs in load_faqs(kb_dir).items()}
+    return faqs, partition_qa_data(load_qa_data(processed_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库启动加载耗时基准测试")
+    parser.add_argument("--qa-count", type=int, default=1000000, help="合成QA对数量")
+    parser.add_argument("--full", action="store_true", help="同时计时包含索引构建的完整启动")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        kb_dir = os.path.join(data_dir, "knowledge_base")
+        processed_dir = os.path.join(data_dir, "processed")
+        os.makedirs(kb_dir)
+        os.makedirs(processed_dir)
+
+        print(f"生成合成知识库: {args.qa_count} 条QA对")
+        qa_pairs = generate_qa_pairs(args.qa_count)
+        for group, group_faqs in generate_faqs(qa_pairs).items():
+            with open(os.path.join(kb_dir, f"faq_{group}.json"), 'w', encoding='utf-8') as f:
+                json.dump(group_faqs, f, ensure_ascii=False, indent=2)
+        # 与 ConversationProcessor.save_results 的输出格式保持一致
+        with open(os.path.join(processed_dir, "qa_pairs.json"), 'w', encoding='utf-8') as f:
+            json.dump(qa_pairs, f, ensure_ascii=False, indent=2)
+
+        snapshot_file = os.path.join(processed_dir, SNAPSHOT_FILE)
+        fingerprint = knowledge_base_fingerprint(kb_dir, processed_dir)
+        _, write_time = timed(lambda: write_snapshot(snapshot_file, load_faqs(kb_dir), qa_pairs, fingerprint))
+        del qa_pairs
+
+        json_size = os.path.getsize(os.path.join(processed_dir, "qa_pairs.json"))
+        print(f"qa_pairs.json: {json_size / 1024 / 1024:.1f} MB, "
+              f"{SNAPSHOT_FILE}: {os.path.getsize(snapshot_file) / 1024 / 1024:.1f} MB "
+              f"(写出耗时 {write_time:.2f}s)")
+
+        (json_faqs, json_qa), json_time = timed(lambda: load_from_json(kb_dir, processed_dir))
+        (snap_faqs, snap_qa), snap_time = timed(lambda: read_snapshot(snapshot_file, fingerprint))
+        assert sum(map(len, json_qa.values())) == sum(map(len, snap_qa.values()))
+        del json_faqs, json_qa, snap_faqs, snap_qa
+
+        print("\n数据加载耗时:")
+        print(f"  JSON    {json_time:8.2f}s")
+        print(f"  快照    {snap_time:8.2f}s  ({json_time / snap_time:.1f}x)")
+
+        if args.full:
+            _, snap_full = timed(lambda: KnowledgeBase.build(kb_dir, processed_dir, data_dir))
+            os.remove(snapshot_file)
+            _, json_full = timed(lambda: KnowledgeBase.build(kb_dir, processed_dir, data_dir))
+            print("\n完整启动耗时（含索引构建）:")
+            print(f"  JSON    {json_full:8.2f}s")
+            print(f"  快照    {snap_full:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+流式接口首字节时间基准测试
+
+在子进程中启动流式模拟LLM服务和API服务，对比 /api/chat 与 /api/chat/stream：
+  - 首字节时间（TTFB）：发出请求到收到响应体第一个字节
+  - 首字时间：发出请求到收到第一个回答文本（流式接口的第一个 token 事件）
+  - 总耗时
+每个请求使用不同的问题，避免命中回答缓存。
+
+用法:
+    python benchmarks/bench_streaming.py --requests 50 --latency 0.3 --token-delay 0.02
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_llm_server import free_port, start_mock_server, wait_until_ready  # noqa: E402
+
+
+def start_api_server(llm_base_url):
+    """在子进程中启动API服务，LLM指向模拟服务"""
+    port = free_port()
+    env = dict(os.environ, ANTHROPIC_API_KEY="test", ANTHROPIC_BASE_URL=llm_base_url)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.app:app", "--port", str(port), "--log-level", "error"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_ready(f"{base_url}/", process)
+    return base_url, process
+
+
+def measure_blocking(client, question):
+    start = time.perf_counter()
+    with client.stream("POST", "/api/chat", json={"business_group": "回收宝", "message": question}) as response:
+        response.raise_for_status()
+        ttfb = None
+        for _ in response.iter_bytes():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+    total = time.perf_counter() - start
+    # 阻塞接口的首字与首字节同时到达
+    return ttfb, ttfb, total
+
+
+def measure_streaming(client, question):
+    start = time.perf_counter()
+    ttfb = first_token = None
+    with client.stream("POST", "/api/chat/stream", json={"business_group": "回收宝", "message": question}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+    return ttfb, first_token, time.perf_counter() - start
+
+
+def report(name, samples):
+    ms = np.array(samples) * 1000
+    print(f"  {name:<16}", "  ".join(
+        f"{label} p50 {np.percentile(ms[:, i], 50):7.1f}ms p99 {np.percentile(ms[:, i], 99):7.1f}ms"
+        for i, label in enumerate(("首字节", "首字", "总耗时"))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式接口首字节时间基准测试")
+    parser.add_argument("--requests", type=int, default=50, help="每个接口的请求数")
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟LLM开始输出前的耗时（秒）")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="模拟LLM每个字的生成间隔（秒）")
+    args = parser.parse_args()
+
+    llm_url, llm_process = start_mock_server(args.latency, token_delay=args.token_delay)
+    api_url, api_process = start_api_server(llm_url)
+    try:
+        with httpx.Client(base_url=api_url, timeout=60) as client:
+            blocking = [measure_blocking(client, f"阻塞问题{i}的回收价格") for i in range(args.requests)]
+            streaming = [measure_streaming(client, f"流式问题{i}的回收价格") for i in range(args.requests)]
+    finally:
+        api_process.terminate()
+        llm_process.terminate()
+
+    print(f"{args.requests} 个请求, 模拟LLM首字延迟 {args.latency * 1000:.0f}ms, "
+          f"每字 {args.token_delay * 1000:.0f}ms")
+    report("/api/chat", blocking)
+    report("/api/chat/stream", streaming)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+API服务压测脚本
+
+1. 生成与 qa_pairs.json 同结构的合成知识库
+2. 在子进程中启动模拟LLM服务（可配置延迟）和 N 个worker的API服务
+3. 以固定速率（开环，不因服务变慢而降速）向 /api/chat 发送合成的中文问题
+4. 统计吞吐、p50/p95/p99 延迟、错误数以及压测前后服务进程树的内存（RSS/PSS）增长
+5. 结果保存为JSON；指定 --baseline 时与之前的结果逐项对比
+
+用法:
+    python benchmarks/load_test.py --workers 1,2,4 --rate 200 --duration 30
+    python benchmarks/load_test.py --workers 2 --baseline benchmarks/results/load_test_20240101_120000.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_llm_server import free_port, start_mock_server, wait_until_ready  # noqa: E402
+from benchmarks.synthetic_kb import generate_queries, write_knowledge_base  # noqa: E402
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+
+
+def _read_kb(path, field):
+    with open(path) as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def process_tree_memory(pid):
+    """进程及其全部子进程的 (RSS, PSS) 之和（MB），仅支持Linux的/proc
+
+    多worker共享父进程预加载的内存页时，RSS会把共享页重复计入每个进程，
+    PSS按共享进程数分摊，更接近实际占用；内核不提供smaps_rollup时PSS按RSS计。
+    """
+    rss = pss = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            process_rss = _read_kb(f"/proc/{current}/status", "VmRSS:")
+            rss += process_rss
+            try:
+                pss += _read_kb(f"/proc/{current}/smaps_rollup", "Pss:")
+            except (FileNotFoundError, PermissionError):
+                pss += process_rss
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return rss / 1024, pss / 1024
+
+
+def start_api_server(data_dir, llm_base_url, workers, cache):
+    """在子进程中通过 run.py 启动API服务，等待就绪检查通过；llm_base_url 为None时不配置LLM，回答使用兜底内容"""
+    port = free_port()
+    env = dict(os.environ, AGENT_DATA_DIR=str(data_dir), LLM_MAX_CONCURRENCY="64")
+    if llm_base_url is None:
+        env["ANTHROPIC_API_KEY"] = ""
+    else:
+        env.update(ANTHROPIC_API_KEY="test", ANTHROPIC_BASE_URL=llm_base_url)
+    if not cache:
+        env["RESPONSE_CACHE_SIZE"] = "0"
+    process = subprocess.Popen(
+        [sys.executable, "run.py", "api", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers)],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_ready(f"{base_url}/ready", process, attempts=600)
+    return base_url, process
+
+
+async def run_load(base_url, queries, rate, duration, max_in_flight, ranking):
+    """以固定速率发送请求，返回 (各请求耗时, 错误数, 实际总耗时)"""
+    total = int(rate * duration)
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def send(i):
+            nonlocal errors
+            business_group, question = queries[i % len(queries)]
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/chat", json={
+                        "business_group": business_group, "message": question, "ranking": ranking})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        tasks = []
+        for i in range(total):
+            # 开环：按计划时间发出，不等待之前的请求完成
+            delay = begin + i / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(i)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - begin
+
+    return latencies, errors, elapsed
+
+
+def summarize(workers, latencies, errors, elapsed, memory_before, memory_after):
+    (rss_before, pss_before), (rss_after, pss_after) = memory_before, memory_after
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "workers": workers,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+        "pss_before_mb": pss_before,
+        "pss_after_mb": pss_after,
+        "pss_growth_mb": pss_after - pss_before,
+    }
+
+
+def print_run(run):
+    print(f"  workers={run['workers']:<3} {run['throughput']:8.1f} req/s  "
+          f"p50 {run['p50_ms']:7.1f}ms  p95 {run['p95_ms']:7.1f}ms  p99 {run['p99_ms']:7.1f}ms  "
+          f"错误 {run['errors']}  RSS {run['rss_before_mb']:.0f} -> {run['rss_after_mb']:.0f} MB  "
+          f"PSS {run['pss_before_mb']:.0f} -> {run['pss_after_mb']:.0f} MB")
+
+
+def compare_with_baseline(runs, baseline_path):
+    """与之前保存的结果按worker数逐项对比"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {run["workers"]: run for run in json.load(f)["runs"]}
+    print(f"\n与基线 {baseline_path} 对比:")
+    for run in runs:
+        base = baseline.get(run["workers"])
+        if base is None:
+            print(f"  workers={run['workers']}: 基线中无对应结果")
+            continue
+        deltas = "  ".join(
+            f"{key} {(run[key] - base[key]) / base[key] * 100:+.1f}%" if base[key] else f"{key} n/a"
+            for key in ("throughput", "p50_ms", "p99_ms", "rss_after_mb", "pss_after_mb") if key in base)
+        print(f"  workers={run['workers']:<3} {deltas}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API服务压测")
+    parser.add_argument("--workers", default="1", help="worker数，多个用逗号分隔，如 1,2,4")
+    parser.add_argument("--qa-count", type=int, default=50000, help="合成QA对数量")
+    parser.add_argument("--rate", type=float, default=100, help="每秒发送的请求数")
+    parser.add_argument("--duration", type=float, default=20, help="每轮压测时长（秒）")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="客户端最大并发请求数")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="模拟LLM的响应延迟（秒）")
+    parser.add_argument("--ranking", default="keyword", choices=["keyword", "bm25", "semantic"], help="检索方式")
+    parser.add_argument("--cache", action="store_true", help="启用回答缓存（默认关闭，测量完整链路）")
+    parser.add_argument("--output", default=None, help="结果JSON路径，默认写入 benchmarks/results/")
+    parser.add_argument("--baseline", default=None, help="用于对比的历史结果JSON")
+    args = parser.parse_args()
+
+    worker_counts = [int(value) for value in args.workers.split(",")]
+    queries = generate_queries(max(1000, int(args.rate * args.duration)))
+    runs = []
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        print(f"生成合成知识库: {args.qa_count} 条QA对")
+        write_knowledge_base(data_dir, args.qa_count)
+        llm_url, llm_process = start_mock_server(args.llm_latency)
+        try:
+            print(f"压测: {args.rate:.0f} req/s x {args.duration:.0f}s, 模拟LLM延迟 {args.llm_latency * 1000:.0f}ms")
+            for workers in worker_counts:
+                api_url, api_process = start_api_server(data_dir, llm_url, workers, args.cache)
+                try:
+                    # 预热，避免首批请求的连接建立和惰性初始化计入结果
+                    asyncio.run(run_load(api_url, queries, min(args.rate, 20), 1, args.max_in_flight, args.ranking))
+                    memory_before = process_tree_memory(api_process.pid)
+                    latencies, errors, elapsed = asyncio.run(run_load(
+                        api_url, queries, args.rate, args.duration, args.max_in_flight, args.ranking))
+                    memory_after = process_tree_memory(api_process.pid)
+                finally:
+                    api_process.terminate()
+                    api_process.wait()
+                run = summarize(workers, latencies, errors, elapsed, memory_before, memory_after)
+                runs.append(run)
+                print_run(run)
+        finally:
+            llm_process.terminate()
+
+    result = {
+        "created_at": datetime.datetime.now().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "runs": runs,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"load_test_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    if args.baseline:
+        compare_with_baseline(runs, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟的 Anthropic Messages API 服务
+
+用于 LLMClient 的联调和压测：可配置响应延迟和错误率，错误随机返回 429（带 Retry-After）或 503。
+请求体中 stream 为 true 时按 Messages API 的SSE格式逐字输出，--token-delay 控制每个字的生成间隔；
+非流式请求在全部"生成"完成后才返回，便于对比两种接口的首字节时间。
+
+用法:
+    python benchmarks/mock_llm_server.py --port 8100 --latency 0.2 --error-rate 0.1
+    python benchmarks/mock_llm_server.py --port 8100 --latency 0.3 --token-delay 0.02
+    ANTHROPIC_API_KEY=test ANTHROPIC_BASE_URL=http://127.0.0.1:8100 python run.py api
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def sse_event(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps({'type': event_type, **data}, ensure_ascii=False)}\n\n"
+
+
+async def stream_events(message_id, model, text, token_delay):
+    """按 Messages API 流式响应的事件顺序逐字输出"""
+    yield sse_event("message_start", {"message": {"id": message_id, "type": "message", "role": "assistant",
+                                                  "model": model, "content": []}})
+    yield sse_event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+    for char in text:
+        await asyncio.sleep(token_delay)
+        yield sse_event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": char}})
+    yield sse_event("content_block_stop", {"index": 0})
+    yield sse_event("message_delta", {"delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(text)}})
+    yield sse_event("message_stop", {})
+
+
+def create_app(latency=0.2, error_rate=0.0, seed=None, token_delay=0.0):
+    """创建模拟服务
+
+    Args:
+        latency: 每个请求开始输出前的模拟耗时（秒）
+        error_rate: 返回 429/503 的概率
+        seed: 随机种子
+        token_delay: 每个字的模拟生成间隔（秒）
+
+    Returns:
+        FastAPI应用
+    """
+    rng = random.Random(seed)
+    mock_app = FastAPI(title="Mock Anthropic API")
+    mock_app.state.requests = 0
+
+    @mock_app.post("/v1/messages")
+    async def messages(request: Request):
+        mock_app.state.requests += 1
+        body = await request.json()
+        await asyncio.sleep(latency)
+
+        if rng.random() < error_rate:
+            if rng.random() < 0.5:
+                return JSONResponse(status_code=429, headers={"retry-after": "0"},
+                                    content={"type": "error", "error": {"type": "rate_limit_error"}})
+            return JSONResponse(status_code=503,
+                                content={"type": "error", "error": {"type": "overloaded_error"}})
+
+        question = body["messages"][-1]["content"]
+        text = f"您好，关于“{question}”，这是模拟的回答。"
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        if body.get("stream"):
+            return StreamingResponse(stream_events(message_id, body.get("model"), text, token_delay),
+                                     media_type="text/event-stream")
+
+        await asyncio.sleep(token_delay * len(text))
+        return {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(str(body["messages"])), "output_tokens": 20},
+        }
+
+    return mock_app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, process, attempts=100):
+    """等待子进程中的服务可以响应请求"""
+    for _ in range(attempts):
+        try:
+            httpx.get(url)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"服务启动失败: {url}")
+
+
+def start_mock_server(latency, error_rate=0.0, seed=0, token_delay=0.0):
+    """在子进程中启动模拟服务（避免与压测客户端争用GIL），返回 (base_url, 进程)"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--port", str(port), "--latency", str(latency),
+         "--error-rate", str(error_rate), "--seed", str(seed), "--token-delay", str(token_delay)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_ready(f"{base_url}/docs", process)
+    return base_url, process
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本地模拟的 Anthropic Messages API 服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8100, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟生成耗时（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回429/503的概率")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="每个字的模拟生成间隔（秒）")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.error_rate, args.seed, args.token_delay),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
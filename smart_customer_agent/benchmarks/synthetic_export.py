@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+合成聊天导出生成器
+
+生成与客服系统导出的会话明细（merged_chat_records.xlsx）列结构一致的模拟数据，
+每行一条消息，同一对话的消息连续排列，供数据处理相关的基准测试使用。
+"""
+
+import datetime
+import random
+
+import pandas as pd
+
+from benchmarks.synthetic_kb import BUSINESS_GROUPS, DEVICES, generate_question
+
+EXPORT_COLUMNS = ["touch_id", "user_name", "servicer_name", "group_name", "user_start_time", "user_end_time",
+                  "create_time", "seq_no", "send_time", "sender_type", "send_content"]
+
+SERVICERS = ["客服小回", "客服小宝", "客服阿杰", "客服小美", "客服小林"]
+
+GREETING = "您好，欢迎咨询回收宝客服，请问有什么可以帮到您？"
+
+AGENT_REPLIES = [
+    "好的呢，马上为您查询订单，请您稍等2-3分钟",
+    "您好，{device}目前回收价格在{price}元左右，具体以验货结果为准",
+    "亲，已经为您催促验货，请耐心等待",
+    "物流单号{logistics}已签收，正在安排验货",
+    "请问还有其他问题吗？祝您生活愉快",
+    "感谢您的咨询，很高兴为您服务",
+    "您可以在APP订单详情页查看进度：https://www.huishoubao.com/order",
+]
+
+USER_EXTRAS = [
+    "订单号:{order}",
+    "物流单号是{logistics}",
+    "能给{price}块钱吗",
+    "{device} 256GB 成色九成新",
+    "[图片]",
+    "好的",
+]
+
+
+def _fill(template, rng):
+    return template.format(
+        device=rng.choice(DEVICES),
+        order=str(rng.randint(10 ** 17, 10 ** 18 - 1)),
+        logistics="SF" + str(rng.randint(10 ** 12, 10 ** 13 - 1)),
+        price=rng.randint(100, 8000),
+    )
+
+
+def generate_chat_export(conversations, seed=42, min_messages=4, max_messages=16, missing_sender_ratio=0.0):
+    """生成合成聊天导出
+
+    Args:
+        conversations: 对话数
+        seed: 随机种子
+        min_messages: 每个对话的最少消息数
+        max_messages: 每个对话的最多消息数
+        missing_sender_ratio: sender_type缺失的消息比例，用于测试发送者类型推断
+
+    Returns:
+        DataFrame，列为 EXPORT_COLUMNS
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 3, 1, 9, 0, 0)
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    touch_id = 10167147480000
+
+    for _ in range(conversations):
+        touch_id += rng.randint(1, 50)
+        group_name = rng.choice(BUSINESS_GROUPS)
+        servicer_name = rng.choice(SERVICERS)
+        user_name = f"用户{rng.randint(100000, 999999)}"
+        user_start = start + datetime.timedelta(seconds=rng.randint(0, 30 * 86400))
+        count = rng.randint(min_messages, max_messages)
+        send_times = [user_start + datetime.timedelta(seconds=15 * i + rng.randint(0, 14)) for i in range(count)]
+        user_end = send_times[-1] + datetime.timedelta(seconds=rng.randint(1, 60))
+
+        for seq_no, send_time in enumerate(send_times, 1):
+            if seq_no == 1:
+                sender_type, content = 2, GREETING
+            elif seq_no % 2 == 0:
+                sender_type = 1
+                content = generate_question(rng)[1] if rng.random() < 0.7 else _fill(rng.choice(USER_EXTRAS), rng)
+            else:
+                sender_type, content = 2, _fill(rng.choice(AGENT_REPLIES), rng)
+            if missing_sender_ratio and rng.random() < missing_sender_ratio:
+                sender_type = None
+
+            columns["touch_id"].append(touch_id)
+            columns["user_name"].append(user_name)
+            columns["servicer_name"].append(servicer_name)
+            columns["group_name"].append(group_name)
+            columns["user_start_time"].append(user_start)
+            columns["user_end_time"].append(user_end)
+            columns["create_time"].append(user_start)
+            columns["seq_no"].append(seq_no)
+            columns["send_time"].append(send_time)
+            columns["sender_type"].append(sender_type)
+            columns["send_content"].append(content)
+
+    df = pd.DataFrame(columns)
+    if not missing_sender_ratio:
+        df["sender_type"] = df["sender_type"].astype(int)
+    return df
+
+
+def write_chat_export(df, path):
+    """把合成导出写为 .csv 或 .xlsx
+
+    .xlsx 使用openpyxl的只写模式逐行写出，百万行级别也不需要在内存中构建整个工作簿。
+    """
+    path = str(path)
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+        return
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if pd.isna(value) else value for value in row])
+    workbook.save(path)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+合成知识库生成器
+
+生成与 processed/qa_pairs.json、knowledge_base/faq_*.json 结构一致的模拟数据，
+供各基准测试脚本使用，避免依赖真实的客服对话数据。
+"""
+
+import json
+import os
+import random
+
+BUSINESS_GROUPS = ["回收宝验货宝技能组", "邮寄回收-回收宝", "上门到店回收"]
+
+DEVICES = ["iPhone 13", "iPhone 14 Pro", "华为Mate 60", "小米14", "OPPO Find X6", "vivo X90",
+           "iPad Air", "MacBook Pro", "Apple Watch", "华为平板", "荣耀Magic5", "三星S23"]
+
+QUESTION_TEMPLATES = [
+    ("价格咨询", ["我的{device}能回收多少钱", "{device}现在回收价格是多少", "{device}估价怎么这么低",
+              "帮我看看{device}的报价", "{device}成色很好能卖多少钱"]),
+    ("订单查询", ["帮我查一下订单{order}", "我的订单{order}到哪一步了", "单号{order}什么时候打款",
+              "查询订单状态", "订单一直没有更新"]),
+    ("流程咨询", ["{device}怎么回收", "回收流程是什么", "如何取消回收", "验货需要多久",
+              "怎么修改收款账号"]),
+    ("物流查询", ["顺丰什么时候上门取件", "运费谁来出", "快递单号填错了", "{device}邮寄要注意什么",
+              "已经发货了怎么还没收到"]),
+    ("产品信息", ["{device}支持回收吗", "这个型号的配置影响价格吗", "设备有划痕可以回收吗",
+              "{device}屏幕碎了还能回收吗"]),
+    ("投诉反馈", ["验货结果有问题我要投诉", "价格和预估差太多了不满意", "要求退回{device}",
+              "客服态度不好", "一直不打款我要维权"]),
+    ("问候闲聊", ["你好", "在吗", "您好请问一下", "谢谢", "好的感谢"]),
+]
+
+ANSWER_TEMPLATES = [
+    "您好，{device}的回收价格会根据成色和市场行情决定，您可以在平台提交估价。",
+    "您好，已为您查询，订单{order}目前处于验货阶段，请耐心等待。",
+    "您好，回收流程为：提交订单、寄出设备、验货、确认价格、打款。",
+    "您好，我们使用顺丰到付，运费由平台承担，请放心寄出。",
+    "您好，非常抱歉给您带来不便，已为您反馈专员处理，请保持电话畅通。",
+    "您好，很高兴为您服务，请问有什么可以帮您？",
+]
+
+
+def _fill(template, rng):
+    return template.format(
+        device=rng.choice(DEVICES),
+        order=str(rng.randint(10 ** 11, 10 ** 12 - 1)),
+    )
+
+
+def generate_question(rng):
+    """随机生成一条用户问题
+
+    Args:
+        rng: random.Random 实例
+
+    Returns:
+        (意图, 问题)
+    """
+    intent, templates = rng.choice(QUESTION_TEMPLATES)
+    return intent, _fill(rng.choice(templates), rng)
+
+
+def generate_qa_pairs(count, seed=42):
+    """生成合成QA对
+
+    Args:
+        count: QA对数量
+        seed: 随机种子
+
+    Returns:
+        与 qa_pairs.json 结构一致的QA对列表
+    """
+    rng = random.Random(seed)
+    qa_pairs = []
+    for i in range(count):
+        intent, question = generate_question(rng)
+        answer = _fill(rng.choice(ANSWER_TEMPLATES), rng)
+        qa_pairs.append({
+            'conversation_id': f"conv_{i // 4}",
+            'business_group': rng.choice(BUSINESS_GROUPS),
+            'question': question,
+            'answer': answer,
+            'context': [
+                {'sender': '用户', 'content': question, 'timestamp': None},
+                {'sender': '客服', 'content': answer, 'timestamp': None},
+            ],
+            'intent': intent,
+        })
+    return qa_pairs
+
+
+def generate_faqs(qa_pairs, per_group=200):
+    """从QA对中抽取每个业务组的FAQ
+
+    Args:
+        qa_pairs: QA对列表
+        per_group: 每个业务组的FAQ数量上限
+
+    Returns:
+        业务组 -> FAQ列表
+    """
+    faqs = {}
+    for qa in qa_pairs:
+        group_faqs = faqs.setdefault(qa['business_group'], [])
+        if len(group_faqs) < per_group:
+            group_faqs.append({key: qa[key] for key in ('question', 'answer', 'intent', 'business_group')})
+    return faqs
+
+
+def generate_queries(count, seed=7):
+    """生成查询用的 (业务组, 问题) 列表"""
+    rng = random.Random(seed)
+    return [(rng.choice(BUSINESS_GROUPS), generate_question(rng)[1]) for _ in range(count)]
+
+
+def write_knowledge_base(data_dir, qa_count, faq_per_group=200, seed=42):
+    """将合成知识库写入与 ConversationProcessor 输出一致的目录结构
+
+    Args:
+        data_dir: 数据目录（其下生成 processed/ 和 knowledge_base/）
+        qa_count: QA对数量
+        faq_per_group: 每个业务组的FAQ数量
+        seed: 随机种子
+
+    Returns:
+        (QA对列表, FAQ字典)
+    """
+    qa_pairs = generate_qa_pairs(qa_count, seed)
+    faqs = generate_faqs(qa_pairs, faq_per_group)
+
+    os.makedirs(os.path.join(data_dir, "processed"), exist_ok=True)
+    os.makedirs(os.path.join(data_dir, "knowledge_base"), exist_ok=True)
+
+    with open(os.path.join(data_dir, "processed", "qa_pairs.json"), 'w', encoding='utf-8') as f:
+        json.dump(qa_pairs, f, ensure_ascii=False)
+    for group, group_faqs in faqs.items():
+        with open(os.path.join(data_dir, "knowledge_base", f"faq_{group}.json"), 'w', encoding='utf-8') as f:
+            json.dump(group_faqs, f, ensure_ascii=False)
+
+    return qa_pairs, faqs
@@ -44,12 +44,34 @@ def parse_args():
                              help="输入Excel文件路径")
     process_parser.add_argument("--output", default="data", 
                              help="输出目录")
+    process_parser.add_argument("--chunk-size", type=int, default=None,
+                             help="按块流式读取的行数，不设置时一次读入整个文件")
+    process_parser.add_argument("--workers", type=int, default=1,
+                             help="处理对话的进程数，大于1时按touch_id分片并行处理")
+    process_parser.add_argument("--output-format", choices=["json", "jsonl", "jsonl.zst"], default="json",
+                             help="对话和训练/验证/测试集的输出格式，jsonl.zst需要安装zstandard")
+    process_parser.add_argument("--incremental", action="store_true",
+                             help="只处理与上次相比新增或内容变化的对话，并合并到已有输出")
+    
+    # 转换聊天导出为列式缓存命令
+    convert_parser = subparsers.add_parser("convert-export", help="把聊天导出文件转换为列式缓存，供分析脚本快速读取")
+    convert_parser.add_argument("--input", default="/Users/boxie/cursor/ai_service/data/merged_chat_records.xlsx",
+                                help="输入Excel文件路径")
+    convert_parser.add_argument("--cache-dir", default=None, help="缓存目录，默认为输入文件同目录下的.export_cache")
+    
+    # 构建向量索引命令
+    index_parser = subparsers.add_parser("build-index", help="离线构建语义检索向量索引")
+    index_parser.add_argument("--data", default="data", help="数据目录（包含knowledge_base和processed）")
+    index_parser.add_argument("--model", default=None,
+                              help="本地sentence-transformers模型名或路径，为空时使用哈希TF-IDF编码器")
     
     # 启动API服务命令
     api_parser = subparsers.add_parser("api", help="启动API服务")
     api_parser.add_argument("--host", default="0.0.0.0", help="主机地址")
     api_parser.add_argument("--port", type=int, default=8000, help="端口号")
     api_parser.add_argument("--reload", action="store_true", help="是否启用热加载")
+    api_parser.add_argument("--workers", type=int, default=1,
+                            help="worker进程数，大于1时在父进程预加载知识库后fork各worker共享")
     
     # 启动演示界面命令
     demo_parser = subparsers.add_parser("demo", help="启动演示界面")
@@ -78,13 +100,40 @@ def main():
         logger.info("开始处理数据...")
         from src.data_processing.process_conversation_data import ConversationProcessor
         
-        processor = ConversationProcessor(args.input, os.path.join(project_root, args.output))
+        processor = ConversationProcessor(args.input, os.path.join(project_root, args.output),
+                                          chunk_size=args.chunk_size, workers=args.workers,
+                                          output_format=args.output_format, incremental=args.incremental)
         processor.load_data()
         processor.process_conversations()
         processor.save_results()
         
+    elif args.command == "convert-export":
+        logger.info("开始转换聊天导出...")
+        from src.data_processing.export_cache import build_export_cache
+        
+        cache_path = build_export_cache(args.input, args.cache_dir)
+        logger.info(f"列式缓存: {cache_path}")
+        
+    elif args.command == "build-index":
+        logger.info("开始构建向量索引...")
+        from src.retrieval.dense_index import build_dense_index
+        
+        data_dir = os.path.join(project_root, args.data)
+        build_dense_index(
+            os.path.join(data_dir, "knowledge_base"),
+            os.path.join(data_dir, "processed"),
+            os.path.join(data_dir, "index"),
+            model_name=args.model
+        )
+        
     elif args.command == "api":
-        logger.info(f"启动API服务 (host={args.host}, port={args.port})...")
+        logger.info(f"启动API服务 (host={args.host}, port={args.port}, workers={args.workers})...")
+        if args.workers > 1 and not args.reload:
+            from src.api.server import serve_prefork
+            
+            serve_prefork(args.host, args.port, args.workers)
+            return
+        
         import uvicorn
         
         uvicorn.run(
@@ -1,7 +1,8 @@
 from fastapi import FastAPI, HTTPException, Body, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Literal
 import json
 import os
 import re
@@ -12,6 +13,18 @@ import numpy as np
 import logging
 import httpx
 import asyncio
+import functools
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.api.cache import create_response_cache
+from src.api.conversation_store import create_conversation_store
+from src.api.llm_client import LLMClient, LLMUnavailableError
+from src.api.metrics import Histogram, render_metrics
+from src.intent.classifier import classify_intent, customer_service_classifier
+from src.retrieval.knowledge_base import KnowledgeBase
+from src.retrieval.loader import knowledge_base_fingerprint
 
 # 配置日志
 logging.basicConfig(
@@ -22,15 +35,39 @@ logger = logging.getLogger(__name__)
 
 # 应用配置
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-DATA_DIR = BASE_DIR / "data"
+# 数据目录可通过环境变量指定（如压测时使用合成知识库）
+DATA_DIR = Path(os.environ.get("AGENT_DATA_DIR", BASE_DIR / "data"))
 KB_DIR = DATA_DIR / "knowledge_base"
 PROCESSED_DIR = DATA_DIR / "processed"
+INDEX_DIR = DATA_DIR / "index"
+# 知识库文件变更检查间隔（秒），为0时不启动后台监视，只能通过 /api/admin/reload 手动更新
+KB_WATCH_INTERVAL = float(os.environ.get("KB_WATCH_INTERVAL", "0"))
+# 对话存储：memory（进程内LRU）或 sqlite（持久化）
+CONVERSATION_STORE = os.environ.get("CONVERSATION_STORE", "memory")
+CONVERSATION_DB = os.environ.get("CONVERSATION_DB", str(DATA_DIR / "conversations.db"))
+CONVERSATION_MAX = int(os.environ.get("CONVERSATION_MAX", "10000"))
+CONVERSATION_MAX_MESSAGES = int(os.environ.get("CONVERSATION_MAX_MESSAGES", "200"))
+CONVERSATION_TTL = float(os.environ.get("CONVERSATION_TTL", "86400"))
+# 回答缓存配置：条目数为0时禁用；配置Redis地址后多个worker共享缓存
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_REDIS_URL = os.environ.get("RESPONSE_CACHE_REDIS_URL")
+RESPONSE_CACHE_REDIS_TIMEOUT = float(os.environ.get("RESPONSE_CACHE_REDIS_TIMEOUT", "0.2"))
+# /api/chat/batch 单次请求最多包含的问题数
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "1000"))
 
 # API密钥（生产环境应放在环境变量中）
 # 以下仅为示例，实际应用中请替换为真实密钥
 API_KEYS = {
-    "anthropic": "sk-ant-xxxx",  # 替换为实际的API密钥
+    "anthropic": os.environ.get("ANTHROPIC_API_KEY") or "sk-ant-xxxx",  # 替换为实际的API密钥
 }
+# LLM调用配置：未配置真实密钥时使用模拟回答
+LLM_ENABLED = API_KEYS["anthropic"] != "sk-ant-xxxx"
+LLM_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+LLM_MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-3-opus-20240229")
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
 
 # 应用实例
 app = FastAPI(
@@ -64,6 +101,7 @@ class QuestionRequest(BaseModel):
     business_group: str = Field(..., description="业务组")
     message: str = Field(..., description="用户问题")
     prev_messages: Optional[List[Message]] = Field(default_factory=list, description="之前的消息历史")
+    ranking: Literal["keyword", "bm25", "semantic"] = Field("keyword", description="检索排序方式: 'keyword'（关键词匹配）、'bm25' 或 'semantic'（向量检索）")
 
 class AnswerResponse(BaseModel):
     conversation_id: str = Field(..., description="对话ID")
@@ -73,200 +111,332 @@ class AnswerResponse(BaseModel):
     needs_human: bool = Field(False, description="是否需要人工介入")
     sources: Optional[List[Dict[str, Any]]] = Field(None, description="知识源")
 
-# 内存存储（实际应用中应使用数据库）
-conversations = {}
-faqs = {}
-qa_data = []
+class BatchQuestion(BaseModel):
+    business_group: str = Field(..., description="业务组")
+    message: str = Field(..., description="用户问题")
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[BatchQuestion] = Field(..., max_length=BATCH_MAX_SIZE, description="问题列表")
+    ranking: Literal["keyword", "bm25", "semantic"] = Field("keyword", description="检索排序方式，同单条聊天接口")
+
+class BatchAnswer(BaseModel):
+    answer: str = Field(..., description="回答内容")
+    intent: Optional[str] = Field(None, description="识别的意图")
+    confidence: float = Field(..., description="回答置信度")
+    needs_human: bool = Field(False, description="是否需要人工介入")
+    sources: Optional[List[Dict[str, Any]]] = Field(None, description="知识源")
+
+class BatchAnswerResponse(BaseModel):
+    results: List[BatchAnswer] = Field(..., description="回答列表，顺序与请求中的问题一致")
+
+# 对话存储，条目数、单个对话的消息数和空闲时间均有上限
+conversation_store = create_conversation_store(
+    CONVERSATION_STORE, CONVERSATION_DB, CONVERSATION_MAX, CONVERSATION_MAX_MESSAGES, CONVERSATION_TTL
+)
+# 当前生效的知识库快照，热更新时整体替换（请求开始时取一次引用，整个请求内保持不变）
+knowledge_base = KnowledgeBase()
+# 知识库重建在独立线程中执行，不阻塞事件循环
+kb_reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-reload")
+# 批量接口的意图识别、知识库检索和序列化在独立线程中执行，整批处理期间事件循环仍能响应其他请求；
+# 只有一个线程，并发的批量请求依次执行，不会有多个线程同时争用GIL
+batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-search")
+kb_reload_lock = asyncio.Lock()
+kb_watch_task = None
+# 父进程已预加载知识库时，worker启动时不再重复加载
+knowledge_base_preloaded = False
+# 知识库加载并预热、依赖初始化完成后置为True，供就绪检查使用
+app_ready = False
+# 回答缓存，键中包含知识库指纹
+response_cache = create_response_cache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_REDIS_URL,
+                                       RESPONSE_CACHE_REDIS_TIMEOUT)
+# 长连接复用的LLM客户端，在startup_event中创建
+llm_client = None
+# 请求各阶段耗时与请求总耗时，通过 /metrics 暴露
+stage_latency = Histogram("chat_stage_duration_seconds", "聊天请求各阶段耗时", label_name="stage")
+request_latency = Histogram("chat_request_duration_seconds", "聊天请求总耗时", label_name="endpoint")
+
+def build_knowledge_base(version=0):
+    """从磁盘构建新的知识库快照"""
+    kb = KnowledgeBase.build(KB_DIR, PROCESSED_DIR, INDEX_DIR, version)
+    logger.info(f"已加载 {len(kb.faqs)} 个业务组的FAQ知识库")
+    logger.info(f"已加载 {kb.qa_count} 条QA对")
+    if kb.dense_index is not None:
+        logger.info(f"已映射 {len(kb.dense_index)} 条向量索引")
+    warm_up_knowledge_base(kb)
+    return kb
+
+def warm_up_knowledge_base(kb):
+    """预热检索路径，使分词词典、向量索引映射等惰性初始化在对外服务前完成"""
+    rankings = ["keyword", "bm25"] + (["semantic"] if kb.dense_index is not None else [])
+    for business_group in list(kb.faqs)[:1] or ["回收宝"]:
+        for ranking in rankings:
+            search_knowledge_base("请问手机回收价格多少", business_group, ranking=ranking, kb=kb)
 
 # 加载知识库数据
 def load_knowledge_base():
-    global faqs, qa_data
-    
-    # 加载FAQ数据
-    if os.path.exists(KB_DIR):
-        for file in os.listdir(KB_DIR):
-            if file.endswith('.json') and file.startswith('faq_'):
-                try:
-                    with open(KB_DIR / file, 'r', encoding='utf-8') as f:
-                        group_faqs = json.load(f)
-                        # 提取业务组名
-                        group_name = file[4:-5]  # 移除"faq_"前缀和".json"后缀
-                        if group_name:
-                            faqs[group_name] = group_faqs
-                except Exception as e:
-                    logger.error(f"加载FAQ文件 {file} 失败: {e}")
-    
-    # 加载QA数据（用于语义搜索）
-    if os.path.exists(PROCESSED_DIR / "qa_pairs.json"):
+    global knowledge_base
+    knowledge_base = build_knowledge_base(knowledge_base.version + 1)
+    response_cache.clear()
+
+def preload_knowledge_base():
+    """多worker模式下在父进程中加载并预热知识库，fork出的worker以写时复制方式共享"""
+    global knowledge_base_preloaded
+    load_knowledge_base()
+    knowledge_base_preloaded = True
+
+async def reload_knowledge_base():
+    """在线程池中重建知识库，完成后原子替换快照
+
+    重建期间请求继续使用旧快照；并发的重载请求会排队，避免重复构建。
+    """
+    global knowledge_base
+    async with kb_reload_lock:
+        loop = asyncio.get_running_loop()
+        kb = await loop.run_in_executor(kb_reload_executor, build_knowledge_base, knowledge_base.version + 1)
+        knowledge_base = kb
+        response_cache.clear()
+    logger.info(f"知识库已更新至版本 {kb.version}")
+    return kb
+
+async def watch_knowledge_base(interval):
+    """定期检查知识库文件指纹，发生变化时自动重载
+
+    指纹需在连续两次检查中保持一致才触发重载，避免读到正在写入的文件。
+    """
+    pending = None
+    while True:
+        await asyncio.sleep(interval)
         try:
-            with open(PROCESSED_DIR / "qa_pairs.json", 'r', encoding='utf-8') as f:
-                qa_data = json.load(f)
+            fingerprint = knowledge_base_fingerprint(KB_DIR, PROCESSED_DIR)
+            if fingerprint == knowledge_base.fingerprint:
+                pending = None
+            elif fingerprint != pending:
+                pending = fingerprint
+            else:
+                logger.info("检测到知识库文件变化，开始重新加载")
+                await reload_knowledge_base()
+                pending = None
         except Exception as e:
-            logger.error(f"加载QA数据失败: {e}")
-    
-    logger.info(f"已加载 {len(faqs)} 个业务组的FAQ知识库")
-    logger.info(f"已加载 {len(qa_data)} 条QA对")
+            logger.error(f"知识库自动重载失败: {e}")
 
-# 简单的意图分类函数
-def classify_intent(question):
-    question = question.lower()
+# 简单的关键词搜索，在实际应用中应替换为语义搜索
+def search_knowledge_base(question, business_group, top_k=3, ranking="keyword", kb=None):
+    if kb is None:
+        kb = knowledge_base
+    if ranking == "bm25":
+        return search_knowledge_base_bm25(question, business_group, top_k, kb)
+    if ranking == "semantic":
+        if kb.dense_index is not None:
+            return search_knowledge_base_semantic(question, business_group, top_k, kb)
+        logger.warning("向量索引未加载，语义检索退化为关键词匹配")
     
-    # 订单查询
-    if re.search(r'(订单|单号|我的订单|查(询|一下)订单)', question):
-        return "订单查询"
-    # 价格咨询
-    elif re.search(r'(多少钱|价格|价值|回收价|估价|报价)', question):
-        return "价格咨询"
-    # 流程咨询
-    elif re.search(r'(怎么|如何|流程|步骤|操作|使用)', question):
-        return "流程咨询"
-    # 物流查询
-    elif re.search(r'(物流|快递|运费|邮费|顺丰|寄|邮寄|收货|发货)', question):
-        return "物流查询"
-    # 产品信息
-    elif re.search(r'(手机|设备|产品|型号|配置|参数)', question):
-        return "产品信息"
-    # 投诉反馈
-    elif re.search(r'(投诉|不满|差评|退款|维权|不好|问题)', question):
-        return "投诉反馈"
-    # 问候/闲聊
-    elif re.search(r'(你好|您好|在吗|请问|谢谢|感谢)', question):
-        return "问候闲聊"
-    else:
-        return "其他咨询"
+    results = []
+    intent = classify_intent(question)
+    keywords = re.findall(r'\w+', question.lower())
+    
+    # 1. 首先在对应业务组的FAQ中查找（通过倒排索引只访问命中的条目）
+    if business_group in kb.faq_indexes:
+        group_faqs = kb.faqs[business_group]
+        for doc_id, score in kb.faq_indexes[business_group].search(keywords):
+            faq = group_faqs[doc_id]
+            results.append(faq.to_result(score / len(keywords), intent, business_group))
+    
+    # 2. 在对应业务组的QA数据中查找
+    if len(results) < top_k and business_group in kb.qa_indexes:
+        group_qa = kb.qa_groups[business_group]
+        for doc_id, score in kb.qa_indexes[business_group].search(keywords):
+            qa = group_qa[doc_id]
+            results.append(qa.to_result(score / len(keywords) * 0.8, intent, business_group))  # 稍低的权重
+    
+    # 按匹配分数排序并返回top_k个结果
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results[:top_k]
 
-# 简单的关键词搜索，在实际应用中应替换为语义搜索
-def search_knowledge_base(question, business_group, top_k=3):
+# BM25检索：基于分词的相关性排序，得分已归一化到[0, 1]
+def search_knowledge_base_bm25(question, business_group, top_k=3, kb=None):
+    if kb is None:
+        kb = knowledge_base
     results = []
     intent = classify_intent(question)
     
     # 1. 首先在对应业务组的FAQ中查找
-    if business_group in faqs:
-        group_faqs = faqs[business_group]
-        # 简单的关键词匹配
-        keywords = re.findall(r'\w+', question.lower())
-        for faq in group_faqs:
-            score = 0
-            for kw in keywords:
-                if kw in faq['question'].lower():
-                    score += 1
-            if score > 0:
-                results.append({
-                    'question': faq['question'],
-                    'answer': faq['answer'],
-                    'score': score / len(keywords),
-                    'intent': faq.get('intent', intent),
-                    'business_group': business_group
-                })
+    if business_group in kb.faq_bm25_indexes:
+        group_faqs = kb.faqs[business_group]
+        for doc_id, score in kb.faq_bm25_indexes[business_group].search(question, top_k):
+            faq = group_faqs[doc_id]
+            results.append(faq.to_result(score, intent, business_group))
     
-    # 2. 在全局QA数据中查找
-    if len(results) < top_k:
-        for qa in qa_data:
-            if qa['business_group'] == business_group:
-                score = 0
-                keywords = re.findall(r'\w+', question.lower())
-                for kw in keywords:
-                    if kw in qa['question'].lower():
-                        score += 1
-                if score > 0:
-                    results.append({
-                        'question': qa['question'],
-                        'answer': qa['answer'],
-                        'score': score / len(keywords) * 0.8,  # 稍低的权重
-                        'intent': qa.get('intent', intent),
-                        'business_group': business_group
-                    })
+    # 2. 在对应业务组的QA数据中查找
+    if len(results) < top_k and business_group in kb.qa_bm25_indexes:
+        group_qa = kb.qa_groups[business_group]
+        for doc_id, score in kb.qa_bm25_indexes[business_group].search(question, top_k):
+            qa = group_qa[doc_id]
+            results.append(qa.to_result(score * 0.8, intent, business_group))  # 稍低的权重
     
-    # 按匹配分数排序并返回top_k个结果
     results.sort(key=lambda x: x['score'], reverse=True)
     return results[:top_k]
 
-# 使用Anthropic Claude API处理问题（简化版）
-async def ask_claude(question, context, business_group):
-    """使用Claude API回答问题
+# 语义检索：在离线构建的向量索引中做矩阵-向量乘法取top_k
+def search_knowledge_base_semantic(question, business_group, top_k=3, kb=None):
+    return search_knowledge_base_semantic_many([question], business_group, top_k, kb)[0]
+
+# 批量语义检索：同一业务组的问题一起编码，向量矩阵只扫描一遍
+def search_knowledge_base_semantic_many(questions, business_group, top_k=3, kb=None):
+    if kb is None:
+        kb = knowledge_base
+    intents = customer_service_classifier.classify_many(questions)
+    batch_results = [[] for _ in questions]
+    
+    # 1. 首先在对应业务组的FAQ中查找
+    group_faqs = kb.faqs.get(business_group, [])
+    faq_hits = kb.dense_index.search_many(questions, business_group, "faq", top_k)
+    for results, intent, hits in zip(batch_results, intents, faq_hits):
+        for doc_id, score in hits:
+            results.append(group_faqs[doc_id].to_result(score, intent, business_group))
+    
+    # 2. 在对应业务组的QA数据中查找（只检索FAQ结果不足的问题）
+    pending = [i for i, results in enumerate(batch_results) if len(results) < top_k]
+    if pending:
+        group_qa = kb.qa_groups.get(business_group, [])
+        qa_hits = kb.dense_index.search_many([questions[i] for i in pending], business_group, "qa", top_k)
+        for i, hits in zip(pending, qa_hits):
+            for doc_id, score in hits:
+                batch_results[i].append(group_qa[doc_id].to_result(score * 0.8, intents[i], business_group))  # 稍低的权重
+    
+    for results in batch_results:
+        results.sort(key=lambda x: x['score'], reverse=True)
+        del results[top_k:]
+    return batch_results
+
+def search_knowledge_base_many(questions, business_groups, top_k=3, ranking="keyword", kb=None):
+    """批量检索知识库，结果与输入一一对应
+    
+    语义检索按业务组分批做矩阵乘法；关键词和BM25检索逐个问题进行，但同一业务组内相同的问题只检索一次。
+    
+    Args:
+        questions: 问题列表
+        business_groups: 与问题一一对应的业务组列表
+        top_k: 每个问题返回的结果数量
+        ranking: 检索方式
+        kb: 知识库快照，默认使用当前快照
+        
+    Returns:
+        检索结果列表，每项同 search_knowledge_base 的返回值
+    """
+    if kb is None:
+        kb = knowledge_base
+    results = [None] * len(questions)
+    if ranking == "semantic" and kb.dense_index is not None:
+        positions = {}
+        for i, business_group in enumerate(business_groups):
+            positions.setdefault(business_group, []).append(i)
+        for business_group, group_positions in positions.items():
+            group_results = search_knowledge_base_semantic_many(
+                [questions[i] for i in group_positions], business_group, top_k, kb)
+            for i, group_result in zip(group_positions, group_results):
+                results[i] = group_result
+        return results
+    
+    seen = {}
+    for i, (question, business_group) in enumerate(zip(questions, business_groups)):
+        key = (business_group, question)
+        if key not in seen:
+            seen[key] = search_knowledge_base(question, business_group, top_k, ranking, kb)
+        results[i] = seen[key]
+    return results
+
+# 各意图的兜底回答（LLM未配置或不可用时使用）
+FALLBACK_ANSWERS = {
+    "订单查询": "您好，要查询订单状态，请提供您的订单号，我会立即为您查询。如果没有订单号，也可以提供下单时使用的手机号码。",
+    "价格咨询": "您好，回收价格会根据设备型号、成色和市场行情决定。我们承诺给出合理的市场价格，您可以在我们的平台预估价格，也可以告诉我具体设备型号，我来为您查询最新回收价。",
+    "流程咨询": "您好，回收流程很简单：1)在平台选择设备并填写信息获取预估价；2)选择回收方式(上门/邮寄/到店)；3)我们验收设备并确认价格；4)您确认后我们立即打款。整个过程快速安全。",
+    "物流查询": "您好，我们合作的物流是顺丰快递，手机和平板等小件设备运费上限为25元，电脑和显示屏为40元，您可以选择顺丰到付。收件后我们会尽快为您验货并确认回收。",
+    "产品信息": "您好，我们回收各类电子产品，包括手机、平板、电脑、智能手表等。不同产品的回收要求可能不同，请问您想了解哪类产品的具体信息？",
+    "投诉反馈": "您好，非常抱歉给您带来不便。请详细描述您遇到的问题，提供相关订单号，我会立即为您反馈给专门的客服团队，并尽快给您答复。",
+    "问候闲聊": "您好，欢迎咨询回收宝服务，我是您的专属客服助手，很高兴为您服务。请问有什么可以帮到您的呢？",
+    "其他咨询": "您好，感谢您的咨询。请问您具体想了解关于我们回收服务的哪方面信息呢？我会尽力为您解答。"
+}
+
+def fallback_answer(question, context):
+    """基于检索结果和意图生成兜底回答
     
     Args:
         question: 用户问题
-        context: 上下文信息，包括之前的对话和相关FAQ
-        business_group: 业务组
+        context: 检索到的相关FAQ
         
     Returns:
-        回答内容和置信度
+        (回答内容, 置信度)
     """
-    try:
-        # 构建系统提示
-        system_prompt = f"""你是一个专业的客服助手，专门负责"{business_group}"业务的在线咨询。
+    # 从上下文中提取最佳匹配的回答
+    best_match = max(context, key=lambda x: x["score"]) if context else None
+    
+    if best_match and best_match["score"] > 0.5:
+        return best_match["answer"], best_match["score"]
+    
+    intent = classify_intent(question)
+    answer = FALLBACK_ANSWERS.get(intent, "您好，我理解您的问题是关于我们的回收业务，但需要更多信息才能给您精确的答案。您能提供更多细节吗？或者您也可以联系我们的人工客服获取帮助。")
+    confidence = 0.85 if intent != "其他咨询" else 0.6
+    return answer, confidence
+
+def build_claude_messages(question, context, business_group):
+    """构建Claude Messages API的系统提示和消息列表"""
+    # 构建系统提示
+    system_prompt = f"""你是一个专业的客服助手，专门负责"{business_group}"业务的在线咨询。
 你的回答应该专业、礼貌、简洁明了。
 如果你不确定答案，请坦率承认并表示可以转接人工客服。
 请不要编造信息，仅基于提供的上下文进行回答。"""
-
-        # 构建API请求
-        headers = {
-            "x-api-key": API_KEYS["anthropic"],
-            "content-type": "application/json",
-            "anthropic-version": "2023-06-01"
-        }
-        
-        # 准备消息历史
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # 添加上下文信息
-        if context:
-            context_str = "以下是可能相关的信息：\n\n"
-            for idx, item in enumerate(context):
-                context_str += f"{idx+1}. 问: {item['question']}\n   答: {item['answer']}\n\n"
-            
-            messages.append({"role": "user", "content": f"请记住以下信息，这些是你回答问题的知识库：\n{context_str}"})
-            messages.append({"role": "assistant", "content": "我已了解这些信息，将用它们来回答用户问题。"})
-        
-        # 添加用户问题
-        messages.append({"role": "user", "content": question})
-        
-        # 发送请求（简化版，实际应用中需要完整的错误处理和重试机制）
-        # 注意：这里使用了模拟调用，实际应用中应该发送真实请求
-        # async with httpx.AsyncClient() as client:
-        #    response = await client.post(
-        #        "https://api.anthropic.com/v1/messages",
-        #        headers=headers,
-        #        json={
-        #            "model": "claude-3-opus-20240229",
-        #            "max_tokens": 1000,
-        #            "messages": messages
-        #        }
-        #    )
-        #    result = response.json()
+    
+    messages = []
+    
+    # 添加上下文信息
+    if context:
+        context_str = "以下是可能相关的信息：\n\n"
+        for idx, item in enumerate(context):
+            context_str += f"{idx+1}. 问: {item['question']}\n   答: {item['answer']}\n\n"
         
-        # 模拟API响应
-        logger.info(f"向Claude API发送请求: {question}")
+        messages.append({"role": "user", "content": f"请记住以下信息，这些是你回答问题的知识库：\n{context_str}"})
+        messages.append({"role": "assistant", "content": "我已了解这些信息，将用它们来回答用户问题。"})
+    
+    # 添加用户问题
+    messages.append({"role": "user", "content": question})
+    return system_prompt, messages
+
+# 使用Anthropic Claude API处理问题
+async def ask_claude(question, context, business_group):
+    """使用Claude API回答问题
+    
+    未配置API密钥时使用模拟回答；调用失败（超时、重试耗尽、熔断）时退回到兜底回答。
+    置信度始终由检索结果和意图决定。
+    
+    Args:
+        question: 用户问题
+        context: 上下文信息，包括之前的对话和相关FAQ
+        business_group: 业务组
         
-        # 从上下文中提取最佳匹配的回答
-        best_match = max(context, key=lambda x: x["score"]) if context else None
+    Returns:
+        回答内容和置信度；fallback 为True表示已配置LLM但调用失败，回答是兜底内容，调用方不应缓存
+    """
+    try:
+        answer, confidence = fallback_answer(question, context)
+        fallback = False
         
-        if best_match and best_match["score"] > 0.5:
-            answer = best_match["answer"]
-            confidence = best_match["score"]
+        if llm_client is not None:
+            system_prompt, messages = build_claude_messages(question, context, business_group)
+            try:
+                answer = await llm_client.complete(system_prompt, messages)
+            except LLMUnavailableError as e:
+                logger.warning(f"Claude API不可用，使用兜底回答: {e}")
+                fallback = True
         else:
-            # 模拟生成的回答
-            answers = {
-                "订单查询": "您好，要查询订单状态，请提供您的订单号，我会立即为您查询。如果没有订单号，也可以提供下单时使用的手机号码。",
-                "价格咨询": "您好，回收价格会根据设备型号、成色和市场行情决定。我们承诺给出合理的市场价格，您可以在我们的平台预估价格，也可以告诉我具体设备型号，我来为您查询最新回收价。",
-                "流程咨询": "您好，回收流程很简单：1)在平台选择设备并填写信息获取预估价；2)选择回收方式(上门/邮寄/到店)；3)我们验收设备并确认价格；4)您确认后我们立即打款。整个过程快速安全。",
-                "物流查询": "您好，我们合作的物流是顺丰快递，手机和平板等小件设备运费上限为25元，电脑和显示屏为40元，您可以选择顺丰到付。收件后我们会尽快为您验货并确认回收。",
-                "产品信息": "您好，我们回收各类电子产品，包括手机、平板、电脑、智能手表等。不同产品的回收要求可能不同，请问您想了解哪类产品的具体信息？",
-                "投诉反馈": "您好，非常抱歉给您带来不便。请详细描述您遇到的问题，提供相关订单号，我会立即为您反馈给专门的客服团队，并尽快给您答复。",
-                "问候闲聊": "您好，欢迎咨询回收宝服务，我是您的专属客服助手，很高兴为您服务。请问有什么可以帮到您的呢？",
-                "其他咨询": "您好，感谢您的咨询。请问您具体想了解关于我们回收服务的哪方面信息呢？我会尽力为您解答。"
-            }
-            
-            intent = classify_intent(question)
-            answer = answers.get(intent, "您好，我理解您的问题是关于我们的回收业务，但需要更多信息才能给您精确的答案。您能提供更多细节吗？或者您也可以联系我们的人工客服获取帮助。")
-            confidence = 0.85 if intent != "其他咨询" else 0.6
+            # 模拟API响应
+            logger.info(f"向Claude API发送请求: {question}")
         
         # 返回结果
         return {
             "answer": answer,
             "confidence": confidence,
             "needs_human": confidence < 0.7,  # 置信度低于0.7时建议转人工
+            "fallback": fallback
         }
         
     except Exception as e:
@@ -274,101 +444,372 @@ async def ask_claude(question, context, business_group):
         return {
             "answer": "抱歉，我暂时无法回答您的问题，请稍后再试或联系人工客服。",
             "confidence": 0.0,
-            "needs_human": True
+            "needs_human": True,
+            "fallback": True
         }
 
 # 路由
 @app.on_event("startup")
 async def startup_event():
-    """应用启动时加载知识库"""
-    load_knowledge_base()
+    """应用启动时加载知识库，打开对话存储并创建LLM连接池"""
+    global kb_watch_task, llm_client, app_ready
+    if not knowledge_base_preloaded:
+        load_knowledge_base()
+    await conversation_store.start()
+    if LLM_ENABLED:
+        llm_client = LLMClient(
+            API_KEYS["anthropic"],
+            base_url=LLM_BASE_URL,
+            model=LLM_MODEL,
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES
+        )
+        await llm_client.start()
+    if KB_WATCH_INTERVAL > 0:
+        kb_watch_task = asyncio.create_task(watch_knowledge_base(KB_WATCH_INTERVAL))
+    app_ready = True
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止知识库监视，关闭LLM连接池、回答缓存和对话存储"""
+    global app_ready
+    app_ready = False
+    if kb_watch_task is not None:
+        kb_watch_task.cancel()
+    kb_reload_executor.shutdown(wait=False)
+    batch_executor.shutdown(wait=False)
+    if llm_client is not None:
+        await llm_client.close()
+    await response_cache.close()
+    # 等待未落盘的对话写入完成
+    await conversation_store.close()
 
 @app.get("/")
 async def root():
     """健康检查端点"""
     return {"status": "ok", "service": "smart_customer_agent", "version": "0.1.0"}
 
-@app.post("/api/chat", response_model=AnswerResponse)
-async def chat(request: QuestionRequest):
-    """处理用户问题并返回回答"""
+@app.get("/ready")
+async def ready():
+    """就绪检查端点：知识库加载并预热完成后才返回200，否则返回503"""
+    if not app_ready:
+        raise HTTPException(status_code=503, detail="服务尚未就绪")
+    return {"status": "ready", "pid": os.getpid(), "knowledge_base": knowledge_base.summary()}
+
+async def record_user_message(request):
+    """记录用户问题（及客户端带来的历史消息），返回对话ID"""
     # 获取或创建对话
     conversation_id = request.conversation_id
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
     
-    # 获取业务组和用户问题
-    business_group = request.business_group
-    question = request.message
-    
-    # 记录用户问题
     now = datetime.datetime.now().isoformat()
-    if conversation_id not in conversations:
-        conversations[conversation_id] = {
-            "id": conversation_id,
-            "business_group": business_group,
-            "messages": []
-        }
-    
-    # 添加历史消息
-    if request.prev_messages:
-        conversations[conversation_id]["messages"].extend([
-            {
-                "role": msg.role,
-                "content": msg.content,
-                "created_at": msg.created_at or now
-            } for msg in request.prev_messages
-        ])
-    
-    # 添加新问题
-    conversations[conversation_id]["messages"].append({
+    # 客户端每次都会重发最近的历史，由存储去掉已保存过的部分
+    prev_messages = [
+        {
+            "role": msg.role,
+            "content": msg.content,
+            "created_at": msg.created_at or now
+        } for msg in request.prev_messages or []
+    ]
+    await conversation_store.append(conversation_id, request.business_group, [{
         "role": "user",
-        "content": question,
+        "content": request.message,
         "created_at": now
-    })
+    }], prev_messages=prev_messages)
+    return conversation_id
+
+async def record_assistant_message(conversation_id, business_group, answer):
+    """记录客服回复"""
+    await conversation_store.append(conversation_id, business_group, [{
+        "role": "assistant",
+        "content": answer,
+        "created_at": datetime.datetime.now().isoformat()
+    }])
+
+@app.post("/api/chat", response_model=AnswerResponse)
+async def chat(request: QuestionRequest):
+    """处理用户问题并返回回答"""
+    with request_latency.time("/api/chat"):
+        with stage_latency.time("conversation_lookup"):
+            conversation_id = await record_user_message(request)
+        
+        # 获取业务组和用户问题
+        business_group = request.business_group
+        question = request.message
+        # 整个请求使用同一个知识库快照
+        kb = knowledge_base
+        
+        # 命中缓存时跳过意图识别、知识库检索和LLM调用
+        with stage_latency.time("cache_lookup"):
+            cache_key = response_cache.make_key(kb.fingerprint, business_group, request.ranking, question)
+            cached = await response_cache.get(cache_key)
+        if cached is not None:
+            intent = cached["intent"]
+            search_results = cached["sources"]
+            answer = cached["answer"]
+            confidence = cached["confidence"]
+            needs_human = cached["needs_human"]
+        else:
+            # 获取意图
+            with stage_latency.time("classify_intent"):
+                intent = classify_intent(question)
+            
+            # 搜索知识库
+            with stage_latency.time("search_knowledge_base"):
+                search_results = search_knowledge_base(question, business_group, ranking=request.ranking, kb=kb)
+            
+            # 调用LLM获取回答
+            with stage_latency.time("ask_claude"):
+                llm_response = await ask_claude(question, search_results, business_group)
+            
+            # 构建回复
+            answer = llm_response["answer"]
+            confidence = llm_response["confidence"]
+            needs_human = llm_response["needs_human"]
+            
+            # LLM调用失败的兜底回答不缓存
+            if not llm_response["fallback"]:
+                await response_cache.set(cache_key, {
+                    "intent": intent,
+                    "sources": search_results,
+                    "answer": answer,
+                    "confidence": confidence,
+                    "needs_human": needs_human
+                })
+        
+        # 记录回复
+        with stage_latency.time("conversation_save"):
+            await record_assistant_message(conversation_id, business_group, answer)
+        
+        # 在这里完成校验和序列化，以便计入耗时（直接返回Response时FastAPI不再重复处理）
+        with stage_latency.time("serialization"):
+            response = JSONResponse(AnswerResponse(
+                conversation_id=conversation_id,
+                answer=answer,
+                intent=intent,
+                confidence=confidence,
+                needs_human=needs_human,
+                sources=search_results if search_results else None
+            ).model_dump())
+        return response
+
+def build_batch_response(answers, keys):
+    """校验并序列化批量回答，整批数据量较大，在 batch_executor 线程中执行"""
+    return JSONResponse(BatchAnswerResponse(results=[
+        BatchAnswer(**{**answers[key], "sources": answers[key]["sources"] or None}) for key in keys
+    ]).model_dump())
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchQuestionRequest):
+    """批量回答问题，用于离线回放历史问题等场景，结果顺序与请求一致
     
-    # 获取意图
-    intent = classify_intent(question)
+    不记录对话历史。业务组、检索方式和归一化后的问题都相同的条目只处理一次；
+    意图识别和知识库检索对整批问题一次完成，与序列化一起在 batch_executor 线程中执行，不阻塞其他请求；
+    LLM调用并发进行，并发数受LLM连接池上限约束。
+    """
+    with request_latency.time("/api/chat/batch"):
+        kb = knowledge_base
+        questions = [item.message for item in request.questions]
+        business_groups = [item.business_group for item in request.questions]
+        keys = [response_cache.make_key(kb.fingerprint, business_group, request.ranking, question)
+                for question, business_group in zip(questions, business_groups)]
+        
+        # 缓存键 -> 回答；未命中缓存的条目记录首次出现的位置
+        answers = {}
+        pending = []
+        for i, key in enumerate(keys):
+            if key in answers:
+                continue
+            cached = await response_cache.get(key)
+            answers[key] = cached
+            if cached is None:
+                pending.append(i)
+        
+        if pending:
+            pending_questions = [questions[i] for i in pending]
+            pending_groups = [business_groups[i] for i in pending]
+            loop = asyncio.get_running_loop()
+            with stage_latency.time("batch_classify_intent"):
+                intents = await loop.run_in_executor(
+                    batch_executor, customer_service_classifier.classify_many, pending_questions)
+            with stage_latency.time("batch_search_knowledge_base"):
+                search_results = await loop.run_in_executor(batch_executor, functools.partial(
+                    search_knowledge_base_many, pending_questions, pending_groups, ranking=request.ranking, kb=kb))
+            with stage_latency.time("batch_ask_claude"):
+                llm_responses = await asyncio.gather(*(
+                    ask_claude(question, context, business_group)
+                    for question, context, business_group in zip(pending_questions, search_results, pending_groups)))
+            
+            for i, intent, context, llm_response in zip(pending, intents, search_results, llm_responses):
+                answer = {
+                    "intent": intent,
+                    "sources": context,
+                    "answer": llm_response["answer"],
+                    "confidence": llm_response["confidence"],
+                    "needs_human": llm_response["needs_human"]
+                }
+                answers[keys[i]] = answer
+                # LLM调用失败的兜底回答不缓存
+                if not llm_response["fallback"]:
+                    await response_cache.set(keys[i], answer)
+        
+        with stage_latency.time("batch_serialization"):
+            response = await asyncio.get_running_loop().run_in_executor(
+                batch_executor, build_batch_response, answers, keys)
+        return response
+
+def sse_event(event, data):
+    """格式化一条server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: QuestionRequest):
+    """以server-sent events流式返回回答
     
-    # 搜索知识库
-    search_results = search_knowledge_base(question, business_group)
+    事件顺序：
+        meta  - 对话ID、意图和检索到的来源，在调用LLM之前立即发送
+        token - 回答文本增量，随LLM生成逐段发送
+        error - LLM在输出途中失败时发送，已输出的部分作为回答
+        done  - 置信度和是否建议转人工
     
-    # 调用LLM获取回答
-    llm_response = await ask_claude(question, search_results, business_group)
+    流结束后才记录客服回复；客户端中途断开时不记录。
+    """
+    request_start = time.perf_counter()
+    with stage_latency.time("conversation_lookup"):
+        conversation_id = await record_user_message(request)
+    business_group = request.business_group
+    question = request.message
+    kb = knowledge_base
     
-    # 构建回复
-    answer = llm_response["answer"]
-    confidence = llm_response["confidence"]
-    needs_human = llm_response["needs_human"]
+    with stage_latency.time("cache_lookup"):
+        cache_key = response_cache.make_key(kb.fingerprint, business_group, request.ranking, question)
+        cached = await response_cache.get(cache_key)
+    if cached is not None:
+        intent = cached["intent"]
+        search_results = cached["sources"]
+    else:
+        with stage_latency.time("classify_intent"):
+            intent = classify_intent(question)
+        with stage_latency.time("search_knowledge_base"):
+            search_results = search_knowledge_base(question, business_group, ranking=request.ranking, kb=kb)
     
-    # 记录回复
-    conversations[conversation_id]["messages"].append({
-        "role": "assistant",
-        "content": answer,
-        "created_at": datetime.datetime.now().isoformat()
-    })
+    async def event_stream():
+        yield sse_event("meta", {
+            "conversation_id": conversation_id,
+            "intent": intent,
+            "sources": search_results if search_results else None
+        })
+        
+        if cached is not None:
+            answer = cached["answer"]
+            confidence = cached["confidence"]
+            needs_human = cached["needs_human"]
+            yield sse_event("token", {"text": answer})
+        else:
+            answer, confidence = fallback_answer(question, search_results)
+            parts = []
+            # failed：LLM调用失败（包括输出第一段之前失败，此时回答为兜底内容）；interrupted：输出途中失败
+            failed = False
+            interrupted = False
+            if llm_client is not None:
+                system_prompt, messages = build_claude_messages(question, search_results, business_group)
+                llm_start = time.perf_counter()
+                try:
+                    async for text in llm_client.stream(system_prompt, messages):
+                        if not parts:
+                            stage_latency.observe(time.perf_counter() - llm_start, "ask_claude_first_token")
+                        parts.append(text)
+                        yield sse_event("token", {"text": text})
+                except LLMUnavailableError as e:
+                    logger.warning(f"Claude API流式调用失败: {e}")
+                    failed = True
+                    if parts:
+                        interrupted = True
+                        yield sse_event("error", {"message": "回答生成中断"})
+                stage_latency.observe(time.perf_counter() - llm_start, "ask_claude")
+            
+            if parts:
+                answer = "".join(parts)
+            else:
+                yield sse_event("token", {"text": answer})
+            
+            # 回答中断时建议转人工；LLM调用失败时不缓存
+            needs_human = interrupted or confidence < 0.7
+            if not failed:
+                await response_cache.set(cache_key, {
+                    "intent": intent,
+                    "sources": search_results,
+                    "answer": answer,
+                    "confidence": confidence,
+                    "needs_human": needs_human
+                })
+        
+        with stage_latency.time("conversation_save"):
+            await record_assistant_message(conversation_id, business_group, answer)
+        yield sse_event("done", {"confidence": confidence, "needs_human": needs_human})
+        request_latency.observe(time.perf_counter() - request_start, "/api/chat/stream")
     
-    # 返回结果
-    return {
-        "conversation_id": conversation_id,
-        "answer": answer,
-        "intent": intent,
-        "confidence": confidence,
-        "needs_human": needs_human,
-        "sources": search_results if search_results else None
-    }
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # 禁止代理缓冲，保证事件及时送达客户端
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/conversations/{conversation_id}", response_model=Conversation)
 async def get_conversation(conversation_id: str):
     """获取特定对话的历史记录"""
-    if conversation_id not in conversations:
+    conversation = await conversation_store.get(conversation_id)
+    if conversation is None:
         raise HTTPException(status_code=404, detail="对话不存在")
     
-    return conversations[conversation_id]
+    return conversation
 
 @app.get("/api/business-groups")
 async def get_business_groups():
     """获取所有业务组"""
-    return {"business_groups": list(faqs.keys())}
+    return {"business_groups": list(knowledge_base.faqs.keys())}
+
+@app.get("/api/admin/cache")
+async def admin_cache_stats():
+    """回答缓存命中/未命中/淘汰统计"""
+    return response_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus文本格式的监控指标"""
+    kb = knowledge_base
+    cache_stats = response_cache.stats()
+    llm_stats = llm_client.stats() if llm_client is not None else {}
+    gauges = [
+        ("knowledge_base_version", "知识库快照版本", kb.version),
+        ("knowledge_base_faq_groups", "FAQ业务组数", len(kb.faqs)),
+        ("knowledge_base_qa_pairs", "QA对数量", kb.qa_count),
+        ("response_cache_hits_total", "回答缓存命中次数", cache_stats.get("hits", 0), "counter"),
+        ("response_cache_misses_total", "回答缓存未命中次数", cache_stats.get("misses", 0), "counter"),
+        ("llm_in_flight", "进行中的LLM调用数", llm_stats.get("in_flight", 0)),
+        ("llm_retries_total", "LLM调用重试次数", llm_stats.get("retries", 0), "counter"),
+        ("llm_circuit_open", "LLM熔断器是否打开", int(llm_stats.get("breaker_state", "closed") != "closed")),
+        ("conversation_store_size", "对话存储中的对话数", len(conversation_store)),
+    ]
+    # Redis后端不统计条目数
+    if "size" in cache_stats:
+        gauges.append(("response_cache_size", "回答缓存条目数", cache_stats["size"]))
+    return PlainTextResponse(render_metrics([stage_latency, request_latency], gauges),
+                             media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/conversations")
+async def admin_conversation_stats():
+    """对话存储的条目数、淘汰和写入统计"""
+    return conversation_store.stats()
+
+@app.post("/api/admin/reload")
+async def admin_reload():
+    """重新加载知识库（在后台线程构建，完成后原子替换）"""
+    kb = await reload_knowledge_base()
+    return {"status": "ok", **kb.summary()}
 
 if __name__ == "__main__":
     import uvicorn
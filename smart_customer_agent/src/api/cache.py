@@ -0,0 +1,214 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 归一化时去掉的字符：空白、标点及下划线
+NORMALIZE_PATTERN = re.compile(r'[\W_]+')
+
+
+def normalize_question(question):
+    """问题归一化：全半角统一、转小写、去除空白和标点
+
+    "您好！" 与 "您好" 、"iPhone 13 多少钱？" 与 "iphone13多少钱" 会得到相同的结果。
+    """
+    return NORMALIZE_PATTERN.sub('', unicodedata.normalize('NFKC', question).lower())
+
+
+class LocalCacheBackend:
+    """进程内LRU + TTL缓存
+
+    只在事件循环线程中访问，不加锁。
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        """
+        Args:
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+            ttl: 条目存活时间（秒）
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    async def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {
+            "backend": "local",
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCacheBackend:
+    """基于Redis的共享缓存，多个worker共用同一份缓存（需要安装redis）
+
+    使用 redis.asyncio 客户端，读写不阻塞事件循环；连接和读写都有超时，
+    Redis不可用时请求最多等待 timeout 秒后按未命中处理。
+    条目的淘汰和过期由Redis负责（建议配置 maxmemory-policy allkeys-lru）。
+    """
+
+    def __init__(self, url, ttl=300, prefix="smart_customer_agent:chat:", timeout=0.2):
+        """
+        Args:
+            url: Redis地址
+            ttl: 条目存活时间（秒）
+            prefix: 缓存键前缀
+            timeout: 连接和读写超时（秒）
+        """
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.ttl = ttl
+        self.prefix = prefix
+        # 本进程写入的条目数；条目数需要扫描整个键空间，统计中不提供
+        self.writes = 0
+
+    async def get(self, key):
+        value = await self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key, value):
+        await self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), px=int(self.ttl * 1000))
+        self.writes += 1
+
+    def clear(self):
+        # 缓存键中包含知识库指纹，知识库更新后旧条目不会再被命中，这里无需主动删除，由TTL回收
+        pass
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self):
+        return {"backend": "redis", "writes": self.writes}
+
+
+class ResponseCache:
+    """/api/chat 回答缓存
+
+    缓存键由知识库指纹、业务组、检索方式和归一化后的问题组成。
+    指纹在各worker间一致，知识库更新后指纹变化，旧条目自然失效。
+    """
+
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: 缓存后端，为None时表示禁用缓存
+        """
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(kb_fingerprint, business_group, ranking, question):
+        kb_tag = hashlib.md5(kb_fingerprint.encode('utf-8')).hexdigest()[:12]
+        return f"{kb_tag}:{business_group}:{ranking}:{normalize_question(question)}"
+
+    async def get(self, key):
+        if not self.enabled:
+            return None
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.error(f"读取回答缓存失败: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value):
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.error(f"写入回答缓存失败: {e}")
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    async def close(self):
+        if self.enabled:
+            await self.backend.close()
+
+    def stats(self):
+        if not self.enabled:
+            return {"enabled": False}
+        total = self.hits + self.misses
+        try:
+            backend_stats = self.backend.stats()
+        except Exception as e:
+            logger.error(f"读取回答缓存统计失败: {e}")
+            backend_stats = {}
+        return {
+            "enabled": True,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            **backend_stats,
+        }
+
+
+def create_response_cache(max_entries, ttl, redis_url=None, redis_timeout=0.2):
+    """根据配置创建回答缓存
+
+    Args:
+        max_entries: 本地缓存最大条目数，为0时禁用缓存
+        ttl: 条目存活时间（秒）
+        redis_url: 配置后使用Redis作为共享后端
+        redis_timeout: Redis连接和读写超时（秒）
+
+    Returns:
+        ResponseCache实例
+    """
+    if redis_url:
+        try:
+            return ResponseCache(RedisCacheBackend(redis_url, ttl, timeout=redis_timeout))
+        except ImportError:
+            logger.warning("未安装redis，回答缓存改用进程内缓存")
+    if max_entries <= 0:
+        return ResponseCache(None)
+    return ResponseCache(LocalCacheBackend(max_entries, ttl))
@@ -0,0 +1,357 @@
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _message_key(message):
+    return message["role"], message["content"]
+
+
+def dedupe_prev_messages(stored, prev_messages, new_messages=()):
+    """去掉客户端重复发送的历史消息
+
+    客户端每次请求都会带上最近若干条历史（prev_messages），其开头部分与服务端已保存的对话末尾重叠。
+    取 prev_messages 中与已保存末尾一致的最长前缀，只保留之后的部分；
+    若 prev_messages 末尾就是本次的新消息，也一并去掉。
+
+    Args:
+        stored: 已保存的消息序列
+        prev_messages: 客户端带来的历史消息
+        new_messages: 本次要追加的新消息
+
+    Returns:
+        需要追加的历史消息列表
+    """
+    prev = list(prev_messages)
+    if prev and new_messages and _message_key(prev[-1]) == _message_key(new_messages[0]):
+        prev.pop()
+    if not prev or not stored:
+        return prev
+
+    # 只需比较已保存部分的最后 len(prev) 条
+    stored_keys = [_message_key(message) for message in islice(reversed(stored), len(prev))][::-1]
+    prev_keys = [_message_key(message) for message in prev]
+    for k in range(len(prev_keys), 0, -1):
+        n = min(k, len(stored_keys))
+        if prev_keys[k - n:k] == stored_keys[-n:]:
+            return prev[k:]
+    return prev
+
+
+class _ConversationEntry:
+    __slots__ = ('id', 'business_group', 'messages', 'total', 'touched_at')
+
+    def __init__(self, conversation_id, business_group, max_messages, messages=(), total=0):
+        self.id = conversation_id
+        self.business_group = business_group
+        # 超出上限时自动丢弃最早的消息
+        self.messages = deque(messages, maxlen=max_messages)
+        # 累计追加的消息数（仅用于本进程内的消息序号，持久化时的序号由数据库分配）
+        self.total = total
+        self.touched_at = time.monotonic()
+
+    def to_dict(self):
+        return {"id": self.id, "business_group": self.business_group, "messages": list(self.messages)}
+
+
+class MemoryConversationStore:
+    """进程内对话存储：LRU + 空闲TTL，单个对话的消息数有上限
+
+    只在事件循环线程中访问，不加锁。
+    """
+
+    def __init__(self, max_conversations=10000, max_messages=200, ttl=86400):
+        """
+        Args:
+            max_conversations: 最多保留的对话数，超出时淘汰最久未访问的对话
+            max_messages: 单个对话最多保留的消息数，超出时丢弃最早的消息
+            ttl: 对话空闲多久后过期（秒）
+        """
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def _expire(self):
+        # LRU顺序即最近访问顺序，从最旧的一端清理过期对话
+        deadline = time.monotonic() - self.ttl
+        while self._data:
+            entry = next(iter(self._data.values()))
+            if entry.touched_at > deadline:
+                break
+            self._data.popitem(last=False)
+            self.expirations += 1
+
+    def _lookup(self, conversation_id):
+        self._expire()
+        entry = self._data.get(conversation_id)
+        if entry is not None:
+            entry.touched_at = time.monotonic()
+            self._data.move_to_end(conversation_id)
+        return entry
+
+    def _put(self, entry):
+        self._data[entry.id] = entry
+        self._data.move_to_end(entry.id)
+        while len(self._data) > self.max_conversations:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def _append(self, conversation_id, business_group, messages, prev_messages=()):
+        """追加消息，返回实际追加的 (序号, 消息) 列表"""
+        entry = self._lookup(conversation_id)
+        if entry is None:
+            entry = _ConversationEntry(conversation_id, business_group, self.max_messages)
+            self._put(entry)
+
+        appended = []
+        for message in dedupe_prev_messages(entry.messages, prev_messages, messages) + list(messages):
+            entry.messages.append(message)
+            appended.append((entry.total, message))
+            entry.total += 1
+        return appended
+
+    async def append(self, conversation_id, business_group, messages, prev_messages=()):
+        """追加消息到对话，对话不存在时创建
+
+        Args:
+            conversation_id: 对话ID
+            business_group: 业务组（仅在创建对话时使用）
+            messages: 新消息列表，每条为 {"role", "content", "created_at"}
+            prev_messages: 客户端带来的历史消息，与已保存部分重叠的会被去掉
+        """
+        self._append(conversation_id, business_group, messages, prev_messages)
+
+    async def get(self, conversation_id):
+        """获取对话，不存在或已过期时返回None"""
+        entry = self._lookup(conversation_id)
+        return entry.to_dict() if entry is not None else None
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "max_conversations": self.max_conversations,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteConversationStore:
+    """SQLite持久化对话存储（WAL模式）
+
+    最近访问的对话缓存在 MemoryConversationStore 中，读请求优先命中缓存；
+    新消息先进入队列，由后台任务成批地在独立线程中一次事务写入，不阻塞事件循环。
+    缓存未命中时从数据库加载该对话最近的 max_messages 条消息。
+    消息序号在写入事务中由数据库分配，多个worker进程可以共用同一个数据库文件
+    （但各进程的内存缓存互不同步，某个worker缓存中的对话可能看不到其他worker之后追加的消息）。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY,
+        business_group TEXT,
+        updated_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS messages (
+        conversation_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at TEXT,
+        PRIMARY KEY (conversation_id, seq)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path, max_conversations=10000, max_messages=200, ttl=86400, batch_size=500):
+        """
+        Args:
+            path: 数据库文件路径
+            max_conversations: 内存缓存的最大对话数
+            max_messages: 单个对话最多保留的消息数（数据库中同样截断）
+            ttl: 缓存中对话的空闲过期时间（秒），过期后仍可从数据库加载
+            batch_size: 单次事务最多写入的消息数
+        """
+        self.path = str(path)
+        self.max_messages = max_messages
+        self.batch_size = batch_size
+        self.cache = MemoryConversationStore(max_conversations, max_messages, ttl)
+        self.written = 0
+        self.batches = 0
+        self._conn = None
+        # 所有数据库操作都在这一个线程中执行
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-db")
+        self._queue = None
+        self._writer_task = None
+        # 对话ID -> 尚未落盘的消息数
+        self._pending = {}
+
+    def __len__(self):
+        return len(self.cache)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        return conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def start(self):
+        self._conn = await self._run(self._connect)
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+
+    async def close(self):
+        if self._writer_task is None:
+            return
+        await self.flush()
+        self._writer_task.cancel()
+        self._writer_task = None
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+    async def flush(self):
+        """等待队列中的消息全部写入数据库"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _writer(self):
+        # 组提交：上一批写入期间到达的消息合并为下一批，负载高时批次自然变大，空闲时不额外等待
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._run(self._write_batch, batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                logger.error(f"写入对话数据库失败，丢弃 {len(batch)} 条消息: {e}")
+            finally:
+                for conversation_id, _, _ in batch:
+                    self._pending[conversation_id] -= 1
+                    if not self._pending[conversation_id]:
+                        del self._pending[conversation_id]
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        conversations = {}
+        for conversation_id, business_group, message in batch:
+            conversations[conversation_id] = (business_group, message.get("created_at"))
+
+        with self._conn:
+            # 立即获取写锁：多个进程共用数据库时，读取最大序号到写入消息之间不会有其他进程写入
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO conversations (id, business_group, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                [(cid, group, updated_at) for cid, (group, updated_at) in conversations.items()])
+            # 各对话的下一个消息序号
+            next_seq = {
+                cid: self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE conversation_id = ?",
+                                        (cid,)).fetchone()[0]
+                for cid in conversations
+            }
+            rows = []
+            for cid, _, message in batch:
+                rows.append((cid, next_seq[cid], message["role"], message["content"], message.get("created_at")))
+                next_seq[cid] += 1
+            # 序号冲突说明有其他写入方绕过了写锁，整批回滚而不是覆盖已有消息
+            self._conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows)
+            # 与内存中的上限保持一致，只保留最近的 max_messages 条
+            self._conn.executemany(
+                "DELETE FROM messages WHERE conversation_id = ? AND seq < ?",
+                [(cid, seq - self.max_messages) for cid, seq in next_seq.items() if seq > self.max_messages])
+
+    def _load(self, conversation_id):
+        row = self._conn.execute("SELECT business_group FROM conversations WHERE id = ?",
+                                 (conversation_id,)).fetchone()
+        if row is None:
+            return None
+        rows = self._conn.execute(
+            "SELECT seq, role, content, created_at FROM messages WHERE conversation_id = ? "
+            "ORDER BY seq DESC LIMIT ?", (conversation_id, self.max_messages)).fetchall()
+        rows.reverse()
+        messages = [{"role": role, "content": content, "created_at": created_at}
+                    for _, role, content, created_at in rows]
+        total = rows[-1][0] + 1 if rows else 0
+        return row[0], messages, total
+
+    async def _lookup(self, conversation_id):
+        entry = self.cache._lookup(conversation_id)
+        if entry is not None:
+            return entry
+        # 该对话还有未落盘的消息时，先等写入完成再读库
+        if conversation_id in self._pending:
+            await self.flush()
+        loaded = await self._run(self._load, conversation_id)
+        # 等待期间其他请求可能已经加载或创建了该对话
+        entry = self.cache._lookup(conversation_id)
+        if entry is None and loaded is not None:
+            business_group, messages, total = loaded
+            entry = _ConversationEntry(conversation_id, business_group, self.max_messages, messages, total)
+            self.cache._put(entry)
+        return entry
+
+    async def append(self, conversation_id, business_group, messages, prev_messages=()):
+        """追加消息到对话，参数同 MemoryConversationStore.append"""
+        await self._lookup(conversation_id)
+        for _, message in self.cache._append(conversation_id, business_group, messages, prev_messages):
+            self._pending[conversation_id] = self._pending.get(conversation_id, 0) + 1
+            self._queue.put_nowait((conversation_id, business_group, message))
+
+    async def get(self, conversation_id):
+        """获取对话，缓存未命中时从数据库加载，不存在时返回None"""
+        entry = await self._lookup(conversation_id)
+        return entry.to_dict() if entry is not None else None
+
+    def stats(self):
+        return {
+            **self.cache.stats(),
+            "backend": "sqlite",
+            "pending_writes": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "batches": self.batches,
+        }
+
+
+def create_conversation_store(backend="memory", path=None, max_conversations=10000, max_messages=200, ttl=86400):
+    """根据配置创建对话存储
+
+    Args:
+        backend: "memory" 或 "sqlite"
+        path: SQLite数据库文件路径
+        max_conversations: 内存中最多保留的对话数
+        max_messages: 单个对话最多保留的消息数
+        ttl: 对话空闲过期时间（秒）
+
+    Returns:
+        对话存储实例，使用前需 await start()
+    """
+    if backend == "sqlite":
+        return SQLiteConversationStore(path, max_conversations, max_messages, ttl)
+    if backend != "memory":
+        logger.warning(f"未知的对话存储类型 {backend}，使用内存存储")
+    return MemoryConversationStore(max_conversations, max_messages, ttl)
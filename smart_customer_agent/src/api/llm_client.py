@@ -0,0 +1,311 @@
+import asyncio
+import json
+import logging
+import random
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """LLM调用失败（超时、重试耗尽、熔断或不可重试的错误），调用方应使用兜底回答"""
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败达到阈值后进入打开状态，期间直接拒绝调用；
+    经过 reset_timeout 后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self):
+        """判断当前是否允许发起调用"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def release_probe(self):
+        """探测请求被取消时释放探测名额"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"LLM连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LLMClient:
+    """长连接复用的异步Anthropic Messages API客户端
+
+    - 在应用启动时创建一个 httpx.AsyncClient，所有请求复用连接池中的TCP/TLS连接
+    - 信号量限制同时进行的调用数，超出的调用排队等待
+    - 每次调用有整体截止时间（包括排队、重试和退避）
+    - 429/5xx及网络错误按带抖动的指数退避重试
+    - 连续失败触发熔断，熔断期间直接抛出 LLMUnavailableError
+    """
+
+    def __init__(self, api_key, base_url="https://api.anthropic.com", model="claude-3-opus-20240229",
+                 max_concurrency=16, timeout=30.0, max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 breaker=None, transport=None):
+        """
+        Args:
+            api_key: Anthropic API密钥
+            base_url: API地址（测试时可指向本地模拟服务）
+            model: 模型名称
+            max_concurrency: 最大并发调用数
+            timeout: 单次调用的整体截止时间（秒）
+            max_retries: 最大重试次数
+            backoff_base: 指数退避的初始等待时间（秒）
+            backoff_max: 单次退避的最大等待时间（秒）
+            breaker: 熔断器，为None时使用默认配置
+            transport: 自定义httpx传输层（测试用）
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+        self.in_flight = 0
+        self.retries = 0
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def start(self):
+        """创建连接池"""
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "x-api-key": self.api_key,
+                "content-type": "application/json",
+                "anthropic-version": "2023-06-01"
+            },
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+            timeout=httpx.Timeout(self.timeout),
+            transport=self.transport
+        )
+
+    async def close(self):
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt, response=None):
+        # full jitter：在 [0, min(上限, 基数 * 2^attempt)] 之间均匀取值
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    async def _post_with_retries(self, payload):
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await self._client.post("/v1/messages", json=payload)
+            except httpx.TransportError as e:
+                error = f"网络错误: {e}"
+            else:
+                if response.status_code == 429 or response.status_code >= 500:
+                    error = f"HTTP {response.status_code}"
+                elif response.status_code >= 400:
+                    raise LLMUnavailableError(f"HTTP {response.status_code}: {response.text[:200]}")
+                else:
+                    return response.json()
+
+            if attempt == self.max_retries:
+                raise LLMUnavailableError(f"重试 {self.max_retries} 次后仍失败: {error}")
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def _call(self, payload):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await self._post_with_retries(payload)
+            finally:
+                self.in_flight -= 1
+
+    def build_payload(self, system, messages, max_tokens=1000):
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "system": system,
+            "messages": messages
+        }
+
+    async def complete(self, system, messages, max_tokens=1000):
+        """调用Messages API并返回回答文本
+
+        Args:
+            system: 系统提示
+            messages: 消息列表（role为user/assistant）
+            max_tokens: 最大生成token数
+
+        Returns:
+            回答文本
+
+        Raises:
+            LLMUnavailableError: 熔断、超时、重试耗尽或不可重试的错误
+        """
+        if self._client is None:
+            raise LLMUnavailableError("LLM客户端未启动")
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLM调用已熔断")
+
+        try:
+            result = await asyncio.wait_for(
+                self._call(self.build_payload(system, messages, max_tokens)), self.timeout)
+            text = "".join(block.get("text", "") for block in result.get("content", [])
+                           if block.get("type") == "text")
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"LLM调用超过 {self.timeout} 秒截止时间")
+        except LLMUnavailableError:
+            self.breaker.record_failure()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"LLM响应解析失败: {e}") from e
+
+        self.breaker.record_success()
+        return text
+
+    async def _iter_text_deltas(self, response, deadline):
+        """解析Messages API的SSE事件流，逐段返回文本增量"""
+        async for line in response.aiter_lines():
+            if time.monotonic() > deadline:
+                raise LLMUnavailableError(f"LLM调用超过 {self.timeout} 秒截止时间")
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            if event.get("type") == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                yield event["delta"]["text"]
+            elif event.get("type") == "error":
+                raise LLMUnavailableError(f"流式响应错误: {event.get('error')}")
+            elif event.get("type") == "message_stop":
+                return
+
+    async def _stream_with_retries(self, payload, deadline):
+        # 只在收到第一段文本之前重试，已经输出给调用方的内容无法撤回
+        received = False
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMUnavailableError(f"LLM调用超过 {self.timeout} 秒截止时间")
+            response = None
+            try:
+                async with self._client.stream("POST", "/v1/messages", json=payload,
+                                               timeout=remaining) as response:
+                    if response.status_code == 429 or response.status_code >= 500:
+                        error = f"HTTP {response.status_code}"
+                    elif response.status_code >= 400:
+                        await response.aread()
+                        raise LLMUnavailableError(f"HTTP {response.status_code}: {response.text[:200]}")
+                    else:
+                        async for text in self._iter_text_deltas(response, deadline):
+                            received = True
+                            yield text
+                        return
+            except httpx.TransportError as e:
+                if received:
+                    raise LLMUnavailableError(f"流式响应中断: {e}")
+                error = f"网络错误: {e}"
+
+            if attempt == self.max_retries:
+                raise LLMUnavailableError(f"重试 {self.max_retries} 次后仍失败: {error}")
+            self.retries += 1
+            await asyncio.sleep(min(self._backoff(attempt, response), max(0.0, deadline - time.monotonic())))
+
+    async def stream(self, system, messages, max_tokens=1000):
+        """流式调用Messages API，逐段返回回答文本
+
+        并发上限、截止时间、重试和熔断规则与 complete 相同，但只在收到第一段文本之前重试。
+
+        Args:
+            system: 系统提示
+            messages: 消息列表（role为user/assistant）
+            max_tokens: 最大生成token数
+
+        Yields:
+            回答文本增量
+
+        Raises:
+            LLMUnavailableError: 熔断、超时、重试耗尽、流中断或不可重试的错误
+        """
+        if self._client is None:
+            raise LLMUnavailableError("LLM客户端未启动")
+        if not self.breaker.allow():
+            raise LLMUnavailableError("LLM调用已熔断")
+
+        payload = self.build_payload(system, messages, max_tokens)
+        payload["stream"] = True
+        deadline = time.monotonic() + self.timeout
+        try:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    async for text in self._stream_with_retries(payload, deadline):
+                        yield text
+                finally:
+                    self.in_flight -= 1
+        except (asyncio.CancelledError, GeneratorExit):
+            # 调用方中途放弃（如客户端断开），不计为LLM失败
+            self.breaker.release_probe()
+            raise
+        except LLMUnavailableError:
+            self.breaker.record_failure()
+            raise
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"LLM流式响应解析失败: {e}") from e
+
+        self.breaker.record_success()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "retries": self.retries,
+            "breaker_state": self.breaker.state,
+        }
@@ -0,0 +1,113 @@
+from bisect import bisect_left
+import time
+
+# 默认延迟分桶（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    items = ",".join(f'{name}="{str(value)}"' for name, value in labels.items())
+    return "{" + items + "}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label', 'start')
+
+    def __init__(self, histogram, label):
+        self.histogram = histogram
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, self.label)
+        return False
+
+
+class Histogram:
+    """Prometheus histogram：按标签值分别统计各分桶计数、总和与次数
+
+    只在事件循环线程中观察，不加锁；每次观察只有一次二分查找和几次整数加法。
+    """
+
+    def __init__(self, name, documentation, label_name=None, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            name: 指标名
+            documentation: 指标说明（HELP）
+            label_name: 标签名，如 "stage"；为None时不带标签
+            buckets: 分桶上界（升序），自动追加 +Inf
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self.bounds = tuple(buckets)
+        # 标签值 -> [各分桶计数（最后一个为+Inf）, 总和]
+        self._series = {}
+
+    def observe(self, value, label=None):
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = [[0] * (len(self.bounds) + 1), 0.0]
+        series[0][bisect_left(self.bounds, value)] += 1
+        series[1] += value
+
+    def time(self, label=None):
+        """计时上下文管理器，退出时把耗时记入对应标签"""
+        return _Timer(self, label)
+
+    def snapshot(self, label=None):
+        """返回 (累计分桶计数, 总和, 次数)，用于测试和基准脚本"""
+        counts, total = self._series.get(label, [[0] * (len(self.bounds) + 1), 0.0])
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label in list(self._series):
+            labels = {self.label_name: label} if self.label_name else {}
+            cumulative, total, count = self.snapshot(label)
+            for bound, value in zip(self.bounds + (float("inf"),), cumulative):
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {value}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def render_gauge(name, documentation, value, metric_type="gauge"):
+    """渲染单个无标签的gauge/counter"""
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}",
+            f"{name} {_format_value(value)}"]
+
+
+def render_metrics(histograms, gauges):
+    """生成Prometheus文本格式的指标输出
+
+    Args:
+        histograms: Histogram 列表
+        gauges: (指标名, 说明, 值[, 类型]) 列表，值在抓取时计算
+
+    Returns:
+        指标文本
+    """
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.render())
+    for gauge in gauges:
+        lines.extend(render_gauge(*gauge))
+    return "\n".join(lines) + "\n"
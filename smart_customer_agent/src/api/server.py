@@ -0,0 +1,117 @@
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+# worker启动后不到该时间（秒）就退出时，重启前先等待，避免反复崩溃时空转
+MIN_WORKER_LIFETIME = 1.0
+
+
+def create_listen_socket(host, port, backlog=2048):
+    """在父进程中创建监听socket，由所有worker共享"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock, log_level):
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def _spawn_worker(app, sock, log_level):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(app, sock, log_level)
+        except BaseException:
+            logger.exception("worker异常退出")
+            code = 1
+        finally:
+            os._exit(code)
+    logger.info(f"已启动worker (pid={pid})")
+    return pid
+
+
+def serve_prefork(host="0.0.0.0", port=8000, workers=2, log_level="info"):
+    """预加载知识库后fork多个worker共享同一监听端口
+
+    知识库在父进程中加载并预热一次，之后 gc.freeze() 把已有对象移出垃圾回收的追踪范围，
+    fork出的worker以写时复制方式共享这部分内存页，不会因为GC遍历修改引用信息而触发复制。
+    父进程只负责监督：转发退出信号，并重启异常退出的worker。
+
+    Args:
+        host: 监听地址
+        port: 监听端口
+        workers: worker进程数
+        log_level: uvicorn日志级别
+    """
+    if not hasattr(os, "fork"):
+        import uvicorn
+
+        logger.warning("当前平台不支持fork，改用uvicorn多进程模式（各worker分别加载知识库）")
+        uvicorn.run("src.api.app:app", host=host, port=port, workers=workers, log_level=log_level)
+        return
+
+    # 加载期间暂停GC，避免大量新建对象反复触发回收
+    gc.disable()
+    from src.api import app as app_module
+
+    start = time.perf_counter()
+    app_module.preload_knowledge_base()
+    logger.info(f"父进程预加载知识库耗时 {time.perf_counter() - start:.2f}s")
+    gc.collect()
+    gc.freeze()
+
+    sock = create_listen_socket(host, port)
+    logger.info(f"监听 {host}:{port}，启动 {workers} 个worker")
+
+    started_at = {}
+    stopping = False
+
+    def handle_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(started_at):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    for _ in range(workers):
+        started_at[_spawn_worker(app_module.app, sock, log_level)] = time.monotonic()
+
+    while started_at:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        lifetime = time.monotonic() - started_at.pop(pid, time.monotonic())
+        if stopping:
+            continue
+        logger.warning(f"worker (pid={pid}) 意外退出 (status={status})，重新启动")
+        if lifetime < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        started_at[_spawn_worker(app_module.app, sock, log_level)] = time.monotonic()
+
+    sock.close()
+    logger.info("所有worker已退出")
@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+
+import pandas as pd
+
+from src.data_processing.ingestion import read_table
+
+logger = logging.getLogger(__name__)
+
+# 优先使用Parquet，未安装pyarrow时退化为按列pickle目录（同样支持只读部分列）
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "columns"
+
+# 缓存默认放在源文件同目录下
+CACHE_DIR_NAME = ".export_cache"
+
+# 类型规范化规则变化时递增，旧缓存随之失效
+CACHE_VERSION = 1
+
+TIME_COLUMNS = ['user_start_time', 'user_end_time', 'create_time', 'send_time']
+CATEGORY_COLUMNS = ['group_name', 'servicer_name']
+
+
+def file_digest(path, block_size=1 << 20):
+    """计算文件内容的SHA-256摘要"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_export(df):
+    """统一聊天导出的列类型
+
+    - 时间列转为datetime64，无法解析的值为NaT
+    - group_name、servicer_name 转为category，取值重复度高，内存和比较开销都小得多
+    - sender_type 无缺失时转为int8，有缺失时转为float32（与 == 1.0 等比较的结果不变）
+
+    Args:
+        df: 原始导出数据
+
+    Returns:
+        类型规范化后的DataFrame（原地修改并返回）
+    """
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if 'sender_type' in df.columns:
+        sender_type = pd.to_numeric(df['sender_type'], errors='coerce')
+        df['sender_type'] = sender_type.astype('float32' if sender_type.isna().any() else 'int8')
+    return df
+
+
+def cache_path(path, cache_dir=None, digest=None):
+    """源文件对应的缓存路径，文件名包含内容摘要，源文件内容变化后自动指向新缓存"""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    digest = digest or file_digest(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    suffix = ".parquet" if CACHE_FORMAT == "parquet" else ".columns"
+    return os.path.join(cache_dir, f"{stem}-v{CACHE_VERSION}-{digest[:16]}{suffix}")
+
+
+def _write_cache(df, target):
+    tmp_path = f"{target}.tmp{os.getpid()}"
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        os.makedirs(tmp_path)
+        for i, col in enumerate(df.columns):
+            with open(os.path.join(tmp_path, f"{i}.pkl"), 'wb') as f:
+                pickle.dump(df[col], f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp_path, "columns.pkl"), 'wb') as f:
+            pickle.dump(list(df.columns), f, protocol=pickle.HIGHEST_PROTOCOL)
+    # 先写临时文件再改名，并发运行的脚本不会读到写了一半的缓存
+    try:
+        os.replace(tmp_path, target)
+    except OSError:
+        # 目录形式的缓存已被其他进程写好
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _select_columns(names, columns):
+    if columns is None:
+        return list(names)
+    missing = [name for name in columns if name not in names]
+    if missing:
+        raise ValueError(f"文件中不存在列: {missing}")
+    # 与 read_table 一致，按文件中的列顺序返回
+    return [name for name in names if name in columns]
+
+
+def _read_cache(target, columns=None):
+    if CACHE_FORMAT == "parquet":
+        return pd.read_parquet(target, columns=columns)
+
+    with open(os.path.join(target, "columns.pkl"), 'rb') as f:
+        names = pickle.load(f)
+    data = {}
+    for name in _select_columns(names, columns):
+        with open(os.path.join(target, f"{names.index(name)}.pkl"), 'rb') as f:
+            data[name] = pickle.load(f)
+    return pd.DataFrame(data)
+
+
+def _remove_stale(target):
+    """删除同一源文件的旧版本缓存"""
+    cache_dir = os.path.dirname(target)
+    prefix = os.path.basename(target).rsplit('-', 2)[0] + '-v'
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and entry != target and '.tmp' not in name:
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                os.remove(entry)
+
+
+def _convert(path, target):
+    logger.info(f"转换 {path} 为列式缓存 ({CACHE_FORMAT})")
+    df = normalize_export(read_table(path))
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _write_cache(df, target)
+        _remove_stale(target)
+        logger.info(f"已写入缓存 {target}: {len(df)} 行")
+    except OSError as e:
+        logger.warning(f"写入列式缓存失败，本次直接使用源文件数据: {e}")
+    return df
+
+
+def build_export_cache(path, cache_dir=None):
+    """把聊天导出文件一次性转换为列式缓存
+
+    Args:
+        path: 源文件路径（.xlsx 或 .csv）
+        cache_dir: 缓存目录，为None时使用源文件同目录下的 .export_cache
+
+    Returns:
+        缓存路径；内容未变化时直接返回已有缓存
+    """
+    target = cache_path(path, cache_dir)
+    if not os.path.exists(target):
+        _convert(path, target)
+    return target
+
+
+def load_export(path, columns=None, nrows=None, cache_dir=None, use_cache=True):
+    """读取聊天导出文件，优先使用按内容摘要索引的列式缓存
+
+    首次读取时整表转换并写入缓存（只需要部分列或部分行时也转换整表），之后源文件内容不变就直接读缓存，
+    只加载 columns 指定的列。缓存写入失败（如目录只读）时直接返回从源文件读取的数据。
+
+    Args:
+        path: 源文件路径（.xlsx 或 .csv）
+        columns: 只读取的列名列表，为None时读取全部列
+        nrows: 只返回前多少行
+        cache_dir: 缓存目录，为None时使用源文件同目录下的 .export_cache
+        use_cache: 为False时不读写缓存，直接读取源文件并规范化类型
+
+    Returns:
+        DataFrame，列类型见 normalize_export
+    """
+    if not use_cache:
+        return normalize_export(read_table(path, columns=columns, nrows=nrows))
+
+    target = cache_path(path, cache_dir)
+    if os.path.exists(target):
+        df = _read_cache(target, columns)
+    else:
+        df = _convert(path, target)
+        if columns is not None:
+            df = df[_select_columns(df.columns, columns)]
+    if nrows is not None:
+        df = df.iloc[:nrows].copy()
+        # 缓存中的类别来自整个文件，去掉前 nrows 行中没有出现的，与直接读取前 nrows 行的结果一致
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.remove_unused_categories()
+    return df
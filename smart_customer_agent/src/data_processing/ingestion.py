@@ -0,0 +1,168 @@
+import pandas as pd
+
+# 每块读取的行数
+DEFAULT_CHUNK_SIZE = 100000
+
+
+class UnsortedInputError(ValueError):
+    """按已排序方式流式读取时，同一对话的消息在文件中不连续"""
+
+
+def _iter_excel_chunks(path, chunk_size, columns=None, nrows=None):
+    # openpyxl只读模式逐行解析工作表XML，不构建整个工作簿的单元格对象
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        if columns is None:
+            positions = list(range(len(header)))
+        else:
+            missing = [name for name in columns if name not in header]
+            if missing:
+                raise ValueError(f"文件中不存在列: {missing}")
+            # 与 pd.read_excel(usecols=...) 一致，按文件中的列顺序返回
+            positions = sorted(header.index(name) for name in columns)
+        names = [header[i] for i in positions]
+        if nrows is not None and nrows <= 0:
+            return
+
+        buffer = []
+        remaining = nrows
+        for row in rows:
+            # 与 pd.read_excel 一致，跳过整行为空的行
+            if not any(value is not None for value in row):
+                continue
+            buffer.append(tuple(row[i] if i < len(row) else None for i in positions))
+            if remaining is not None:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame.from_records(buffer, columns=names)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=names)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, nrows=None):
+    """分块读取Excel或CSV文件
+
+    Args:
+        path: 文件路径（.xlsx 或 .csv）
+        chunk_size: 每块的行数
+        columns: 只读取的列名列表，为None时读取全部列
+        nrows: 最多读取的行数，为None时读取全部
+
+    Yields:
+        每块一个DataFrame，索引从0开始
+    """
+    path = str(path)
+    if path.endswith('.csv'):
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns, nrows=nrows)
+    elif path.endswith(('.xlsx', '.xlsm')):
+        yield from _iter_excel_chunks(path, chunk_size, columns, nrows)
+    else:
+        raise ValueError("不支持的文件格式，请提供.xlsx或.csv文件")
+
+
+def read_table(path, columns=None, nrows=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """分块读取并合并为一个DataFrame
+
+    与 pd.read_excel 相比不需要先把全部单元格读成中间列表，峰值内存约为结果本身；
+    只读取需要的列时内存进一步减少。
+
+    Args:
+        path: 文件路径（.xlsx 或 .csv）
+        columns: 只读取的列名列表，为None时读取全部列
+        nrows: 最多读取的行数
+        chunk_size: 每块的行数
+
+    Returns:
+        DataFrame
+    """
+    chunks = list(iter_chunks(path, chunk_size, columns, nrows))
+    if not chunks:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def iter_conversation_batches(path, key='touch_id', chunk_size=DEFAULT_CHUNK_SIZE, columns=None, nrows=None,
+                              assume_sorted=True, transform=None):
+    """流式读取聊天导出文件，每次返回若干条完整对话的消息
+
+    assume_sorted为True时要求同一对话的消息在文件中连续（导出文件按对话排列），
+    每块末尾尚未结束的对话留到下一块，内存中只保留一块数据和未结束的对话；
+    发现同一对话的消息不连续时抛出 UnsortedInputError。
+    assume_sorted为False时先读完整个文件，再一次性返回全部对话。
+
+    Args:
+        path: 文件路径（.xlsx 或 .csv）
+        key: 对话ID列名
+        chunk_size: 每块读取的行数
+        columns: 只读取的列名列表，为None时读取全部列
+        nrows: 最多读取的行数
+        assume_sorted: 文件是否已按对话连续排列
+        transform: 对每块原始数据做的预处理（如类型转换），参数和返回值都是DataFrame
+
+    Yields:
+        DataFrame，其中每个对话的消息都是完整的，保持文件中的原始顺序
+    """
+    if columns is not None and key not in columns:
+        columns = [key] + list(columns)
+    chunks = iter_chunks(path, chunk_size, columns, nrows)
+    if transform is not None:
+        chunks = map(transform, chunks)
+
+    if not assume_sorted:
+        batch = pd.concat(list(chunks), ignore_index=True)
+        batch = batch[batch[key].notna()]
+        if len(batch):
+            yield batch
+        return
+
+    closed = set()
+    pending = None
+    for chunk in chunks:
+        # 与 groupby 一致，丢弃没有对话ID的行
+        chunk = chunk[chunk[key].notna()]
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        if not len(chunk):
+            continue
+        keys = chunk[key]
+        # 每段连续相同对话ID的起始行；同一对话出现在多个段中说明文件未按对话排列
+        starts = (keys != keys.shift()).to_numpy(copy=True)
+        starts[0] = True
+        segment_keys = keys[starts]
+        if segment_keys.duplicated().any() or closed.intersection(segment_keys.tolist()):
+            raise UnsortedInputError(f"{path} 中同一{key}的消息不连续，请使用 assume_sorted=False")
+
+        # 最后一个对话可能延续到下一块，留到下一块再返回
+        last_start = int(starts.nonzero()[0][-1])
+        pending = chunk.iloc[last_start:].reset_index(drop=True)
+        if last_start:
+            closed.update(segment_keys.iloc[:-1].tolist())
+            yield chunk.iloc[:last_start].reset_index(drop=True)
+
+    if pending is not None and len(pending):
+        yield pending
+
+
+def iter_conversations(path, key='touch_id', chunk_size=DEFAULT_CHUNK_SIZE, columns=None, nrows=None,
+                       assume_sorted=True, transform=None):
+    """流式读取聊天导出文件，逐个返回完整的对话
+
+    参数同 iter_conversation_batches。
+
+    Yields:
+        (对话ID, 该对话全部消息的DataFrame)
+    """
+    for batch in iter_conversation_batches(path, key, chunk_size, columns, nrows, assume_sorted, transform):
+        yield from batch.groupby(key, sort=False)
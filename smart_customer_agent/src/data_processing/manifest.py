@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing.records import RecordWriter, iter_encoded_records
+
+logger = logging.getLogger(__name__)
+
+# 增量处理清单，放在输出目录下
+MANIFEST_FILE = "manifest.json"
+
+# 摘要的计算方式变化时递增，旧清单随之失效（下次运行全量处理）
+MANIFEST_VERSION = 1
+
+
+def _row_hashes(df):
+    columns = {}
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        # 同一列在不同数据块中可能是整数或浮点数（有缺失值时），统一按浮点数计算哈希
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iuf':
+            values = values.astype('float64')
+        columns[i] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def conversation_hashes(df, key='touch_id'):
+    """按对话计算消息内容摘要
+
+    每行先用 pd.util.hash_pandas_object 计算64位哈希（数值列统一按浮点数），再按对话把各行哈希（文件中的顺序）和列名一起计算摘要；
+    对话的任何一条消息、消息顺序或列结构变化，摘要都会变化。摘要只取决于该对话自己的行。
+
+    Args:
+        df: 消息DataFrame，每个对话的消息都是完整的
+        key: 对话ID列名
+
+    Returns:
+        {str(对话ID): 摘要}，对话ID缺失的行不参与
+    """
+    if not len(df):
+        return {}
+    codes, uniques = pd.factorize(df[key])
+    valid = np.flatnonzero(codes >= 0)
+    if not len(valid):
+        return {}
+    order = valid[np.argsort(codes[valid], kind='stable')]
+    codes = codes[order]
+    row_hashes = _row_hashes(df)[order]
+    starts = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+    ends = np.append(starts[1:], len(order))
+
+    header = "\x1f".join(map(str, df.columns)).encode('utf-8')
+    hashes = {}
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        digest = hashlib.blake2b(header, digest_size=16)
+        digest.update(row_hashes[start:end].tobytes())
+        hashes[str(uniques[codes[start]])] = digest.hexdigest()
+    return hashes
+
+
+def changed_conversations(hashes, previous):
+    """本次输入中新增或内容变化的对话ID集合"""
+    return {conv_id for conv_id, digest in hashes.items() if previous.get(conv_id) != digest}
+
+
+def load_manifest(path):
+    """读取上次处理的清单
+
+    Returns:
+        清单字典，conversations 为 {对话ID: 摘要}，其余为 save_manifest 时传入的字段；
+        清单不存在、版本不符或无法解析时返回None，调用方应全量处理
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"读取增量清单 {path} 失败，将全量处理: {e}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.info(f"增量清单 {path} 版本不符，将全量处理")
+        return None
+    return manifest
+
+
+def save_manifest(path, hashes, **fields):
+    """写入清单，先写临时文件再改名，中途失败不会留下写了一半的清单
+
+    Args:
+        path: 清单路径
+        hashes: {对话ID: 摘要}
+        fields: 调用方需要在下次运行时使用的其他字段
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, **fields, "conversations": hashes}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def discard_manifest(path):
+    """删除清单，在开始改写输出文件之前调用
+
+    输出文件写到一半时中断（Ctrl-C、崩溃），剩下的是截断但仍可解析的文件；清单已删除，下次增量运行会全量处理，
+    而不会把截断文件中缺失的对话当作未变化而丢失。成功完成后由 save_manifest 重新写入。
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def merge_records(path, updates, replaced, key, default=None):
+    """把重新处理的记录合并进已有的输出文件
+
+    已有记录中 key(记录) 属于 replaced 的被丢弃，其余按原顺序保留并原样复制（不重新序列化），
+    updates 依次追加在后面。先写到同目录的临时文件（后缀不变，格式相同），完成后替换原文件。
+
+    Args:
+        path: 已有的输出文件（.json、.jsonl 或 .jsonl.zst）
+        updates: 本次处理得到的记录
+        replaced: 需要替换的对话ID集合
+        key: 从记录取对话ID（字符串）的函数
+        default: 传给 RecordWriter 的 default
+
+    Returns:
+        合并后的记录数
+    """
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".tmp{os.getpid()}-{name}")
+    try:
+        with RecordWriter(tmp_path, default=default) as writer:
+            for record, text in iter_encoded_records(path):
+                if key(record) not in replaced:
+                    writer.write_encoded(text)
+            writer.write_all(updates)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return writer.count
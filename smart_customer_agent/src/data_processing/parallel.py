@@ -0,0 +1,125 @@
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# 自动确定分块大小：先在主进程中处理一小段数据测出速度，使每块在worker中约耗时 TARGET_CHUNK_SECONDS
+PROBE_SIZE = 512
+TARGET_CHUNK_SECONDS = 0.2
+# 分块太小时进程间传输的开销占比过高
+MIN_CHUNK_SIZE = 64
+# 每个进程平均至少分到的块数：块越多负载越均衡
+CHUNKS_PER_WORKER = 4
+
+# 预热时处理的文本，覆盖各清洗函数中的HTML、URL、格式标记、标点、号码等模式
+WARMUP_TEXT = ("【系统提示】预热【/系统提示】<b>**您好**</b>，订单123456789012345678、快递单号YT1234567890"
+               "和手机13800000000，iPhone 15 256GB 价格1999元？？详见 https://example.com/a?b=1 &amp;&nbsp;")
+
+
+def _warm_up(funcs):
+    for func in funcs:
+        func(WARMUP_TEXT)
+
+
+def _apply_chunk(func, chunk, batched):
+    if batched:
+        return func(chunk)
+    return [func(item) for item in chunk]
+
+
+class ParallelMap:
+    """在多个进程中按块对文本数组执行清洗函数，结果顺序与输入相同
+
+    进程池在第一次需要时创建并在整个生命周期内复用，流式处理时每批数据不必重新启动进程；
+    worker启动时先用 warmup 中的函数处理一段预热文本，导入模块、编译正则，第一块数据不承担这部分开销。
+    workers 为1或数据量不超过探测段时直接在主进程中处理，不启动进程池。
+
+    Args:
+        workers: 进程数
+        chunk_size: 每块的条数，为None时按各函数测得的速度自动确定
+        warmup: 预热用的函数（接受一个字符串），需要可以被pickle（模块级函数）
+    """
+
+    def __init__(self, workers=1, chunk_size=None, warmup=()):
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.warmup = tuple(warmup)
+        # {(函数, 是否按块调用): 每秒处理条数}
+        self.rates = {}
+        self._executor = None
+
+    def tune_chunk_size(self, func, batched, remaining):
+        """按测得的速度确定分块大小：每块约 TARGET_CHUNK_SECONDS，且每个进程至少分到 CHUNKS_PER_WORKER 块"""
+        if self.chunk_size:
+            return self.chunk_size
+        upper = max(MIN_CHUNK_SIZE, math.ceil(remaining / (self.workers * CHUNKS_PER_WORKER)))
+        rate = self.rates.get((func, batched))
+        if not rate:
+            return upper
+        return max(MIN_CHUNK_SIZE, min(upper, int(rate * TARGET_CHUNK_SECONDS)))
+
+    def map(self, func, items, batched=False):
+        """对 items 中的每一项执行清洗函数
+
+        Args:
+            func: 模块级函数；batched 为False时逐条调用 func(item)，为True时调用 func(一块数据的列表)，
+                返回等长的结果列表
+            items: 待处理的数据（列表、数组或Series）
+            batched: 是否按块调用 func
+
+        Returns:
+            结果列表，顺序与 items 相同
+        """
+        items = list(items)
+        probe = 0 if self.chunk_size else min(len(items), PROBE_SIZE)
+        if self.workers <= 1 or len(items) <= probe:
+            return _apply_chunk(func, items, batched)
+
+        # 第一次处理该函数时，用开头一段数据在主进程中测速，结果直接使用
+        results = []
+        if probe and (func, batched) not in self.rates:
+            start = time.perf_counter()
+            results = _apply_chunk(func, items[:probe], batched)
+            elapsed = time.perf_counter() - start
+            self.rates[(func, batched)] = probe / elapsed if elapsed > 0 else 0
+        else:
+            probe = 0
+
+        chunk_size = self.tune_chunk_size(func, batched, len(items) - probe)
+        # 最多同时提交 2 * workers 块，结果按提交顺序取回
+        executor = self._ensure_executor()
+        pending = deque()
+        for start in range(probe, len(items), chunk_size):
+            pending.append(executor.submit(_apply_chunk, func, items[start:start + chunk_size], batched))
+            if len(pending) >= 2 * self.workers:
+                results.extend(pending.popleft().result())
+        while pending:
+            results.extend(pending.popleft().result())
+        return results
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up,
+                                                 initargs=(self.warmup,))
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def parallel_map(func, items, workers=1, chunk_size=None, batched=False, warmup=()):
+    """一次性的 ParallelMap.map，处理完即关闭进程池
+
+    Returns:
+        结果列表，顺序与 items 相同
+    """
+    with ParallelMap(workers, chunk_size=chunk_size, warmup=warmup) as mapper:
+        return mapper.map(func, items, batched=batched)
@@ -1,23 +1,267 @@
 import pandas as pd
 import os
 import re
-import json
 from tqdm import tqdm
 from collections import defaultdict
 import numpy as np
 from datetime import datetime
 import argparse
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# 以脚本方式运行时保证可以导入src包
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.data_processing.ingestion import UnsortedInputError, iter_conversation_batches, read_table
+from src.data_processing.manifest import (MANIFEST_FILE, changed_conversations, conversation_hashes, discard_manifest,
+                                          load_manifest, merge_records, save_manifest)
+from src.data_processing.records import (OUTPUT_FORMATS, RecordWriter, encode_record, iter_encoded_records, iter_records,
+                                         record_path, write_records)
+from src.intent.classifier import classify_intent
+from src.retrieval.loader import knowledge_base_fingerprint, load_faqs
+from src.retrieval.snapshot import SNAPSHOT_FILE, write_snapshot
+
+# 并行处理时每个进程平均分到的分片数：分片越多负载越均衡，进程间传输的次数也越多
+SHARDS_PER_WORKER = 4
+
+def is_faq_candidate(qa_pair):
+    """判断一个QA对是否是FAQ候选
+    
+    标准:
+    1. 问题和回答都不为空且长度适当
+    2. 问题是通用的，不包含特定订单号等个人信息
+    3. 回答不是简单的"是的"/"好的"等
+    
+    Args:
+        qa_pair: QA对
+        
+    Returns:
+        是否为FAQ候选
+    """
+    question = qa_pair['question']
+    answer = qa_pair['answer']
+    
+    # 基本长度验证
+    if (not question or not answer or 
+        len(question.strip()) < 5 or len(question.strip()) > 100 or
+        len(answer.strip()) < 10):
+        return False
+    
+    # 检查问题是否包含特定信息
+    if re.search(r'\d{10,}', question): # 订单号等数字序列
+        return False
+        
+    # 检查答案是否是简单回复
+    simple_answers = ['好的', '可以的', '是的', '谢谢', '不客气', '嗯', '我知道了']
+    if any(ans in answer for ans in simple_answers) and len(answer) < 15:
+        return False
+        
+    return True
+
+def json_default(value):
+    """json序列化对话元数据中的时间和numpy标量：时间与消息时间格式相同，缺失时间为null"""
+    if value is pd.NaT:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def split_conversations(batch, shards, key='touch_id', sort=True):
+    """把一批消息按对话排列后切成至多 shards 个分片，同一对话只出现在一个分片中
+    
+    Args:
+        batch: 消息DataFrame，同一对话的消息可以不连续
+        shards: 分片数，按行数大致均分
+        key: 对话ID列名
+        sort: 为True时对话按ID排序（与 groupby 默认一致），否则按首次出现的顺序
+        
+    Returns:
+        分片DataFrame列表，依次拼接即为全部对话，对话内保持原始顺序；丢弃没有对话ID的行
+    """
+    batch = batch[batch[key].notna()]
+    codes, _ = pd.factorize(batch[key], sort=sort)
+    order = np.argsort(codes, kind='stable')
+    batch = batch.iloc[order]
+    
+    # 每个对话的起始位置（不含0），切点取按行数均分位置之后的第一个对话起点
+    conversation_starts = np.flatnonzero(np.diff(codes[order])) + 1
+    targets = np.arange(1, shards) * len(batch) / shards
+    positions = np.searchsorted(conversation_starts, targets)
+    cuts = np.unique(conversation_starts[positions[positions < len(conversation_starts)]]).tolist()
+    bounds = [0] + cuts + [len(batch)]
+    return [batch.iloc[begin:end] for begin, end in zip(bounds[:-1], bounds[1:]) if end > begin]
+
+def process_conversation_batch(batch, key='touch_id'):
+    """处理一批完整的对话，可以在worker进程中运行
+    
+    消息按列转换为数组后逐条遍历，不对每条消息构造Series。
+    
+    Args:
+        batch: 经过 ConversationProcessor.prepare_frame 的消息DataFrame，同一对话的消息连续排列
+        key: 对话ID列名
+        
+    Returns:
+        (对话列表, QA对列表, FAQ候选列表, 出现的意图集合)，对话按在 batch 中的顺序排列
+    """
+    conversations, qa_pairs, faq_candidates, intents = [], [], [], set()
+    if not len(batch):
+        return conversations, qa_pairs, faq_candidates, intents
+    
+    # 对话内按序号稳定排序
+    keys = batch[key].to_numpy()
+    codes = np.concatenate([[0], np.cumsum(keys[1:] != keys[:-1])])
+    order = pd.DataFrame({'conversation': codes, 'seq_no': batch['seq_no'].to_numpy()}).sort_values(
+        ['conversation', 'seq_no'], kind='stable').index.to_numpy()
+    batch = batch.iloc[order]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1]).tolist()
+    ends = starts[1:] + [len(batch)]
+    
+    # 每个对话的元数据取第一条消息的值，与 iloc[0] 相同
+    first_rows = {}
+    for col in ['group_name', 'user_start_time', 'user_end_time']:
+        values = batch[col].iloc[starts].array
+        first_rows[col] = [values[i] for i in range(len(values))]
+    conv_ids = batch[key].iloc[starts].tolist()
+    
+    # 消息字段，与 iterrows 得到的值相同
+    contents = batch['send_content'].to_numpy(dtype=object)
+    missing = pd.isna(contents).tolist()
+    contents = contents.tolist()
+    if 'sender_category' in batch.columns:
+        senders = batch['sender_category'].to_numpy(dtype=object).tolist()
+    else:
+        senders = ['未知'] * len(batch)
+    if 'send_time' in batch.columns:
+        send_time = batch['send_time']
+        timestamps = send_time.dt.strftime('%Y-%m-%d %H:%M:%S').astype(object).where(send_time.notna(), None).tolist()
+    else:
+        timestamps = [None] * len(batch)
+    
+    for k, (start, end) in enumerate(zip(starts, ends)):
+        conv_id = conv_ids[k]
+        start_time = first_rows['user_start_time'][k]
+        end_time = first_rows['user_end_time'][k]
+        
+        # 获取对话元数据
+        conv_metadata = {
+            'conversation_id': conv_id,
+            'business_group': first_rows['group_name'][k],
+            'start_time': start_time,
+            'end_time': end_time,
+            'duration_min': (end_time - start_time).total_seconds() / 60 if pd.notna(end_time) else None,
+            'turn_count': end - start
+        }
+        
+        # 提取对话消息
+        messages = []
+        current_qa_pair = {'question': None, 'answer': None, 'context': []}
+        
+        for i in range(start, end):
+            if missing[i]:
+                continue
+                
+            sender = senders[i]
+            content = contents[i]
+            
+            # 添加到对话消息列表
+            message = {
+                'sender': sender,
+                'content': content,
+                'timestamp': timestamps[i]
+            }
+            messages.append(message)
+            
+            # 构建QA对
+            if sender == '用户' and len(content.strip()) > 0:
+                # 如果已有未完成的QA对，保存它
+                if current_qa_pair['question'] is not None and current_qa_pair['answer'] is not None:
+                    # 只保留有效的QA对
+                    if len(current_qa_pair['question'].strip()) > 0 and len(current_qa_pair['answer'].strip()) > 0:
+                        qa_pairs.append(current_qa_pair)
+                        
+                        # 判断是否是FAQ候选
+                        if is_faq_candidate(current_qa_pair):
+                            faq_candidates.append(current_qa_pair)
+                
+                # 开始新的QA对
+                intent = classify_intent(content)
+                intents.add(intent)
+                current_qa_pair = {
+                    'conversation_id': conv_id, 
+                    'business_group': conv_metadata['business_group'],
+                    'question': content, 
+                    'answer': None,
+                    'context': [],
+                    'intent': intent
+                }
+            
+            elif sender == '客服' and current_qa_pair['question'] is not None and current_qa_pair['answer'] is None:
+                # 将客服回复作为答案
+                current_qa_pair['answer'] = content
+            
+            # 添加到上下文
+            if current_qa_pair['question'] is not None:
+                current_qa_pair['context'].append(message)
+        
+        # 处理最后一个QA对
+        if current_qa_pair['question'] is not None and current_qa_pair['answer'] is not None:
+            if len(current_qa_pair['question'].strip()) > 0 and len(current_qa_pair['answer'].strip()) > 0:
+                qa_pairs.append(current_qa_pair)
+                
+                # 判断是否是FAQ候选
+                if is_faq_candidate(current_qa_pair):
+                    faq_candidates.append(current_qa_pair)
+        
+        # 保存完整对话
+        conversations.append({
+            'metadata': conv_metadata,
+            'messages': messages
+        })
+    
+    return conversations, qa_pairs, faq_candidates, intents
 
 class ConversationProcessor:
-    def __init__(self, input_file, output_dir):
+    def __init__(self, input_file, output_dir, chunk_size=None, workers=1, output_format="json", incremental=False):
         """初始化对话处理器
         
         Args:
-            input_file: 输入Excel文件路径
+            input_file: 输入Excel或CSV文件路径
             output_dir: 输出目录
+            chunk_size: 设置后按块流式读取，每次只在内存中保留一块数据和未结束的对话；
+                为None时一次读入整个文件
+            workers: 处理对话的进程数，大于1时把对话按 touch_id 切成连续的分片交给进程池处理，
+                结果按分片顺序合并，与单进程处理的结果相同
+            output_format: 对话和训练/验证/测试集的文件格式，json为JSON数组，jsonl / jsonl.zst
+                为每行一条记录的JSON Lines；qa_pairs.json和知识库文件始终为JSON，供检索服务加载
+            incremental: 为True时只处理与上次清单（output_dir/manifest.json）相比新增或内容变化的对话，
+                结果与上次的输出合并；清单或上次的输出不存在时全量处理
         """
         self.input_file = input_file
         self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.output_format = output_format
+        self.incremental = incremental
+        self.df = None
+        
+        # 对话在处理过程中逐批写出，不在内存中保留
+        self.conversations_file = record_path(os.path.join(output_dir, "raw", "conversations"), output_format)
+        self.conversation_count = 0
+        
+        # 每个对话的内容摘要，全量和增量处理后都会写出，供下次增量处理比较
+        self.manifest_file = os.path.join(output_dir, MANIFEST_FILE)
+        self.manifest = {}
+        self.input_hashes = {}
+        self.changed_ids = set()
+        
+        # 增量处理时沿用的QA对在上次 qa_pairs.json 中的文本，{id(QA对): 文本}
+        self.encoded_qa_pairs = {}
         
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
@@ -36,123 +280,140 @@ class ConversationProcessor:
         self.intent_categories = set()
         
     def load_data(self):
-        """加载Excel数据"""
-        print(f"加载数据文件: {self.input_file}")
-        self.df = pd.read_excel(self.input_file)
+        """加载Excel数据，流式模式下只在处理时按块读取"""
+        if self.chunk_size:
+            print(f"流式读取数据文件: {self.input_file}（每块 {self.chunk_size} 行）")
+            return
         
-        # 基本数据清洗
+        print(f"加载数据文件: {self.input_file}")
+        self.df = self.prepare_frame(read_table(self.input_file))
+        print(f"数据加载完成，共 {self.df.shape[0]} 行")
+    
+    def prepare_frame(self, df):
+        """基本数据清洗：转换时间列，映射sender_type（整表或单个数据块均可）"""
         # 转换时间列
         for col in ['user_start_time', 'user_end_time', 'create_time', 'send_time']:
-            if col in self.df.columns:
-                self.df[col] = pd.to_datetime(self.df[col], errors='coerce')
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
         
         # 处理sender_type
-        if 'sender_type' in self.df.columns:
-            self.df['sender_type'] = self.df['sender_type'].fillna(-1).astype(int)
-            self.df['sender_category'] = self.df['sender_type'].map(
+        if 'sender_type' in df.columns:
+            df['sender_type'] = df['sender_type'].fillna(-1).astype(int)
+            df['sender_category'] = df['sender_type'].map(
                 lambda x: self.sender_mapping.get(x, f'其他({x})')
             )
+        return df
+    
+    def iter_batches(self, assume_sorted=True):
+        """逐个返回消息分片，每个分片包含若干条完整对话，同一对话的消息连续排列
         
-        print(f"数据加载完成，共 {self.df.shape[0]} 行")
-        
+        整表模式下对话按 touch_id 排序；流式模式下按文件中的顺序，每块数据再切成若干分片。
+        """
+        shards = self.workers * SHARDS_PER_WORKER if self.workers > 1 else 1
+        if self.df is not None:
+            yield from split_conversations(self.df, shards)
+            return
+        for batch in iter_conversation_batches(self.input_file, chunk_size=self.chunk_size,
+                                               assume_sorted=assume_sorted, transform=self.prepare_frame):
+            yield from split_conversations(batch, shards, sort=False)
+    
+    def _map_batches(self, batches):
+        """处理每个分片，按分片顺序返回 process_conversation_batch 的结果"""
+        if self.workers <= 1:
+            for batch in batches:
+                yield process_conversation_batch(batch)
+            return
+        
+        # 最多同时提交 2 * workers 个分片，流式读取时不会把整个文件读入内存
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(process_conversation_batch, batch))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        
+    def select_changed(self, batches, previous=None):
+        """记录每个分片中对话的内容摘要；previous 不为None时只返回与之相比新增或内容变化的对话"""
+        self.input_hashes = {}
+        self.changed_ids = set()
+        for batch in batches:
+            hashes = conversation_hashes(batch)
+            self.input_hashes.update(hashes)
+            if previous is None:
+                yield batch
+                continue
+            changed = changed_conversations(hashes, previous)
+            self.changed_ids.update(changed)
+            if len(changed) == len(hashes):
+                yield batch
+            elif changed:
+                yield batch[batch['touch_id'].astype(str).isin(changed)]
+    
+    def load_previous_manifest(self):
+        """读取上次处理的清单，清单或上次的输出文件不存在时返回None（全量处理）"""
+        outputs = [
+            self.conversations_file,
+            os.path.join(self.output_dir, "processed", "qa_pairs.json"),
+            os.path.join(self.output_dir, "knowledge_base", "faq_candidates.json")
+        ]
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            print(f"未找到上次的输出 {missing[0]}，全量处理")
+            return None
+        manifest = load_manifest(self.manifest_file)
+        if manifest is None:
+            print(f"未找到可用的增量清单 {self.manifest_file}，全量处理")
+            return None
+        return manifest["conversations"]
+    
     def process_conversations(self):
-        """处理所有对话"""
-        print("开始处理对话...")
+        """处理所有对话
         
-        # 按对话ID分组
-        conversation_groups = self.df.groupby('touch_id')
-        total_conversations = len(conversation_groups)
-        
-        # 保存结果的列表
-        processed_conversations = []
-        qa_pairs = []
-        faq_candidates = []
-        
-        # 处理每个对话
-        for conv_id, group in tqdm(conversation_groups, total=total_conversations):
-            # 按序号排序消息
-            conversation = group.sort_values('seq_no')
-            
-            # 获取对话元数据
-            conv_metadata = {
-                'conversation_id': conv_id,
-                'business_group': conversation['group_name'].iloc[0],
-                'start_time': conversation['user_start_time'].iloc[0],
-                'end_time': conversation['user_end_time'].iloc[0],
-                'duration_min': (conversation['user_end_time'].iloc[0] - conversation['user_start_time'].iloc[0]).total_seconds() / 60 if pd.notna(conversation['user_end_time'].iloc[0]) else None,
-                'turn_count': len(conversation)
-            }
-            
-            # 提取对话消息
-            messages = []
-            current_qa_pair = {'question': None, 'answer': None, 'context': []}
-            
-            for _, msg in conversation.iterrows():
-                if pd.isna(msg['send_content']):
-                    continue
-                    
-                sender = msg.get('sender_category', '未知')
-                content = msg.get('send_content', '')
-                timestamp = msg.get('send_time', None)
-                
-                # 添加到对话消息列表
-                message = {
-                    'sender': sender,
-                    'content': content,
-                    'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S') if timestamp else None
-                }
-                messages.append(message)
-                
-                # 构建QA对
-                if sender == '用户' and len(content.strip()) > 0:
-                    # 如果已有未完成的QA对，保存它
-                    if current_qa_pair['question'] is not None and current_qa_pair['answer'] is not None:
-                        # 只保留有效的QA对
-                        if len(current_qa_pair['question'].strip()) > 0 and len(current_qa_pair['answer'].strip()) > 0:
-                            qa_pairs.append(current_qa_pair)
-                            
-                            # 判断是否是FAQ候选
-                            if self.is_faq_candidate(current_qa_pair):
-                                faq_candidates.append(current_qa_pair)
-                    
-                    # 开始新的QA对
-                    current_qa_pair = {
-                        'conversation_id': conv_id, 
-                        'business_group': conv_metadata['business_group'],
-                        'question': content, 
-                        'answer': None,
-                        'context': [],
-                        'intent': self.classify_intent(content)
-                    }
-                
-                elif sender == '客服' and current_qa_pair['question'] is not None and current_qa_pair['answer'] is None:
-                    # 将客服回复作为答案
-                    current_qa_pair['answer'] = content
-                
-                # 添加到上下文
-                if current_qa_pair['question'] is not None:
-                    current_qa_pair['context'].append(message)
-            
-            # 处理最后一个QA对
-            if current_qa_pair['question'] is not None and current_qa_pair['answer'] is not None:
-                if len(current_qa_pair['question'].strip()) > 0 and len(current_qa_pair['answer'].strip()) > 0:
-                    qa_pairs.append(current_qa_pair)
-                    
-                    # 判断是否是FAQ候选
-                    if self.is_faq_candidate(current_qa_pair):
-                        faq_candidates.append(current_qa_pair)
+        增量模式下只处理与上次清单相比新增或内容变化的对话，再与上次的输出合并。
+        """
+        print(f"开始处理对话...（{self.workers} 个进程）")
+        
+        previous = self.load_previous_manifest() if self.incremental else None
+        # 上次的清单已读入内存；输出文件即将被改写，中途中断时不能留下与输出不一致的清单
+        discard_manifest(self.manifest_file)
+        # 增量处理时本次的对话先写到临时文件，处理完再与上次输出的对话合并
+        if previous is None:
+            target = self.conversations_file
+        else:
+            directory, name = os.path.split(self.conversations_file)
+            target = os.path.join(directory, f".updates{os.getpid()}-{name}")
+        total = self.df['touch_id'].nunique() if self.df is not None and previous is None else None
+        
+        try:
+            try:
+                with RecordWriter(target, default=json_default) as writer:
+                    conversation_count, qa_pairs, faq_candidates = self._process_all(
+                        self.select_changed(self.iter_batches(), previous), writer, total)
+            except UnsortedInputError as e:
+                # 文件未按对话排列时无法边读边处理，改为读完整个文件后分组（重新写出对话文件）
+                print(f"{e}，改为读取整个文件后再处理")
+                with RecordWriter(target, default=json_default) as writer:
+                    conversation_count, qa_pairs, faq_candidates = self._process_all(
+                        self.select_changed(self.iter_batches(assume_sorted=False), previous), writer, total)
             
-            # 保存完整对话
-            conv_data = {
-                'metadata': conv_metadata,
-                'messages': messages
-            }
-            processed_conversations.append(conv_data)
+            if previous is not None:
+                print(f"增量处理: {len(self.changed_ids)} 个新增或变化的对话，"
+                      f"跳过 {len(self.input_hashes) - len(self.changed_ids)} 个未变化的对话")
+                conversation_count, qa_pairs, faq_candidates = self._merge_previous(target, qa_pairs, faq_candidates)
+        finally:
+            if target != self.conversations_file and os.path.exists(target):
+                os.remove(target)
+        
+        # 输入中没有出现的对话保留上次的摘要（和输出），导出文件只包含新一天的数据时也可以增量处理
+        self.manifest = dict(previous or {})
+        self.manifest.update(self.input_hashes)
         
-        print(f"处理完成: 共{len(processed_conversations)}个对话，{len(qa_pairs)}个QA对，{len(faq_candidates)}个FAQ候选")
+        print(f"处理完成: 共{conversation_count}个对话，{len(qa_pairs)}个QA对，{len(faq_candidates)}个FAQ候选")
         
         # 保存结果
-        self.processed_conversations = processed_conversations
+        self.conversation_count = conversation_count
         self.qa_pairs = qa_pairs
         self.faq_candidates = faq_candidates
         
@@ -165,8 +426,53 @@ class ConversationProcessor:
         for intent, count in sorted(intent_counts.items(), key=lambda x: x[1], reverse=True):
             print(f"- {intent}: {count} ({count/len(qa_pairs)*100:.2f}%)")
     
+    def _merge_previous(self, updates_file, qa_pairs, faq_candidates):
+        """上次输出中本次重新处理的对话被替换，其余保留；返回合并后的 (对话数, QA对列表, FAQ候选列表)"""
+        changed = self.changed_ids
+        conversation_count = merge_records(self.conversations_file, iter_records(updates_file), changed,
+                                           key=lambda conv: str(conv['metadata']['conversation_id']),
+                                           default=json_default)
+        
+        # 保留的QA对连同上次的文本一起读出，保存时不重新序列化；FAQ候选由QA对按同样的规则得到
+        kept_qa_pairs = []
+        self.encoded_qa_pairs = {}
+        for qa, text in iter_encoded_records(os.path.join(self.output_dir, "processed", "qa_pairs.json")):
+            if str(qa['conversation_id']) not in changed:
+                kept_qa_pairs.append(qa)
+                self.encoded_qa_pairs[id(qa)] = text
+        kept_faqs = [qa for qa in kept_qa_pairs if is_faq_candidate(qa)]
+        self.intent_categories.update(qa['intent'] for qa in kept_qa_pairs)
+        
+        return conversation_count, kept_qa_pairs + qa_pairs, kept_faqs + faq_candidates
+    
+    def _process_all(self, batches, writer, total=None):
+        """处理分片迭代器中的全部对话，每个分片的对话处理完立即交给 writer.write_all 写出
+        
+        Args:
+            batches: 分片迭代器
+            writer: 对话的写入器
+            total: 对话总数，用于显示进度
+        
+        Returns:
+            (对话数, QA对列表, FAQ候选列表)
+        """
+        conversation_count = 0
+        qa_pairs = []
+        faq_candidates = []
+        
+        with tqdm(total=total) as progress:
+            for conversations, pairs, candidates, intents in self._map_batches(batches):
+                writer.write_all(conversations)
+                conversation_count += len(conversations)
+                qa_pairs.extend(pairs)
+                faq_candidates.extend(candidates)
+                self.intent_categories.update(intents)
+                progress.update(len(conversations))
+        
+        return conversation_count, qa_pairs, faq_candidates
+    
     def classify_intent(self, question):
-        """简单的基于规则的意图分类
+        """基于规则的意图分类（规则与API服务共用，见 src/intent/classifier.py）
         
         Args:
             question: 用户问题
@@ -174,42 +480,13 @@ class ConversationProcessor:
         Returns:
             意图分类结果
         """
-        question = question.lower()
-        
-        # 订单查询
-        if re.search(r'(订单|单号|我的订单|查(询|一下)订单)', question):
-            intent = "订单查询"
-        # 价格咨询
-        elif re.search(r'(多少钱|价格|价值|回收价|估价|报价)', question):
-            intent = "价格咨询"
-        # 流程咨询
-        elif re.search(r'(怎么|如何|流程|步骤|操作|使用)', question):
-            intent = "流程咨询"
-        # 物流查询
-        elif re.search(r'(物流|快递|运费|邮费|顺丰|寄|邮寄|收货|发货)', question):
-            intent = "物流查询"
-        # 产品信息
-        elif re.search(r'(手机|设备|产品|型号|配置|参数)', question):
-            intent = "产品信息"
-        # 投诉反馈
-        elif re.search(r'(投诉|不满|差评|退款|维权|不好|问题)', question):
-            intent = "投诉反馈"
-        # 问候/闲聊
-        elif re.search(r'(你好|您好|在吗|请问|谢谢|感谢)', question):
-            intent = "问候闲聊"
-        else:
-            intent = "其他咨询"
+        intent = classify_intent(question)
         
         self.intent_categories.add(intent)
         return intent
     
     def is_faq_candidate(self, qa_pair):
-        """判断一个QA对是否是FAQ候选
-        
-        标准:
-        1. 问题和回答都不为空且长度适当
-        2. 问题是通用的，不包含特定订单号等个人信息
-        3. 回答不是简单的"是的"/"好的"等
+        """判断一个QA对是否是FAQ候选（见模块函数 is_faq_candidate）
         
         Args:
             qa_pair: QA对
@@ -217,44 +494,32 @@ class ConversationProcessor:
         Returns:
             是否为FAQ候选
         """
-        question = qa_pair['question']
-        answer = qa_pair['answer']
-        
-        # 基本长度验证
-        if (not question or not answer or 
-            len(question.strip()) < 5 or len(question.strip()) > 100 or
-            len(answer.strip()) < 10):
-            return False
-        
-        # 检查问题是否包含特定信息
-        if re.search(r'\d{10,}', question): # 订单号等数字序列
-            return False
-            
-        # 检查答案是否是简单回复
-        simple_answers = ['好的', '可以的', '是的', '谢谢', '不客气', '嗯', '我知道了']
-        if any(ans in answer for ans in simple_answers) and len(answer) < 15:
-            return False
-            
-        return True
+        return is_faq_candidate(qa_pair)
     
     def save_results(self):
         """保存处理结果"""
         print("保存处理结果...")
         
-        # 保存原始对话
-        conversations_file = os.path.join(self.output_dir, "raw", "conversations.json")
-        with open(conversations_file, 'w', encoding='utf-8') as f:
-            json.dump(self.processed_conversations, f, ensure_ascii=False, indent=2)
+        # 原始对话已在 process_conversations 中逐批写出到 self.conversations_file
+        
+        # FAQ候选和数据集中的记录就是QA对本身，每个QA对只序列化一次，各JSON文件共用同一段文本
+        encoded = self.encoded_qa_pairs
+        for qa in self.qa_pairs:
+            if id(qa) not in encoded:
+                encoded[id(qa)] = encode_record(qa)
+        
+        def write_qa_pairs(path, records):
+            with RecordWriter(path) as writer:
+                for qa in records:
+                    writer.write_encoded(encoded[id(qa)])
         
         # 保存QA对
         qa_file = os.path.join(self.output_dir, "processed", "qa_pairs.json")
-        with open(qa_file, 'w', encoding='utf-8') as f:
-            json.dump(self.qa_pairs, f, ensure_ascii=False, indent=2)
+        write_qa_pairs(qa_file, self.qa_pairs)
         
         # 保存FAQ候选
         faq_file = os.path.join(self.output_dir, "knowledge_base", "faq_candidates.json")
-        with open(faq_file, 'w', encoding='utf-8') as f:
-            json.dump(self.faq_candidates, f, ensure_ascii=False, indent=2)
+        write_qa_pairs(faq_file, self.faq_candidates)
         
         # 按业务分组导出FAQ
         business_faqs = defaultdict(list)
@@ -268,8 +533,7 @@ class ConversationProcessor:
                 group_name = "未分类"
                 
             group_file = os.path.join(self.output_dir, "knowledge_base", f"faq_{group_name}.json")
-            with open(group_file, 'w', encoding='utf-8') as f:
-                json.dump(faqs, f, ensure_ascii=False, indent=2)
+            write_qa_pairs(group_file, faqs)
         
         # 保存训练集、验证集和测试集
         # 按8:1:1分割
@@ -286,23 +550,29 @@ class ConversationProcessor:
         val_data = [self.qa_pairs[i] for i in val_indices]
         test_data = [self.qa_pairs[i] for i in test_indices]
         
-        # 保存训练集
-        train_file = os.path.join(self.output_dir, "processed", "train.json")
-        with open(train_file, 'w', encoding='utf-8') as f:
-            json.dump(train_data, f, ensure_ascii=False, indent=2)
-        
-        # 保存验证集
-        val_file = os.path.join(self.output_dir, "processed", "val.json")
-        with open(val_file, 'w', encoding='utf-8') as f:
-            json.dump(val_data, f, ensure_ascii=False, indent=2)
-        
-        # 保存测试集
-        test_file = os.path.join(self.output_dir, "processed", "test.json")
-        with open(test_file, 'w', encoding='utf-8') as f:
-            json.dump(test_data, f, ensure_ascii=False, indent=2)
+        # 按输出格式写出 train / val / test
+        processed_dir = os.path.join(self.output_dir, "processed")
+        for name, data in [("train", train_data), ("val", val_data), ("test", test_data)]:
+            path = record_path(os.path.join(processed_dir, name), self.output_format)
+            if self.output_format == "json":
+                write_qa_pairs(path, data)
+            else:
+                write_records(data, path)
+        
+        # 保存知识库二进制快照，API启动时优先加载快照，避免解析全部JSON
+        kb_dir = os.path.join(self.output_dir, "knowledge_base")
+        write_snapshot(
+            os.path.join(processed_dir, SNAPSHOT_FILE),
+            load_faqs(kb_dir),
+            self.qa_pairs,
+            knowledge_base_fingerprint(kb_dir, processed_dir)
+        )
+        
+        # 最后写出清单，中途失败时下次增量处理不会跳过未保存的对话
+        save_manifest(self.manifest_file, self.manifest)
             
         print("数据已保存到:", self.output_dir)
-        print(f"- 对话数: {len(self.processed_conversations)}")
+        print(f"- 对话数: {self.conversation_count}（{self.conversations_file}）")
         print(f"- QA对数: {len(self.qa_pairs)}")
         print(f"- FAQ候选数: {len(self.faq_candidates)}")
         print(f"- 训练集大小: {len(train_data)}")
@@ -315,9 +585,18 @@ def main():
                         help='输入Excel文件路径')
     parser.add_argument('--output', default='/Users/boxie/cursor/smart_customer_agent/data', 
                         help='输出目录')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='按块流式读取的行数，不设置时一次读入整个文件')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='处理对话的进程数，大于1时按touch_id分片并行处理')
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default='json',
+                        help='对话和训练/验证/测试集的输出格式，jsonl.zst需要安装zstandard')
+    parser.add_argument('--incremental', action='store_true',
+                        help='只处理与上次相比新增或内容变化的对话，并合并到已有输出')
     args = parser.parse_args()
     
-    processor = ConversationProcessor(args.input, args.output)
+    processor = ConversationProcessor(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                                      output_format=args.output_format, incremental=args.incremental)
     processor.load_data()
     processor.process_conversations()
     processor.save_results()
@@ -0,0 +1,189 @@
+import json
+import re
+
+# 可选依赖：读写 .jsonl.zst 时才需要
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 输出格式与文件后缀
+OUTPUT_FORMATS = {
+    "json": ".json",
+    "jsonl": ".jsonl",
+    "jsonl.zst": ".jsonl.zst",
+}
+
+JSONL_SUFFIXES = (".jsonl", ".jsonl.zst")
+
+# 与 json 模块相同，JSON数组元素之间允许的空白
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def is_jsonl(path):
+    """路径是否为 JSON Lines 文件（.jsonl 或 .jsonl.zst）"""
+    return str(path).endswith(JSONL_SUFFIXES)
+
+
+def record_path(base, output_format="json"):
+    """为不带后缀的路径加上输出格式对应的后缀
+
+    Args:
+        base: 不带后缀的文件路径，如 data/raw/conversations
+        output_format: json、jsonl 或 jsonl.zst
+
+    Returns:
+        完整文件路径
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}，可选: {', '.join(OUTPUT_FORMATS)}")
+    return base + OUTPUT_FORMATS[output_format]
+
+
+def _open_text(path, mode):
+    if str(path).endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("读写 .zst 文件需要安装 zstandard：pip install zstandard")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def encode_record(record, jsonl=False, default=None):
+    """把记录序列化为 RecordWriter.write_encoded 接受的文本
+
+    Args:
+        record: 记录
+        jsonl: True 时为 JSON Lines 的一行（不含换行），否则为JSON数组中的一个元素
+        default: 传给 json.dumps 的 default
+    """
+    if jsonl:
+        return json.dumps(record, ensure_ascii=False, default=default)
+    # 字符串中的换行会被转义，文本中的换行都是缩进产生的，整体再缩进一级即为数组元素
+    return json.dumps(record, ensure_ascii=False, indent=2, default=default).replace("\n", "\n  ")
+
+
+class RecordWriter:
+    """逐条写出记录，不需要在内存中保留全部记录
+
+    按路径后缀选择格式：.jsonl 每行一条记录，.jsonl.zst 为zstd压缩的 JSON Lines，
+    其他路径写成JSON数组，输出与 json.dump(列表, ensure_ascii=False, indent=2) 相同。
+
+    Args:
+        path: 输出文件路径
+        default: 传给 json.dumps 的 default，用于序列化时间戳、numpy标量等
+    """
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self.default = default
+        self.jsonl = is_jsonl(path)
+        self.count = 0
+        self._file = _open_text(path, "w")
+        if not self.jsonl:
+            self._file.write("[")
+
+    def write(self, record):
+        """写出一条记录"""
+        self.write_encoded(encode_record(record, self.jsonl, self.default))
+
+    def write_encoded(self, text):
+        """写出已序列化的记录，不重新序列化
+
+        Args:
+            text: 同一格式的 encode_record 结果，或 iter_encoded_records 从同一格式文件读到的原始文本
+        """
+        if self.jsonl:
+            self._file.write(text)
+            self._file.write("\n")
+        else:
+            self._file.write(",\n  " if self.count else "\n  ")
+            self._file.write(text)
+        self.count += 1
+
+    def write_all(self, records):
+        """写出迭代器中的全部记录"""
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            if not self.jsonl:
+                self._file.write("\n]" if self.count else "]")
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_records(records, path, default=None):
+    """把记录写入文件，格式由路径后缀决定（见 RecordWriter）
+
+    Returns:
+        写出的记录数
+    """
+    with RecordWriter(path, default=default) as writer:
+        writer.write_all(records)
+    return writer.count
+
+
+def iter_records(path):
+    """逐条读取 write_records 写出的文件
+
+    JSON Lines 文件逐行解析，内存中只保留当前一条记录；JSON数组文件整体解析后逐条返回。
+
+    Args:
+        path: .json、.jsonl 或 .jsonl.zst 文件路径
+
+    Yields:
+        记录
+    """
+    if is_jsonl(path):
+        with _open_text(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        yield from json.load(f)
+
+
+def iter_encoded_records(path):
+    """逐条读取记录及其在文件中的原始文本，配合 RecordWriter.write_encoded 原样复制记录
+
+    Yields:
+        (记录, 原始文本)：JSON Lines 为去掉换行的一行，JSON数组为元素在文件中的文本
+    """
+    if is_jsonl(path):
+        with _open_text(path, "r") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if line.strip():
+                    yield json.loads(line), line
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    index = WHITESPACE.match(text).end()
+    if text[index:index + 1] != "[":
+        raise ValueError(f"{path} 不是JSON数组")
+    index = WHITESPACE.match(text, index + 1).end()
+    if text[index:index + 1] == "]":
+        return
+    while True:
+        record, end = decoder.raw_decode(text, index)
+        yield record, text[index:end]
+        index = WHITESPACE.match(text, end).end()
+        if text[index:index + 1] == "]":
+            return
+        if text[index:index + 1] != ",":
+            raise ValueError(f"{path} 第{index}个字符处JSON数组格式错误")
+        index = WHITESPACE.match(text, index + 1).end()
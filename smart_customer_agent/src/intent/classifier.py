@@ -0,0 +1,108 @@
+from functools import lru_cache
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class IntentClassifier:
+    """按优先级排列的规则意图分类器
+
+    规则为 (意图, [正则或关键词, ...]) 列表，返回第一个有规则命中的意图，与逐条 re.search 的
+    if/elif 级联结果一致。构建时每个意图的全部规则合并为一个预编译的交替正则，分类时每个意图
+    只做一次匹配，不再在每次调用时查找正则缓存或重建规则表。
+
+    实测在CPython的re中，把全部意图合并成一个正则（用前瞻+命名分组保持优先级）反而比逐意图匹配慢：
+    re 在每个位置都要尝试所有分支，不会像Aho-Corasick那样共享前缀。
+    """
+
+    def __init__(self, rules, default=None, flags=0, preprocess=None):
+        """
+        Args:
+            rules: [(意图, [正则, ...]), ...]，按优先级排列
+            default: 所有规则都未命中时的返回值
+            flags: 正则编译标志，如 re.IGNORECASE
+            preprocess: 分类前对文本的预处理函数，如 str.lower
+        """
+        self.labels = [label for label, _ in rules]
+        # 没有规则的意图永不命中（空的交替正则会匹配任何文本），与 any(... for k in []) 为False一致
+        self.patterns = [re.compile("|".join(f"(?:{pattern})" for pattern in patterns) if patterns else "(?!)", flags)
+                         for _, patterns in rules]
+        self.default = default
+        self.preprocess = preprocess
+
+    @classmethod
+    def from_keywords(cls, rules, default=None, flags=0, preprocess=None):
+        """由关键词列表构建分类器，关键词按字面匹配（等价于 any(keyword in text ...)）"""
+        return cls([(label, [re.escape(keyword) for keyword in keywords]) for label, keywords in rules],
+                   default, flags, preprocess)
+
+    def classify(self, text):
+        """对单条文本分类
+
+        Args:
+            text: 待分类文本，非字符串（如缺失值）按空串处理
+
+        Returns:
+            命中的意图，未命中时返回 default
+        """
+        if not isinstance(text, str):
+            text = ""
+        if self.preprocess is not None:
+            text = self.preprocess(text)
+        for label, pattern in zip(self.labels, self.patterns):
+            if pattern.search(text):
+                return label
+        return self.default
+
+    def classify_many(self, texts):
+        """批量分类，相同文本只分类一次
+
+        客服消息中"你好""在吗""好的"等短句大量重复，先用 pd.factorize 去重再分类，
+        最后按编码一次取回结果。
+
+        Args:
+            texts: 文本序列（list、numpy数组或pandas Series）
+
+        Returns:
+            与输入等长的分类结果；输入为Series时返回同索引的Series，否则返回列表
+        """
+        series = texts if isinstance(texts, pd.Series) else pd.Series(texts, dtype=object)
+        codes, uniques = pd.factorize(series)
+        # 最后一个位置存放缺失值（编码为-1）的分类结果
+        labels = np.empty(len(uniques) + 1, dtype=object)
+        for i, text in enumerate(uniques):
+            labels[i] = self.classify(text)
+        labels[-1] = self.classify(None)
+        result = labels[codes]
+        if isinstance(texts, pd.Series):
+            return pd.Series(result, index=texts.index, name=texts.name)
+        return result.tolist()
+
+
+# 客服场景意图规则，API服务和对话数据处理共用，按优先级排列
+CUSTOMER_SERVICE_INTENT_RULES = [
+    ("订单查询", [r'订单|单号|我的订单|查(询|一下)订单']),
+    ("价格咨询", [r'多少钱|价格|价值|回收价|估价|报价']),
+    ("流程咨询", [r'怎么|如何|流程|步骤|操作|使用']),
+    ("物流查询", [r'物流|快递|运费|邮费|顺丰|寄|邮寄|收货|发货']),
+    ("产品信息", [r'手机|设备|产品|型号|配置|参数']),
+    ("投诉反馈", [r'投诉|不满|差评|退款|维权|不好|问题']),
+    ("问候闲聊", [r'你好|您好|在吗|请问|谢谢|感谢']),
+]
+DEFAULT_INTENT = "其他咨询"
+
+customer_service_classifier = IntentClassifier(CUSTOMER_SERVICE_INTENT_RULES, DEFAULT_INTENT, preprocess=str.lower)
+
+
+@lru_cache(maxsize=65536)
+def classify_intent(question):
+    """基于规则的客服意图分类
+
+    Args:
+        question: 用户问题
+
+    Returns:
+        意图分类结果
+    """
+    return customer_service_classifier.classify(question)
@@ -0,0 +1,118 @@
+import numpy as np
+
+from src.retrieval.tokenizer import tokenize
+
+
+class BM25Index:
+    """基于NumPy的BM25索引
+
+    倒排表以CSR形式存储（词项偏移、文档ID、词频三个数组），文档长度与IDF在构建时预计算。
+    查询时把所有查询词的倒排表拼接后一次性计算得分，再用 np.bincount 按文档累加，
+    整个业务组的候选文档在一次向量化计算中完成打分。
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        """构建索引
+
+        Args:
+            texts: 待索引的问题文本列表，列表下标即文档ID
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+        """
+        self.size = len(texts)
+        self.k1 = k1
+        self.b = b
+
+        vocab = {}
+        term_docs = []
+        term_freqs = []
+        doc_len = np.zeros(self.size, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                term_id = vocab.setdefault(token, len(vocab))
+                if term_id == len(term_docs):
+                    term_docs.append([])
+                    term_freqs.append([])
+                term_docs[term_id].append(doc_id)
+                term_freqs[term_id].append(tf)
+
+        self.vocab = vocab
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(docs) for docs in term_docs])
+        self.doc_ids = np.fromiter((d for docs in term_docs for d in docs), dtype=np.int32,
+                                   count=self.indptr[-1])
+        self.tfs = np.fromiter((tf for freqs in term_freqs for tf in freqs), dtype=np.float32,
+                               count=self.indptr[-1])
+
+        df = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.doc_len = doc_len
+        avgdl = max(float(doc_len.mean()), 1.0) if self.size else 1.0
+        # 文档长度归一化项 k1 * (1 - b + b * dl / avgdl)
+        self.doc_norm = (k1 * (1 - b + b * doc_len / avgdl)).astype(np.float32)
+
+    def __len__(self):
+        return self.size
+
+    def search(self, question, top_k=3):
+        """对业务组内所有文档打分并返回得分最高的文档
+
+        得分按查询词IDF之和归一化到 [0, 1]，与关键词匹配模式"命中比例"的含义保持一致，
+        以便沿用下游的置信度阈值。
+
+        Args:
+            question: 用户问题
+            top_k: 返回结果数量
+
+        Returns:
+            按得分降序排列的 (文档ID, 归一化得分) 列表
+        """
+        query_terms = set(tokenize(question))
+        term_ids = [self.vocab[t] for t in query_terms if t in self.vocab]
+        if not term_ids:
+            return []
+
+        # 拼接所有查询词的倒排表，一次性计算BM25得分
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        tfs = np.concatenate([self.tfs[s] for s in slices])
+        idf = np.repeat(self.idf[term_ids], [s.stop - s.start for s in slices])
+        contrib = idf * tfs * (self.k1 + 1) / (tfs + self.doc_norm[docs])
+        scores = np.bincount(docs, weights=contrib, minlength=self.size)
+
+        # 以全部查询词（未登录词按最大IDF计）的IDF之和作为归一化因子
+        max_idf = float(np.log(1 + (self.size + 0.5) / 0.5))
+        norm = sum(float(self.idf[self.vocab[t]]) if t in self.vocab else max_idf for t in query_terms)
+        scores = np.minimum(scores / norm, 1.0)
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in order]
+
+
+def build_group_bm25_indexes(faqs, qa_groups):
+    """按业务组构建FAQ和QA数据的BM25索引
+
+    Args:
+        faqs: 业务组 -> FAQ KnowledgeRecord列表
+        qa_groups: 业务组 -> QA KnowledgeRecord列表
+
+    Returns:
+        (FAQ BM25索引字典, QA BM25索引字典)
+    """
+    faq_indexes = {
+        group: BM25Index([faq.question_lower for faq in group_faqs])
+        for group, group_faqs in faqs.items()
+    }
+    qa_indexes = {
+        group: BM25Index([qa.question_lower for qa in group_qa])
+        for group, group_qa in qa_groups.items()
+    }
+    return faq_indexes, qa_indexes
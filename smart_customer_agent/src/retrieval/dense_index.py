@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import zlib
+
+import numpy as np
+
+from src.retrieval.loader import knowledge_base_fingerprint, load_faqs, load_qa_data
+from src.retrieval.tokenizer import bigram_tokenize
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+META_FILE = "embedding_meta.json"
+IDF_FILE = "encoder_idf.npy"
+PROJECTION_FILE = "encoder_projection.npy"
+
+# 查询时每次转换为float32参与计算的行数，控制临时内存占用
+SCORE_CHUNK_ROWS = 16384
+
+# 业务组为None的QA对在元数据中使用的键（JSON对象的键只能是字符串），查询 business_group=None 时对应此键
+NONE_GROUP_KEY = "\x00none"
+
+
+def _group_key(business_group):
+    return NONE_GROUP_KEY if business_group is None else business_group
+
+
+class HashedTfidfEncoder:
+    """无需联网的向量编码器：带符号特征哈希 + TF-IDF + SVD降维
+
+    分词固定使用字符双字切分（不依赖jieba），保证离线构建与线上查询的特征完全一致。
+    哈希使用crc32而不是内置hash()，避免不同进程的哈希随机化导致特征不一致。
+    """
+
+    name = "hashed_tfidf"
+
+    def __init__(self, idf, projection):
+        self.idf = idf.astype(np.float32)
+        self.projection = projection.astype(np.float32)
+        self.n_features = len(idf)
+        self.dim = projection.shape[1]
+
+    @staticmethod
+    def _hashed_counts(texts, n_features):
+        counts = np.zeros((len(texts), n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in bigram_tokenize(text.lower()):
+                h = zlib.crc32(token.encode('utf-8'))
+                counts[row, h % n_features] += 1.0 if h & 0x80000000 else -1.0
+        return counts
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _tfidf(self, texts):
+        return self._normalize(self._hashed_counts(texts, self.n_features) * self.idf)
+
+    def encode(self, texts):
+        """编码文本
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            L2归一化后的float32矩阵，形状为 (len(texts), dim)
+        """
+        return self._normalize(self._tfidf(texts) @ self.projection)
+
+    @classmethod
+    def fit(cls, texts, n_features=2048, dim=128, batch_size=4096, sample_size=200000, seed=42):
+        """在语料上拟合IDF和SVD投影矩阵
+
+        Args:
+            texts: 语料文本列表
+            n_features: 哈希特征维数
+            dim: 输出向量维数
+            batch_size: 分批计算的批大小
+            sample_size: 拟合使用的最大样本数
+            seed: 抽样随机种子
+
+        Returns:
+            拟合好的编码器
+        """
+        if len(texts) > sample_size:
+            rng = np.random.default_rng(seed)
+            texts = [texts[i] for i in rng.choice(len(texts), sample_size, replace=False)]
+
+        # 第一遍：统计文档频率
+        df = np.zeros(n_features, dtype=np.float64)
+        for start in range(0, len(texts), batch_size):
+            df += (cls._hashed_counts(texts[start:start + batch_size], n_features) != 0).sum(axis=0)
+        idf = np.log((1 + len(texts)) / (1 + df)) + 1
+
+        # 第二遍：分批累加协方差矩阵，再做特征分解得到主成分（等价于对TF-IDF矩阵做SVD）
+        encoder = cls(idf, np.eye(n_features, dtype=np.float32))
+        cov = np.zeros((n_features, n_features), dtype=np.float64)
+        for start in range(0, len(texts), batch_size):
+            x = encoder._tfidf(texts[start:start + batch_size])
+            cov += x.T @ x
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        projection = eigvecs[:, np.argsort(eigvals)[::-1][:dim]]
+        return cls(idf, projection)
+
+    def save(self, index_dir):
+        np.save(os.path.join(index_dir, IDF_FILE), self.idf)
+        np.save(os.path.join(index_dir, PROJECTION_FILE), self.projection)
+
+    @classmethod
+    def load(cls, index_dir):
+        return cls(np.load(os.path.join(index_dir, IDF_FILE)),
+                   np.load(os.path.join(index_dir, PROJECTION_FILE)))
+
+
+class SentenceEncoder:
+    """基于本地 sentence-transformers 模型的编码器（可选依赖）"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+
+def build_dense_index(kb_dir, processed_dir, index_dir, model_name=None, batch_size=4096):
+    """离线构建向量索引
+
+    向量按业务组连续存放（每个业务组先FAQ后QA），查询时只需对一个连续切片做矩阵-向量乘法。
+    业务组为None的QA对在元数据中以 NONE_GROUP_KEY 为键。
+    结果以float16的 .npy 文件写出，写入过程使用 open_memmap 分批落盘，内存占用与语料规模无关。
+
+    Args:
+        kb_dir: 知识库目录（faq_*.json）
+        processed_dir: 处理后数据目录（qa_pairs.json）
+        index_dir: 索引输出目录
+        model_name: 本地 sentence-transformers 模型名或路径，为空时使用哈希TF-IDF编码器
+        batch_size: 编码批大小
+
+    Returns:
+        索引元数据
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    faqs = load_faqs(kb_dir)
+    qa_data = load_qa_data(processed_dir)
+
+    qa_groups = {}
+    for qa in qa_data:
+        qa_groups.setdefault(qa['business_group'], []).append(qa['question'])
+
+    groups = {}
+    texts = []
+    # 业务组可能为None（QA对未标注业务组），排在最后
+    for group in sorted(set(faqs) | set(qa_groups), key=lambda g: (g is None, str(g))):
+        bounds = groups[_group_key(group)] = {}
+        for source, questions in (("faq", [faq['question'] for faq in faqs.get(group, [])]),
+                                  ("qa", qa_groups.get(group, []))):
+            bounds[source] = [len(texts), len(texts) + len(questions)]
+            texts.extend(questions)
+
+    if model_name:
+        encoder = SentenceEncoder(model_name)
+    else:
+        logger.info(f"拟合哈希TF-IDF编码器，语料 {len(texts)} 条")
+        encoder = HashedTfidfEncoder.fit(texts, batch_size=batch_size)
+        encoder.save(index_dir)
+
+    embeddings = np.lib.format.open_memmap(
+        os.path.join(index_dir, EMBEDDINGS_FILE), mode='w+', dtype=np.float16,
+        shape=(len(texts), encoder.dim))
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        embeddings[start:start + len(batch)] = encoder.encode(batch).astype(np.float16)
+    embeddings.flush()
+    del embeddings
+
+    meta = {
+        "encoder": encoder.name,
+        "model_name": model_name,
+        "dim": encoder.dim,
+        "count": len(texts),
+        "fingerprint": knowledge_base_fingerprint(kb_dir, processed_dir),
+        "groups": groups,
+    }
+    with open(os.path.join(index_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"向量索引构建完成: {len(texts)} 条, 维度 {encoder.dim}, 输出目录 {index_dir}")
+    return meta
+
+
+class DenseIndex:
+    """以内存映射方式加载的向量索引
+
+    向量矩阵通过 np.load(mmap_mode='r') 映射，多个uvicorn worker共享同一份操作系统页缓存，
+    启动时不需要把整个矩阵读入各自的进程内存。
+    """
+
+    def __init__(self, embeddings, encoder, groups):
+        self.embeddings = embeddings
+        self.encoder = encoder
+        self.groups = groups
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    @classmethod
+    def load(cls, index_dir, fingerprint=None):
+        """加载向量索引
+
+        Args:
+            index_dir: 索引目录
+            fingerprint: 当前知识库指纹，与构建时不一致时视为索引过期
+
+        Returns:
+            DenseIndex实例，索引不存在或已过期时返回None
+        """
+        meta_file = os.path.join(index_dir, META_FILE)
+        if not os.path.exists(meta_file):
+            return None
+
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            logger.warning("向量索引与当前知识库不一致，请重新运行 `python run.py build-index`")
+            return None
+
+        if meta["encoder"] == SentenceEncoder.name:
+            encoder = SentenceEncoder(meta["model_name"])
+        else:
+            encoder = HashedTfidfEncoder.load(index_dir)
+
+        embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r')
+        return cls(embeddings, encoder, meta["groups"])
+
+    def search(self, question, business_group, source, top_k=3):
+        """在指定业务组的FAQ或QA向量中检索最相似的条目
+
+        Args:
+            question: 用户问题
+            business_group: 业务组
+            source: 'faq' 或 'qa'
+            top_k: 返回结果数量
+
+        Returns:
+            按相似度降序排列的 (文档ID, 余弦相似度) 列表，文档ID为该业务组内的下标
+        """
+        return self.search_many([question], business_group, source, top_k)[0]
+
+    def search_many(self, questions, business_group, source, top_k=3):
+        """批量检索同一业务组内的多个问题
+
+        问题一次性编码为矩阵，向量矩阵按块只扫描一遍，与所有问题同时做矩阵乘法，
+        避免逐个问题重复读取整个业务组的向量。
+
+        Args:
+            questions: 问题列表
+            business_group: 业务组，None对应未标注业务组的QA对
+            source: 'faq' 或 'qa'
+            top_k: 每个问题返回的结果数量
+
+        Returns:
+            与questions一一对应的结果列表，每项同 search 的返回值
+        """
+        bounds = self.groups.get(_group_key(business_group), {}).get(source)
+        if not questions or not bounds or bounds[0] == bounds[1]:
+            return [[] for _ in questions]
+
+        start, end = bounds
+        queries = self.encoder.encode(list(questions)).astype(np.float32)
+        rows = np.arange(len(queries))[:, None]
+        # 每个问题当前的top_k（得分与组内文档ID），逐块合并，内存占用与业务组大小无关
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for offset in range(start, end, SCORE_CHUNK_ROWS):
+            chunk_end = min(offset + SCORE_CHUNK_ROWS, end)
+            chunk_scores = queries @ self.embeddings[offset:chunk_end].astype(np.float32).T
+            k = min(top_k, chunk_scores.shape[1])
+            chunk_top = np.argpartition(-chunk_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.concatenate([best_scores, chunk_scores[rows, chunk_top]], axis=1)
+            best_ids = np.concatenate([best_ids, chunk_top + (offset - start)], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores, best_ids = best_scores[rows, keep], best_ids[rows, keep]
+
+        order = np.lexsort((best_ids, -best_scores))
+        results = []
+        for row_scores, row_ids, row_order in zip(best_scores, best_ids, order):
+            results.append([(int(row_ids[i]), float(row_scores[i])) for i in row_order if row_scores[i] > 0])
+        return results
@@ -0,0 +1,124 @@
+from array import array
+from collections import defaultdict
+import math
+
+
+def char_ngrams(text):
+    """生成用于建立索引的字符n-gram（单字 + 相邻双字）
+
+    Args:
+        text: 已转为小写的文本
+
+    Returns:
+        n-gram列表（可能包含重复项）
+    """
+    grams = list(text)
+    grams.extend(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class InvertedIndex:
+    """基于字符n-gram的倒排索引
+
+    原有的关键词匹配逻辑是判断 `keyword in question.lower()`，
+    一个关键词是某个问题的子串，当且仅当它的所有双字（单字关键词则为单字本身）
+    都出现在该问题中。因此先用倒排表求交集得到候选集合，再对候选做一次子串校验，
+    即可在不扫描整个语料的前提下得到与线性扫描完全一致的匹配结果。
+    """
+
+    def __init__(self, texts):
+        """构建索引
+
+        Args:
+            texts: 已转为小写的问题文本列表，列表下标即文档ID
+        """
+        self.texts = list(texts)
+        self.size = len(self.texts)
+
+        postings = defaultdict(list)
+        for doc_id, text in enumerate(self.texts):
+            for term in set(char_ngrams(text)):
+                postings[term].append(doc_id)
+
+        # 倒排表使用紧凑的无符号整型数组存储，文档ID天然有序
+        self.postings = {term: array('I', doc_ids) for term, doc_ids in postings.items()}
+        # 预计算的词项权重（IDF），权重越高说明倒排表越短
+        self.weights = {
+            term: math.log(1 + self.size / len(doc_ids))
+            for term, doc_ids in self.postings.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def match(self, keyword):
+        """查找包含指定关键词的所有文档
+
+        Args:
+            keyword: 已转为小写的关键词
+
+        Returns:
+            包含该关键词的文档ID集合
+        """
+        if not keyword:
+            return set()
+
+        terms = set(char_ngrams(keyword)) if len(keyword) == 1 else {
+            keyword[i:i + 2] for i in range(len(keyword) - 1)
+        }
+        if any(term not in self.postings for term in terms):
+            return set()
+
+        # 按权重从高到低（倒排表从短到长）求交集，尽早收敛候选集合
+        ordered = sorted(terms, key=self.weights.__getitem__, reverse=True)
+        candidates = set(self.postings[ordered[0]])
+        for term in ordered[1:]:
+            candidates.intersection_update(self.postings[term])
+            if not candidates:
+                return candidates
+
+        # 超过两个字的关键词需要校验是否为连续子串
+        if len(keyword) > 2:
+            candidates = {doc_id for doc_id in candidates if keyword in self.texts[doc_id]}
+        return candidates
+
+    def search(self, keywords):
+        """统计每个文档命中的关键词个数
+
+        与原先的线性扫描保持一致：重复出现的关键词会被重复计分。
+
+        Args:
+            keywords: 已转为小写的关键词列表
+
+        Returns:
+            按文档ID升序排列的 (文档ID, 命中次数) 列表
+        """
+        scores = defaultdict(int)
+        matched = {}
+        for kw in keywords:
+            if kw not in matched:
+                matched[kw] = self.match(kw)
+            for doc_id in matched[kw]:
+                scores[doc_id] += 1
+        return sorted(scores.items())
+
+
+def build_group_indexes(faqs, qa_groups):
+    """按业务组构建FAQ和QA数据的倒排索引
+
+    Args:
+        faqs: 业务组 -> FAQ KnowledgeRecord列表
+        qa_groups: 业务组 -> QA KnowledgeRecord列表
+
+    Returns:
+        (FAQ索引字典, QA索引字典)
+    """
+    faq_indexes = {
+        group: InvertedIndex([faq.question_lower for faq in group_faqs])
+        for group, group_faqs in faqs.items()
+    }
+    qa_indexes = {
+        group: InvertedIndex([qa.question_lower for qa in group_qa])
+        for group, group_qa in qa_groups.items()
+    }
+    return faq_indexes, qa_indexes
@@ -0,0 +1,88 @@
+import datetime
+import logging
+import os
+
+from src.retrieval.bm25 import build_group_bm25_indexes
+from src.retrieval.dense_index import DenseIndex
+from src.retrieval.inverted_index import build_group_indexes
+from src.retrieval.loader import (
+    knowledge_base_fingerprint, load_faqs, load_qa_data, partition_qa_data, to_records
+)
+from src.retrieval.snapshot import SNAPSHOT_FILE, read_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBase:
+    """知识库快照：知识条目及其全部检索索引
+
+    快照构建完成后不再修改。热更新时构建一个新快照，再整体替换模块级引用，
+    正在处理的请求持有旧快照的引用，不会看到加载到一半的状态。
+    """
+
+    __slots__ = ('version', 'fingerprint', 'loaded_at', 'faqs', 'qa_groups',
+                 'faq_indexes', 'qa_indexes', 'faq_bm25_indexes', 'qa_bm25_indexes', 'dense_index')
+
+    def __init__(self, version=0, fingerprint="", faqs=None, qa_groups=None, dense_index=None):
+        """
+        Args:
+            version: 快照版本号，每次重新加载递增
+            fingerprint: 构建时知识库源文件的指纹
+            faqs: 业务组 -> FAQ KnowledgeRecord列表
+            qa_groups: 业务组 -> QA KnowledgeRecord列表
+            dense_index: 向量索引，未构建时为None
+        """
+        self.version = version
+        self.fingerprint = fingerprint
+        self.loaded_at = datetime.datetime.now().isoformat()
+        self.faqs = faqs or {}
+        self.qa_groups = qa_groups or {}
+        self.faq_indexes, self.qa_indexes = build_group_indexes(self.faqs, self.qa_groups)
+        self.faq_bm25_indexes, self.qa_bm25_indexes = build_group_bm25_indexes(self.faqs, self.qa_groups)
+        self.dense_index = dense_index
+
+    @classmethod
+    def build(cls, kb_dir, processed_dir, index_dir, version=0):
+        """从磁盘加载知识库并构建全部索引
+
+        Args:
+            kb_dir: 知识库目录（faq_*.json）
+            processed_dir: 处理后数据目录（qa_pairs.json）
+            index_dir: 向量索引目录
+            version: 快照版本号
+
+        Returns:
+            KnowledgeBase实例
+        """
+        # 先取指纹再读文件，构建期间文件再次变化时下一轮检查仍能发现
+        fingerprint = knowledge_base_fingerprint(kb_dir, processed_dir)
+
+        # 优先从二进制快照加载，快照不存在或已过期时回退到JSON
+        snapshot = read_snapshot(os.path.join(processed_dir, SNAPSHOT_FILE), fingerprint)
+        if snapshot is not None:
+            faqs, qa_groups = snapshot
+        else:
+            # 加载FAQ数据
+            faqs = {group: to_records(group_faqs) for group, group_faqs in load_faqs(kb_dir).items()}
+
+            # 加载QA数据并按业务组划分，原始字典列表不再常驻内存
+            qa_groups = partition_qa_data(load_qa_data(processed_dir))
+
+        # 加载离线构建的向量索引（内存映射）
+        dense_index = DenseIndex.load(index_dir, fingerprint)
+
+        return cls(version, fingerprint, faqs, qa_groups, dense_index)
+
+    @property
+    def qa_count(self):
+        return sum(len(group_qa) for group_qa in self.qa_groups.values())
+
+    def summary(self):
+        """知识库概况，用于日志和管理接口"""
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "faq_groups": len(self.faqs),
+            "qa_pairs": self.qa_count,
+            "dense_index": len(self.dense_index) if self.dense_index is not None else 0,
+        }
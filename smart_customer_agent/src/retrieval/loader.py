@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeRecord:
+    """检索用的紧凑知识条目
+
+    只保留检索和回答需要的字段（原始QA对中的context等字段不再常驻内存），
+    并在加载时预先计算小写问题文本，请求处理时无需重复转换。
+    """
+
+    __slots__ = ('question', 'answer', 'intent', 'question_lower')
+
+    def __init__(self, question, answer, intent=None):
+        self.question = question
+        self.answer = answer
+        self.intent = intent
+        self.question_lower = question.lower()
+
+    @classmethod
+    def from_dict(cls, item):
+        return cls(item['question'], item['answer'], item.get('intent'))
+
+    def to_result(self, score, intent, business_group):
+        """转换为检索结果字典
+
+        Args:
+            score: 匹配得分
+            intent: 条目未标注意图时使用的默认意图
+            business_group: 业务组
+
+        Returns:
+            search_knowledge_base 返回的结果字典
+        """
+        return {
+            'question': self.question,
+            'answer': self.answer,
+            'score': score,
+            'intent': self.intent if self.intent is not None else intent,
+            'business_group': business_group
+        }
+
+
+def to_records(items):
+    """将FAQ/QA字典列表转换为 KnowledgeRecord 列表"""
+    return [KnowledgeRecord.from_dict(item) for item in items]
+
+
+def partition_qa_data(qa_data):
+    """按业务组划分QA数据
+
+    Args:
+        qa_data: 全部QA对字典列表
+
+    Returns:
+        业务组 -> KnowledgeRecord列表（组内保持原始顺序）
+    """
+    qa_groups = {}
+    for qa in qa_data:
+        qa_groups.setdefault(qa['business_group'], []).append(KnowledgeRecord.from_dict(qa))
+    return qa_groups
+
+
+def load_faqs(kb_dir):
+    """读取知识库目录下所有 faq_*.json 文件
+
+    Args:
+        kb_dir: 知识库目录
+
+    Returns:
+        业务组 -> FAQ列表（按文件名排序，保证多次加载顺序一致）
+    """
+    faqs = {}
+    if not os.path.exists(kb_dir):
+        return faqs
+
+    for file in sorted(os.listdir(kb_dir)):
+        if file.endswith('.json') and file.startswith('faq_'):
+            try:
+                with open(os.path.join(kb_dir, file), 'r', encoding='utf-8') as f:
+                    group_faqs = json.load(f)
+                    # 提取业务组名
+                    group_name = file[4:-5]  # 移除"faq_"前缀和".json"后缀
+                    if group_name:
+                        faqs[group_name] = group_faqs
+            except Exception as e:
+                logger.error(f"加载FAQ文件 {file} 失败: {e}")
+    return faqs
+
+
+def load_qa_data(processed_dir):
+    """读取 processed/qa_pairs.json
+
+    Args:
+        processed_dir: 处理后数据目录
+
+    Returns:
+        QA对列表，文件不存在或解析失败时返回空列表
+    """
+    qa_file = os.path.join(processed_dir, "qa_pairs.json")
+    if not os.path.exists(qa_file):
+        return []
+
+    try:
+        with open(qa_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"加载QA数据失败: {e}")
+        return []
+
+
+def knowledge_base_fingerprint(kb_dir, processed_dir):
+    """根据知识库源文件的大小和修改时间生成指纹，用于判断离线索引是否过期
+
+    Args:
+        kb_dir: 知识库目录
+        processed_dir: 处理后数据目录
+
+    Returns:
+        指纹字符串
+    """
+    parts = []
+    files = []
+    if os.path.exists(kb_dir):
+        files.extend(os.path.join(kb_dir, file) for file in sorted(os.listdir(kb_dir))
+                     if file.endswith('.json') and file.startswith('faq_'))
+    files.append(os.path.join(processed_dir, "qa_pairs.json"))
+
+    for path in files:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
@@ -0,0 +1,173 @@
+import logging
+import mmap
+import os
+import pickle
+import struct
+
+import numpy as np
+
+from src.retrieval.loader import KnowledgeRecord
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "kb_snapshot.bin"
+SNAPSHOT_MAGIC = b"KBSNAP01"
+SNAPSHOT_VERSION = 2
+
+
+# 文本列以NUL分隔拼接，加载时一次 str.split 还原为字符串列表
+SEPARATOR = "\x00"
+
+
+def _encode_column(values):
+    """文本列拼接为一个缓冲区，不改写文本
+
+    文本中没有NUL时以NUL分隔；有时改为另存每行的字符数，按长度切分（较慢，但可以包含任意字符）。
+    """
+    values = [value or "" for value in values]
+    if not any(SEPARATOR in value for value in values):
+        return pickle.PickleBuffer(SEPARATOR.join(values).encode('utf-8')), None
+    lengths = np.fromiter((len(value) for value in values), dtype=np.int64, count=len(values))
+    return pickle.PickleBuffer("".join(values).encode('utf-8')), lengths
+
+
+def _decode_column(column, count):
+    if count == 0:
+        return []
+    buffer, lengths = column
+    text = str(buffer, 'utf-8')
+    if lengths is None:
+        return text.split(SEPARATOR)
+    ends = np.cumsum(lengths).tolist()
+    return [text[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+
+def _encode_codes(values):
+    categories = list(dict.fromkeys(value for value in values if value is not None))
+    lookup = {value: code for code, value in enumerate(categories, start=1)}
+    codes = np.fromiter((lookup.get(value, 0) for value in values), dtype=np.int32, count=len(values))
+    return categories, codes
+
+
+def _encode_table(items, group_key=None):
+    """把字典列表编码为列式结构：文本列走带外缓冲区，意图/业务组为整型编码"""
+    intents, intent_codes = _encode_codes([item.get('intent') for item in items])
+    table = {
+        "count": len(items),
+        "question": _encode_column([item['question'] for item in items]),
+        "answer": _encode_column([item['answer'] for item in items]),
+        "intents": intents,
+        "intent_codes": intent_codes,
+    }
+    if group_key:
+        table["groups"], table["group_codes"] = _encode_codes([item[group_key] for item in items])
+    return table
+
+
+def _decode_records(table):
+    count = table["count"]
+    questions = _decode_column(table["question"], count)
+    answers = _decode_column(table["answer"], count)
+    intents = [None] + table["intents"]
+    return [KnowledgeRecord(question, answer, intents[code])
+            for question, answer, code in zip(questions, answers, table["intent_codes"].tolist())]
+
+
+def write_snapshot(path, faqs, qa_data, fingerprint):
+    """写出知识库二进制快照
+
+    文件布局：魔数 | 头部长度 | pickle(协议5)头部 | 缓冲区数量 | 各缓冲区长度 | 各缓冲区数据。
+    大块的文本和编码数组作为带外缓冲区直接写入文件，加载时可在内存映射上零拷贝反序列化。
+
+    Args:
+        path: 输出文件路径
+        faqs: 业务组 -> FAQ字典列表（与 load_faqs 的返回一致）
+        qa_data: QA对字典列表
+        fingerprint: 对应JSON文件的指纹，加载时用于判断快照是否过期
+    """
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": fingerprint,
+        "faqs": {group: _encode_table(group_faqs) for group, group_faqs in faqs.items()},
+        "qa": _encode_table(qa_data, group_key='business_group'),
+    }
+
+    buffers = []
+    header = pickle.dumps(payload, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(struct.pack('<Q', len(raws)))
+        f.write(struct.pack(f'<{len(raws)}Q', *(raw.nbytes for raw in raws)))
+        for raw in raws:
+            f.write(raw)
+    # 先写临时文件再改名，读取方不会看到写了一半的快照
+    os.replace(tmp_path, path)
+
+
+def _parse_snapshot(mm, fingerprint):
+    """在内存映射上反序列化快照，返回与映射无关的Python对象
+
+    所有引用映射内存的视图和数组都是本函数的局部变量，函数返回后即被释放，映射可以安全关闭。
+    """
+    view = memoryview(mm)
+    try:
+        if bytes(view[:8]) != SNAPSHOT_MAGIC:
+            raise ValueError("文件格式不正确")
+        pos = 8
+        (header_len,) = struct.unpack_from('<Q', view, pos)
+        pos += 8
+        header = view[pos:pos + header_len]
+        pos += header_len
+        (count,) = struct.unpack_from('<Q', view, pos)
+        pos += 8
+        sizes = struct.unpack_from(f'<{count}Q', view, pos)
+        pos += 8 * count
+        buffers = []
+        for size in sizes:
+            buffers.append(view[pos:pos + size])
+            pos += size
+
+        payload = pickle.loads(header, buffers=buffers)
+        if payload["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"不支持的快照版本 {payload['version']}")
+        if fingerprint is not None and payload["fingerprint"] != fingerprint:
+            logger.warning("知识库快照与JSON文件不一致，改为从JSON加载")
+            return None
+
+        faqs = {group: _decode_records(table) for group, table in payload["faqs"].items()}
+        qa_table = payload["qa"]
+        # 编码0表示业务组为None
+        return faqs, _decode_records(qa_table), qa_table["group_codes"].tolist(), [None] + qa_table["groups"]
+    except Exception as e:
+        logger.error(f"读取知识库快照失败: {e}")
+        return None
+
+
+def read_snapshot(path, fingerprint=None):
+    """以内存映射方式读取知识库快照
+
+    Args:
+        path: 快照文件路径
+        fingerprint: 当前JSON文件指纹，与快照记录的不一致时视为过期
+
+    Returns:
+        (FAQ字典, QA分组字典)，值均为 KnowledgeRecord 列表；快照不存在、损坏或过期时返回None
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        parsed = _parse_snapshot(mm, fingerprint)
+    if parsed is None:
+        return None
+
+    faqs, qa_records, group_codes, groups = parsed
+    qa_groups = {}
+    for record, code in zip(qa_records, group_codes):
+        qa_groups.setdefault(groups[code], []).append(record)
+    return faqs, qa_groups
@@ -0,0 +1,49 @@
+from functools import lru_cache
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# 优先使用jieba分词，未安装时退化为字符双字切分
+try:
+    import jieba
+    jieba.setLogLevel(logging.WARNING)
+except ImportError:
+    jieba = None
+    logger.warning("未安装jieba，检索分词将使用字符双字切分")
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def bigram_tokenize(text):
+    """字符双字切分：英文/数字保持整词，中文按相邻双字切分
+
+    Args:
+        text: 已转为小写的文本
+
+    Returns:
+        词项列表
+    """
+    tokens = []
+    for run in WORD_PATTERN.findall(text):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def tokenize(text):
+    """检索用分词（带缓存）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词项元组，已去除标点和空白
+    """
+    text = text.lower()
+    if jieba is None:
+        return tuple(bigram_tokenize(text))
+    return tuple(token for token in jieba.lcut(text) if WORD_PATTERN.match(token))
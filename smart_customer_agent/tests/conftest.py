@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# 测试从任意目录运行时都可以导入src包
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
@@ -0,0 +1,17 @@
+from src.intent.classifier import IntentClassifier
+
+
+def test_rule_without_patterns_never_matches():
+    classifier = IntentClassifier.from_keywords([('A', []), ('B', ['x'])], default='D')
+    assert classifier.classify('zzz') == 'D'
+    assert classifier.classify('') == 'D'
+    assert classifier.classify('xyz') == 'B'
+    assert classifier.classify_many(['zzz', 'x', None]) == ['D', 'B', 'D']
+
+
+def test_empty_rules_match_keyword_cascade():
+    rules = [('A', []), ('B', ['价格', '多少钱']), ('C', []), ('E', ['物流'])]
+    classifier = IntentClassifier.from_keywords(rules, default='D')
+    for text in ['手机多少钱', '物流到哪了', '你好', '价格和物流']:
+        expected = next((label for label, keywords in rules if any(k in text for k in keywords)), 'D')
+        assert classifier.classify(text) == expected
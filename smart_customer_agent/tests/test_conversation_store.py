@@ -0,0 +1,65 @@
+import asyncio
+
+from src.api.conversation_store import SQLiteConversationStore
+
+
+def message(content, role="user"):
+    return {"role": role, "content": content, "created_at": "2024-01-01 00:00:00"}
+
+
+def contents(conversation):
+    return [m["content"] for m in conversation["messages"]]
+
+
+def test_two_workers_share_database(tmp_path):
+    """两个worker各自缓存同一个对话并交替追加，消息不会互相覆盖"""
+    async def scenario():
+        path = tmp_path / "conversations.db"
+        worker_a = SQLiteConversationStore(path)
+        worker_b = SQLiteConversationStore(path)
+        await worker_a.start()
+        await worker_b.start()
+        try:
+            for i, worker in enumerate([worker_a, worker_b, worker_a, worker_b, worker_a]):
+                await worker.append("c1", "回收", [message(f"消息{i}")])
+                await worker.flush()
+        finally:
+            await worker_a.close()
+            await worker_b.close()
+
+        reader = SQLiteConversationStore(path)
+        await reader.start()
+        try:
+            return await reader.get("c1")
+        finally:
+            await reader.close()
+
+    conversation = asyncio.run(scenario())
+    assert contents(conversation) == [f"消息{i}" for i in range(5)]
+
+
+def test_trim_keeps_latest_messages(tmp_path):
+    async def scenario():
+        path = tmp_path / "conversations.db"
+        writer = SQLiteConversationStore(path, max_messages=3)
+        await writer.start()
+        try:
+            for i in range(4):
+                await writer.append("c1", "回收", [message(f"问{i}"), message(f"答{i}", "assistant")])
+                await writer.flush()
+        finally:
+            await writer.close()
+
+        reader = SQLiteConversationStore(path, max_messages=3)
+        await reader.start()
+        try:
+            conversation = await reader.get("c1")
+            count = await reader._run(
+                lambda: reader._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0])
+            return conversation, count
+        finally:
+            await reader.close()
+
+    conversation, count = asyncio.run(scenario())
+    assert contents(conversation) == ["答2", "问3", "答3"]
+    assert count == 3
@@ -0,0 +1,22 @@
+import json
+
+from src.retrieval.dense_index import DenseIndex, build_dense_index
+
+
+def test_none_business_group(tmp_path):
+    kb_dir, processed_dir, index_dir = tmp_path / "kb", tmp_path / "processed", tmp_path / "index"
+    kb_dir.mkdir()
+    processed_dir.mkdir()
+    (kb_dir / "faq_回收.json").write_text(json.dumps(
+        [{"question": "手机回收价格怎么算", "answer": "按成色估价"}], ensure_ascii=False), encoding="utf-8")
+    (processed_dir / "qa_pairs.json").write_text(json.dumps([
+        {"question": "快递什么时候到", "answer": "1-3天", "business_group": None},
+        {"question": "旧手机能卖多少钱", "answer": "先估价", "business_group": "回收"},
+    ], ensure_ascii=False), encoding="utf-8")
+
+    meta = build_dense_index(str(kb_dir), str(processed_dir), str(index_dir))
+    index = DenseIndex.load(str(index_dir), meta["fingerprint"])
+
+    assert [doc_id for doc_id, _ in index.search("快递什么时候到", None, "qa")] == [0]
+    assert [doc_id for doc_id, _ in index.search("旧手机能卖多少钱", "回收", "qa")] == [0]
+    assert index.search("快递什么时候到", "null", "qa") == []
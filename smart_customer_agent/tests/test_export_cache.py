@@ -0,0 +1,21 @@
+import pandas as pd
+
+from src.data_processing.export_cache import load_export
+
+
+def test_nrows_drops_unused_categories(tmp_path):
+    path = tmp_path / "export.csv"
+    pd.DataFrame({
+        "touch_id": [1, 1, 2, 3],
+        "group_name": ["a", "a", "b", "c"],
+        "servicer_name": ["客服1", "客服1", "客服2", "客服3"],
+        "send_content": ["你好", "在吗", "价格", "物流"],
+    }).to_csv(path, index=False)
+    cache_dir = tmp_path / "cache"
+
+    expected = load_export(path, nrows=2, use_cache=False)
+    # 第一次转换并写入缓存，第二次读取缓存
+    for _ in range(2):
+        df = load_export(path, nrows=2, cache_dir=cache_dir)
+        pd.testing.assert_frame_equal(df, expected)
+        assert df["group_name"].value_counts().to_dict() == {"a": 2}
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.api.app as app_module
+from src.api.cache import create_response_cache
+from src.api.llm_client import LLMUnavailableError
+
+QUESTION = {"business_group": "回收", "message": "我的手机能卖多少钱"}
+LLM_ANSWER = "LLM生成的回答"
+
+
+class FlakyLLMClient:
+    """failing 为True时 complete/stream 抛出 LLMUnavailableError，记录调用次数"""
+
+    def __init__(self):
+        self.failing = True
+        self.calls = 0
+
+    async def complete(self, system_prompt, messages):
+        self.calls += 1
+        if self.failing:
+            raise LLMUnavailableError("熔断器打开")
+        return LLM_ANSWER
+
+    async def stream(self, system_prompt, messages):
+        self.calls += 1
+        if self.failing:
+            raise LLMUnavailableError("熔断器打开")
+        yield LLM_ANSWER
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    client = FlakyLLMClient()
+    monkeypatch.setattr(app_module, "llm_client", client)
+    monkeypatch.setattr(app_module, "response_cache", create_response_cache(100, 300))
+    return client
+
+
+def chat(client):
+    return client.post("/api/chat", json=QUESTION).json()["answer"]
+
+
+def chat_batch(client):
+    return client.post("/api/chat/batch", json={"questions": [QUESTION]}).json()["results"][0]["answer"]
+
+
+def chat_stream(client):
+    body = client.post("/api/chat/stream", json=QUESTION).text
+    return "".join(
+        json.loads(line[len("data: "):])["text"]
+        for event in body.split("\n\n") if event.startswith("event: token")
+        for line in event.split("\n") if line.startswith("data: ")
+    )
+
+
+@pytest.mark.parametrize("endpoint", [chat, chat_batch, chat_stream])
+def test_fallback_answer_not_cached(llm, endpoint):
+    client = TestClient(app_module.app)
+
+    answer = endpoint(client)
+    assert answer != LLM_ANSWER
+    assert llm.calls == 1
+    assert app_module.response_cache.stats().get("size", 0) == 0
+
+    # LLM恢复后再次请求应调用LLM，而不是返回缓存的兜底回答
+    llm.failing = False
+    assert endpoint(client) == LLM_ANSWER
+    assert llm.calls == 2
+
+    # 正常回答会被缓存
+    assert endpoint(client) == LLM_ANSWER
+    assert llm.calls == 2
@@ -0,0 +1,47 @@
+import contextlib
+import io
+
+import pytest
+
+import src.data_processing.process_conversation_data as pcd
+from benchmarks.synthetic_export import generate_chat_export, write_chat_export
+from src.data_processing.records import iter_records
+
+
+def run(input_file, output_dir, incremental=False):
+    processor = pcd.ConversationProcessor(str(input_file), str(output_dir), chunk_size=200, incremental=incremental)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        processor.load_data()
+        processor.process_conversations()
+        processor.save_results()
+    return processor
+
+
+def conversation_ids(processor):
+    return sorted(str(conv['metadata']['conversation_id']) for conv in iter_records(processor.conversations_file))
+
+
+def test_interrupted_full_run_forces_full_reprocessing(tmp_path, monkeypatch):
+    input_file = tmp_path / "export.csv"
+    write_chat_export(generate_chat_export(100), str(input_file))
+    expected = conversation_ids(run(input_file, tmp_path / "out"))
+
+    # 第二次全量运行处理到第3批时中断，对话文件只写了一部分
+    original = pcd.process_conversation_batch
+    calls = []
+
+    def interrupted(batch):
+        calls.append(batch)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return original(batch)
+
+    monkeypatch.setattr(pcd, "process_conversation_batch", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run(input_file, tmp_path / "out")
+    monkeypatch.setattr(pcd, "process_conversation_batch", original)
+
+    # 清单已在改写输出前删除，增量运行改为全量处理，不会丢失对话
+    processor = run(input_file, tmp_path / "out", incremental=True)
+    assert processor.changed_ids == set()
+    assert conversation_ids(processor) == expected
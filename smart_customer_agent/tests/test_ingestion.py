@@ -0,0 +1,21 @@
+from openpyxl import Workbook
+
+from src.data_processing.ingestion import iter_chunks, read_table
+
+
+def write_workbook(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def test_excel_nrows(tmp_path):
+    path = tmp_path / "export.xlsx"
+    write_workbook(path, [["touch_id", "send_content"]] + [[i, f"消息{i}"] for i in range(5)])
+
+    assert list(iter_chunks(path, chunk_size=2, nrows=0)) == []
+    assert len(read_table(path, nrows=0)) == 0
+    assert read_table(path, nrows=3, chunk_size=2)["touch_id"].tolist() == [0, 1, 2]
+    assert len(read_table(path)) == 5
@@ -0,0 +1,16 @@
+import pytest
+
+# intent_test/data_preprocessing.py 在模块级导入了matplotlib
+pytest.importorskip("matplotlib")
+
+from benchmarks.bench_preprocessing import STAGES, assert_same_output, generate_rows, run  # noqa: E402
+
+
+@pytest.mark.parametrize("stage", ["extract", "sender", "organize", "enhanced"])
+def test_matches_legacy_implementation(stage):
+    """当前实现与基准测试中保留的原实现在固定的小样本（含边界情况）上输出一致"""
+    legacy, current, prepare = STAGES[stage]
+    sample = generate_rows(400, edge_cases=True, prepare=prepare)
+    expected, _ = run(legacy, sample)
+    actual, _ = run(current, sample)
+    assert_same_output(stage, expected, actual)
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+import src.api.app as app_module
+from src.api.cache import ResponseCache
+
+
+class UnavailableBackend:
+    """模拟连接不上的共享缓存：所有操作都抛出异常"""
+
+    async def get(self, key):
+        raise ConnectionError("连接超时")
+
+    async def set(self, key, value):
+        raise ConnectionError("连接超时")
+
+    def clear(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        raise ConnectionError("连接超时")
+
+
+def test_unavailable_backend_does_not_fail_requests(monkeypatch):
+    monkeypatch.setattr(app_module, "llm_client", None)
+    monkeypatch.setattr(app_module, "response_cache", ResponseCache(UnavailableBackend()))
+    client = TestClient(app_module.app)
+    response = client.post("/api/chat", json={"business_group": "回收", "message": "我的手机能卖多少钱"})
+    assert response.status_code == 200
+    assert client.get("/api/admin/cache").json()["misses"] == 1
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert "response_cache_misses_total 1" in metrics.text
+    assert "response_cache_size" not in metrics.text
@@ -0,0 +1,54 @@
+from src.retrieval.loader import partition_qa_data, to_records
+from src.retrieval.snapshot import read_snapshot, write_snapshot
+
+
+def as_tuples(records):
+    return [(record.question, record.answer, record.intent) for record in records]
+
+
+def round_trip(tmp_path, faqs, qa_data):
+    path = tmp_path / "kb_snapshot.bin"
+    write_snapshot(str(path), faqs, qa_data, fingerprint="fp")
+    snapshot = read_snapshot(str(path), "fp")
+    assert snapshot is not None
+    return snapshot
+
+
+def test_none_business_group_round_trip(tmp_path):
+    qa_data = [
+        {"question": "怎么退款", "answer": "在订单页申请", "intent": "退款", "business_group": None},
+        {"question": "多久到账", "answer": "1-3个工作日", "intent": None, "business_group": "回收"},
+        {"question": "能上门吗", "answer": "部分城市支持", "business_group": None},
+    ]
+    _, qa_groups = round_trip(tmp_path, {}, qa_data)
+
+    expected = partition_qa_data(qa_data)
+    assert list(qa_groups) == list(expected)
+    for group, records in expected.items():
+        assert as_tuples(qa_groups[group]) == as_tuples(records)
+
+
+def test_all_business_groups_none(tmp_path):
+    qa_data = [{"question": "你好", "answer": "您好，请问有什么可以帮您", "business_group": None}]
+    _, qa_groups = round_trip(tmp_path, {}, qa_data)
+    assert list(qa_groups) == [None]
+    assert as_tuples(qa_groups[None]) == [("你好", "您好，请问有什么可以帮您", None)]
+
+
+def test_text_with_nul_round_trip(tmp_path):
+    faqs = {"回收": [
+        {"question": "含\x00NUL的问题", "answer": "\x00", "intent": "其他"},
+        {"question": "", "answer": "空问题"},
+        {"question": "普通问题", "answer": "多行\n回答\x00结尾\x00"},
+    ]}
+    qa_data = [{"question": "a\x00b", "answer": "\x00\x00", "business_group": "回收"}]
+    snap_faqs, qa_groups = round_trip(tmp_path, faqs, qa_data)
+
+    assert as_tuples(snap_faqs["回收"]) == as_tuples(to_records(faqs["回收"]))
+    assert as_tuples(qa_groups["回收"]) == [("a\x00b", "\x00\x00", None)]
+
+
+def test_empty_tables(tmp_path):
+    snap_faqs, qa_groups = round_trip(tmp_path, {"回收": []}, [])
+    assert snap_faqs == {"回收": []}
+    assert qa_groups == {}
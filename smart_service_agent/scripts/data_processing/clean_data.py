@@ -4,24 +4,52 @@
 """
 数据清洗脚本
 功能：对导入的客服对话数据进行清洗和预处理
-用法：python clean_data.py --input <input_json_path> --output <output_json_path> [--report <report_path>]
+用法：python clean_data.py --input <input_json_path> --output <output_json_path> [--report <report_path>] [--workers <n>]
 """
 
 import argparse
 import json
 import os
 import re
+import sys
 import pandas as pd
 from datetime import datetime
 
+# 对话记录的流式读写与智能客服数据处理共用（smart_customer_agent/src/data_processing）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'smart_customer_agent'))
+from src.data_processing.parallel import ParallelMap
+from src.data_processing.records import RecordWriter, iter_records
+
+# 多进程清洗消息内容时，每次读入这么多个对话后统一清洗
+CONVERSATIONS_PER_BLOCK = 2000
+
+# 文本清洗的正则，按 clean_text 中的使用顺序
+HTML_TAG_REGEX = re.compile(r'<[^>]+>')
+IMG_TAG_REGEX = re.compile(r'<img\s+[^>]*src=[\'"]([^\'"]+)[\'"][^>]*>')
+URL_REGEX = re.compile(r'https?://\S+')
+WHITESPACE_REGEX = re.compile(r'\s+')
+CONTROL_CHAR_REGEX = re.compile(r'[\x00-\x1F\x7F]')
+
+# 敏感信息脱敏的正则和替换文本，按顺序依次替换
+SENSITIVE_PATTERNS = [
+    (re.compile(r'1[3-9]\d{9}'), '[手机号]'),
+    (re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'), '[邮箱]'),
+    (re.compile(r'\b\d{17}[\dXx]\b'), '[身份证号]'),
+    (re.compile(r'\b\d{16,19}\b'), '[银行卡号]'),
+    (re.compile(r'\b(\d{4})\d{12,16}\b'), r'\1[订单号]'),
+    (re.compile(r'[省市区县].*?[路街道].*?号'), '[地址]'),
+]
+
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='对客服对话数据进行清洗和预处理')
-    parser.add_argument('--input', required=True, help='输入JSON文件路径')
-    parser.add_argument('--output', required=True, help='输出JSON文件路径')
+    parser.add_argument('--input', required=True, help='输入JSON文件路径，也可以是.jsonl或.jsonl.zst')
+    parser.add_argument('--output', required=True, help='输出JSON文件路径，以.jsonl或.jsonl.zst结尾时写成JSON Lines')
     parser.add_argument('--report', help='清洗报告输出路径')
     parser.add_argument('--verbose', action='store_true', help='显示详细日志')
+    parser.add_argument('--workers', type=int, default=1, help='清洗消息内容的进程数，大于1时按块在多个进程中清洗')
     return parser.parse_args()
 
 
@@ -39,19 +67,19 @@ def clean_text(text):
         return ""
     
     # 移除HTML标签（增强版）
-    text = re.sub(r'<[^>]+>', '', text)
+    text = HTML_TAG_REGEX.sub('', text)
     
     # 移除图片标签
-    text = re.sub(r'<img\s+[^>]*src=[\'"]([^\'"]+)[\'"][^>]*>', '[图片]', text)
+    text = IMG_TAG_REGEX.sub('[图片]', text)
     
     # 移除URL
-    text = re.sub(r'https?://\S+', '[URL]', text)
+    text = URL_REGEX.sub('[URL]', text)
     
     # 移除多余空白字符
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_REGEX.sub(' ', text).strip()
     
     # 移除特殊控制字符
-    text = re.sub(r'[\x00-\x1F\x7F]', '', text)
+    text = CONTROL_CHAR_REGEX.sub('', text)
     
     # 处理常见HTML实体
     text = text.replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"').replace('&nbsp;', ' ')
@@ -72,25 +100,24 @@ def anonymize_sensitive_info(text):
     if not isinstance(text, str):
         return ""
     
-    # 手机号脱敏
-    text = re.sub(r'1[3-9]\d{9}', '[手机号]', text)
-    
-    # 邮箱脱敏
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[邮箱]', text)
-    
-    # 身份证号脱敏
-    text = re.sub(r'\b\d{17}[\dXx]\b', '[身份证号]', text)
-    
-    # 银行卡号脱敏
-    text = re.sub(r'\b\d{16,19}\b', '[银行卡号]', text)
+    # 手机号、邮箱、身份证号、银行卡号、订单号（保留前4位）、地址脱敏
+    for regex, replacement in SENSITIVE_PATTERNS:
+        text = regex.sub(replacement, text)
     
-    # 订单号脱敏（保留前4位）
-    text = re.sub(r'\b(\d{4})\d{12,16}\b', r'\1[订单号]', text)
+    return text
+
+
+def clean_message_content(text):
+    """
+    清洗并脱敏一条消息内容
     
-    # 地址脱敏
-    text = re.sub(r'[省市区县].*?[路街道].*?号', '[地址]', text)
+    参数:
+        text: 原始消息内容
     
-    return text
+    返回:
+        str: 清洗、脱敏后的内容
+    """
+    return anonymize_sensitive_info(clean_text(text))
 
 
 def is_valid_conversation(conversation):
@@ -360,12 +387,13 @@ def enhance_dialog_structure(conversation):
     return enhanced
 
 
-def clean_conversation(conversation):
+def clean_conversation(conversation, clean_contents=True):
     """
     清洗单个对话数据
     
     参数:
         conversation: 原始对话数据
+        clean_contents: 是否清洗消息内容；为False时由调用方之后用 clean_message_contents 批量清洗
     
     返回:
         dict: 清洗后的对话数据
@@ -385,14 +413,11 @@ def clean_conversation(conversation):
     # 增强对话结构
     cleaned = enhance_dialog_structure(cleaned)
     
-    # 清洗消息内容
-    for i, message in enumerate(cleaned['messages']):
-        if 'content' in message and message['content']:
-            # 清洗文本
-            cleaned_content = clean_text(message['content'])
-            # 脱敏处理
-            anonymized_content = anonymize_sensitive_info(cleaned_content)
-            cleaned['messages'][i]['content'] = anonymized_content
+    # 清洗消息内容（清洗文本后脱敏）
+    if clean_contents:
+        for i, message in enumerate(cleaned['messages']):
+            if 'content' in message and message['content']:
+                cleaned['messages'][i]['content'] = clean_message_content(message['content'])
     
     # 添加对话元数据
     cleaned['message_count'] = len(cleaned['messages'])
@@ -411,6 +436,21 @@ def clean_conversation(conversation):
     return cleaned
 
 
+def clean_message_contents(conversations, mapper):
+    """
+    批量清洗多个对话的消息内容，结果与逐个对话 clean_conversation 时相同
+    
+    参数:
+        conversations: clean_conversation(..., clean_contents=False) 得到的对话列表，原地修改
+        mapper: ParallelMap，在其进程池中按块清洗
+    """
+    messages = [message for conversation in conversations for message in conversation['messages']
+                if 'content' in message and message['content']]
+    contents = mapper.map(clean_message_content, [message['content'] for message in messages])
+    for message, content in zip(messages, contents):
+        message['content'] = content
+
+
 def generate_cleaning_report(original_conversations, cleaned_conversations, report_path):
     """
     生成数据清洗报告
@@ -532,51 +572,75 @@ def generate_cleaning_report(original_conversations, cleaned_conversations, repo
         f.write(md_report)
 
 
-def clean_data(input_path, output_path, report_path=None, verbose=False):
+def clean_data(input_path, output_path, report_path=None, verbose=False, workers=1):
     """
     清洗对话数据
     
+    逐个读取、清洗并写出对话；输入输出均为 JSON Lines 时内存中只保留当前对话
+    （多进程时为当前一块 CONVERSATIONS_PER_BLOCK 个对话）。
+    需要生成清洗报告时会保留原始和清洗后的对话用于统计。
+    
     参数:
-        input_path: 输入JSON文件路径
-        output_path: 输出JSON文件路径
+        input_path: 输入JSON文件路径（.json、.jsonl或.jsonl.zst）
+        output_path: 输出JSON文件路径，以.jsonl或.jsonl.zst结尾时每行一个对话
         report_path: 清洗报告输出路径
         verbose: 是否显示详细日志
+        workers: 清洗消息内容的进程数，大于1时每块对话的消息内容在多个进程中清洗，输出与单进程相同
     
     返回:
         bool: 清洗是否成功
     """
     try:
         print(f"开始读取JSON文件: {input_path}")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
         
-        print(f"读取完成，共{len(conversations)}个对话")
-        
-        # 保存原始对话数据（用于生成报告）
-        original_conversations = conversations.copy()
-        
-        # 过滤有效对话
-        valid_conversations = [conv for conv in conversations if is_valid_conversation(conv)]
-        print(f"有效对话数: {len(valid_conversations)}")
+        # 创建目标目录（如果不存在）
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
         
-        # 清洗对话数据
+        # 保存原始和清洗后的对话数据（用于生成报告）
+        original_conversations = []
         cleaned_conversations = []
-        for i, conv in enumerate(valid_conversations):
-            if verbose and i % 100 == 0:
-                print(f"正在处理第{i+1}/{len(valid_conversations)}个对话...")
-            
-            cleaned = clean_conversation(conv)
-            cleaned_conversations.append(cleaned)
+        total = 0
+        valid = 0
+        # 多进程时先清洗对话结构，攒够一块后统一清洗消息内容再写出
+        block = []
         
-        print(f"清洗完成，共处理{len(cleaned_conversations)}个对话")
-        
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # 写入JSON文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_conversations, f, ensure_ascii=False, indent=2)
+        with RecordWriter(output_path) as writer, ParallelMap(workers, warmup=(clean_message_content,)) as mapper:
+            def flush():
+                clean_message_contents(block, mapper)
+                writer.write_all(block)
+                if report_path:
+                    cleaned_conversations.extend(block)
+                block.clear()
+            
+            for conv in iter_records(input_path):
+                total += 1
+                if report_path:
+                    original_conversations.append(conv)
+                
+                # 过滤有效对话
+                if not is_valid_conversation(conv):
+                    continue
+                
+                if verbose and valid % 100 == 0:
+                    print(f"正在处理第{valid+1}个有效对话...")
+                valid += 1
+                
+                # 清洗对话数据，单进程时清洗完立即写出
+                if workers > 1:
+                    block.append(clean_conversation(conv, clean_contents=False))
+                    if len(block) >= CONVERSATIONS_PER_BLOCK:
+                        flush()
+                    continue
+                cleaned = clean_conversation(conv)
+                writer.write(cleaned)
+                if report_path:
+                    cleaned_conversations.append(cleaned)
+            if block:
+                flush()
         
+        print(f"读取完成，共{total}个对话")
+        print(f"有效对话数: {writer.count}")
+        print(f"清洗完成，共处理{writer.count}个对话")
         print(f"数据已保存到: {output_path}")
         
         # 生成清洗报告
@@ -606,7 +670,7 @@ def main():
     start_time = datetime.now()
     print(f"开始时间: {start_time}")
     
-    success = clean_data(args.input, args.output, args.report, args.verbose)
+    success = clean_data(args.input, args.output, args.report, args.verbose, args.workers)
     
     end_time = datetime.now()
     print(f"结束时间: {end_time}")
@@ -13,9 +13,15 @@ import os
 import pandas as pd
 import uuid
 import re
+import sys
 from datetime import datetime
 from collections import defaultdict
 
+# 意图分类引擎与智能客服API共用（smart_customer_agent/src/intent）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'smart_customer_agent'))
+from src.intent.classifier import IntentClassifier
+
 
 def parse_args():
     """解析命令行参数"""
@@ -127,6 +133,96 @@ def extract_entities(content):
     return entities
 
 
+# 用户意图模式
+USER_INTENT_PATTERNS = {
+    "订单查询": {
+        "订单状态查询": [r'订单.*状态', r'订单.*进度', r'什么时候.*发货', r'发货了吗'],
+        "订单详情查询": [r'订单.*详情', r'订单.*信息', r'查.*订单'],
+        "订单修改": [r'修改.*订单', r'订单.*修改', r'能不能改']
+    },
+    "物流配送": {
+        "物流状态查询": [r'物流.*状态', r'快递.*到哪', r'发货.*了吗', r'什么时候.*到'],
+        "物流信息修改": [r'修改.*地址', r'地址.*修改', r'换.*地方'],
+        "物流问题反馈": [r'快递.*问题', r'物流.*慢', r'没.*收到']
+    },
+    "价格咨询": {
+        "价格查询": [r'多少钱', r'价格.*是', r'报价', r'费用'],
+        "价格异议": [r'价格.*高', r'能便宜', r'优惠', r'降价'],
+        "价格说明": [r'为什么.*这么贵', r'价格.*包含', r'价格.*区别']
+    },
+    "验货检测": {
+        "检测流程": [r'怎么检测', r'检测.*流程', r'验货.*步骤'],
+        "检测结果": [r'检测.*结果', r'验货.*情况', r'检测.*出来'],
+        "检测标准": [r'检测.*标准', r'怎么判断', r'验货.*依据']
+    },
+    "支付结算": {
+        "支付方式": [r'怎么付款', r'支付方式', r'付款.*方式'],
+        "支付问题": [r'付款.*失败', r'支付.*问题', r'没.*扣款'],
+        "退款咨询": [r'退款', r'钱.*退', r'返.*钱']
+    },
+    "账号问题": {
+        "登录问题": [r'登录.*不了', r'账号.*登录', r'密码.*忘'],
+        "注册问题": [r'怎么注册', r'注册.*不了', r'账号.*注册'],
+        "账号安全": [r'账号.*安全', r'修改.*密码', r'账号.*异常']
+    },
+    "信息提供": {
+        "订单号提供": [r'\d{16,19}'],
+        "联系方式提供": [r'1[3-9]\d{9}'],
+        "地址提供": [r'省.*市.*区.*路']
+    },
+    "问候": {
+        "开场问候": [r'^你好', r'^您好', r'^hi', r'^hello'],
+        "结束感谢": [r'谢谢', r'感谢', r'多谢', r'thank']
+    }
+}
+
+
+# 客服意图模式
+AGENT_INTENT_PATTERNS = {
+    "信息获取": {
+        "订单号获取": [r'订单号.*是', r'请.*提供.*订单'],
+        "联系方式获取": [r'电话.*是', r'请.*提供.*联系方式'],
+        "地址获取": [r'地址.*是', r'请.*提供.*地址']
+    },
+    "信息确认": {
+        "订单确认": [r'确认.*订单', r'这个订单', r'订单.*是'],
+        "信息核对": [r'核对.*信息', r'确认.*信息', r'信息.*正确']
+    },
+    "问题解答": {
+        "状态说明": [r'订单.*状态.*是', r'物流.*状态.*是'],
+        "流程解释": [r'流程.*是', r'步骤.*是', r'需要.*操作'],
+        "政策说明": [r'政策.*是', r'规定.*是', r'要求.*是']
+    },
+    "服务提供": {
+        "帮助提供": [r'帮您.*查', r'为您.*处理', r'给您.*解决'],
+        "建议提供": [r'建议您', r'可以.*尝试', r'推荐您']
+    },
+    "情感回应": {
+        "道歉": [r'抱歉', r'对不起', r'很遗憾'],
+        "安抚": [r'理解.*您', r'请.*不要着急', r'请.*放心'],
+        "感谢": [r'感谢.*您', r'谢谢.*您', r'非常感谢']
+    },
+    "问候": {
+        "开场问候": [r'^您好', r'^你好', r'^亲', r'^欢迎'],
+        "结束问候": [r'祝.*愉快', r'感谢.*咨询', r'还有.*问题']
+    }
+}
+
+
+def build_intent_classifier(intent_patterns):
+    """把 {一级意图: {二级意图: [正则, ...]}} 编译为分类器，结果为 (一级意图, 二级意图)"""
+    return IntentClassifier(
+        [((category, subcategory), patterns)
+         for category, subcategories in intent_patterns.items()
+         for subcategory, patterns in subcategories.items()],
+        flags=re.IGNORECASE
+    )
+
+
+USER_INTENT_CLASSIFIER = build_intent_classifier(USER_INTENT_PATTERNS)
+AGENT_INTENT_CLASSIFIER = build_intent_classifier(AGENT_INTENT_PATTERNS)
+
+
 def detect_intent(content, sender_type):
     """
     检测消息的意图
@@ -138,96 +234,21 @@ def detect_intent(content, sender_type):
     返回:
         dict: 意图信息
     """
-    # 用户意图模式
-    user_intent_patterns = {
-        "订单查询": {
-            "订单状态查询": [r'订单.*状态', r'订单.*进度', r'什么时候.*发货', r'发货了吗'],
-            "订单详情查询": [r'订单.*详情', r'订单.*信息', r'查.*订单'],
-            "订单修改": [r'修改.*订单', r'订单.*修改', r'能不能改']
-        },
-        "物流配送": {
-            "物流状态查询": [r'物流.*状态', r'快递.*到哪', r'发货.*了吗', r'什么时候.*到'],
-            "物流信息修改": [r'修改.*地址', r'地址.*修改', r'换.*地方'],
-            "物流问题反馈": [r'快递.*问题', r'物流.*慢', r'没.*收到']
-        },
-        "价格咨询": {
-            "价格查询": [r'多少钱', r'价格.*是', r'报价', r'费用'],
-            "价格异议": [r'价格.*高', r'能便宜', r'优惠', r'降价'],
-            "价格说明": [r'为什么.*这么贵', r'价格.*包含', r'价格.*区别']
-        },
-        "验货检测": {
-            "检测流程": [r'怎么检测', r'检测.*流程', r'验货.*步骤'],
-            "检测结果": [r'检测.*结果', r'验货.*情况', r'检测.*出来'],
-            "检测标准": [r'检测.*标准', r'怎么判断', r'验货.*依据']
-        },
-        "支付结算": {
-            "支付方式": [r'怎么付款', r'支付方式', r'付款.*方式'],
-            "支付问题": [r'付款.*失败', r'支付.*问题', r'没.*扣款'],
-            "退款咨询": [r'退款', r'钱.*退', r'返.*钱']
-        },
-        "账号问题": {
-            "登录问题": [r'登录.*不了', r'账号.*登录', r'密码.*忘'],
-            "注册问题": [r'怎么注册', r'注册.*不了', r'账号.*注册'],
-            "账号安全": [r'账号.*安全', r'修改.*密码', r'账号.*异常']
-        },
-        "信息提供": {
-            "订单号提供": [r'\d{16,19}'],
-            "联系方式提供": [r'1[3-9]\d{9}'],
-            "地址提供": [r'省.*市.*区.*路']
-        },
-        "问候": {
-            "开场问候": [r'^你好', r'^您好', r'^hi', r'^hello'],
-            "结束感谢": [r'谢谢', r'感谢', r'多谢', r'thank']
-        }
-    }
-    
-    # 客服意图模式
-    agent_intent_patterns = {
-        "信息获取": {
-            "订单号获取": [r'订单号.*是', r'请.*提供.*订单'],
-            "联系方式获取": [r'电话.*是', r'请.*提供.*联系方式'],
-            "地址获取": [r'地址.*是', r'请.*提供.*地址']
-        },
-        "信息确认": {
-            "订单确认": [r'确认.*订单', r'这个订单', r'订单.*是'],
-            "信息核对": [r'核对.*信息', r'确认.*信息', r'信息.*正确']
-        },
-        "问题解答": {
-            "状态说明": [r'订单.*状态.*是', r'物流.*状态.*是'],
-            "流程解释": [r'流程.*是', r'步骤.*是', r'需要.*操作'],
-            "政策说明": [r'政策.*是', r'规定.*是', r'要求.*是']
-        },
-        "服务提供": {
-            "帮助提供": [r'帮您.*查', r'为您.*处理', r'给您.*解决'],
-            "建议提供": [r'建议您', r'可以.*尝试', r'推荐您']
-        },
-        "情感回应": {
-            "道歉": [r'抱歉', r'对不起', r'很遗憾'],
-            "安抚": [r'理解.*您', r'请.*不要着急', r'请.*放心'],
-            "感谢": [r'感谢.*您', r'谢谢.*您', r'非常感谢']
-        },
-        "问候": {
-            "开场问候": [r'^您好', r'^你好', r'^亲', r'^欢迎'],
-            "结束问候": [r'祝.*愉快', r'感谢.*咨询', r'还有.*问题']
-        }
-    }
-    
     # 根据发送者类型选择意图模式
     if sender_type == "user" or sender_type == 1.0 or sender_type == "1.0":
-        intent_patterns = user_intent_patterns
+        classifier = USER_INTENT_CLASSIFIER
     else:
-        intent_patterns = agent_intent_patterns
+        classifier = AGENT_INTENT_CLASSIFIER
     
     # 检测意图
-    for category, subcategories in intent_patterns.items():
-        for subcategory, patterns in subcategories.items():
-            for pattern in patterns:
-                if re.search(pattern, content, re.IGNORECASE):
-                    return {
-                        "category": category,
-                        "subcategory": subcategory,
-                        "confidence": 0.85  # 简单起见，使用固定置信度
-                    }
+    matched = classifier.classify(content)
+    if matched is not None:
+        category, subcategory = matched
+        return {
+            "category": category,
+            "subcategory": subcategory,
+            "confidence": 0.85  # 简单起见，使用固定置信度
+        }
     
     # 默认意图
     return {
@@ -12,17 +12,23 @@ import json
 import os
 import random
 import re
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 from collections import Counter
 
+# 对话记录的流式读写与智能客服数据处理共用（smart_customer_agent/src/data_processing）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'smart_customer_agent'))
+from src.data_processing.records import iter_records
+
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='对清洗后的客服对话数据进行质量评估')
-    parser.add_argument('--input', required=True, help='输入清洗后的JSON文件路径')
+    parser.add_argument('--input', required=True, help='输入清洗后的JSON文件路径，也可以是.jsonl或.jsonl.zst')
     parser.add_argument('--output', required=True, help='质量评估报告输出路径')
     parser.add_argument('--sample', type=int, default=100, help='抽样检查的对话数量，默认100')
     parser.add_argument('--visualize', action='store_true', help='是否生成可视化图表')
@@ -30,11 +36,9 @@ def parse_args():
 
 
 def load_data(input_path):
-    """加载清洗后的数据"""
+    """加载清洗后的数据，支持.json、.jsonl和.jsonl.zst（JSON Lines逐行解析，不需要先把整个文件读成字符串）"""
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
+        return list(iter_records(input_path))
     except Exception as e:
         print(f"加载数据时出错: {e}")
         return None
@@ -11,12 +11,18 @@ import argparse
 import json
 import os
 import re
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 from collections import Counter
 
+# 聊天导出读取与智能客服共用（smart_customer_agent/src/data_processing），源文件内容不变时直接读列式缓存
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'smart_customer_agent'))
+from src.data_processing.export_cache import load_export
+
 
 def parse_args():
     """解析命令行参数"""
@@ -42,7 +48,7 @@ def load_data(file_path, sample_size=10000):
     print(f"样本大小: {sample_size}")
     
     try:
-        df = pd.read_excel(file_path, nrows=sample_size)
+        df = load_export(file_path, nrows=sample_size)
         print(f"成功加载 {len(df)} 行数据")
         return df
     except Exception as e:
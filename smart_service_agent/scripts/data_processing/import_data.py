@@ -8,92 +8,116 @@
 """
 
 import argparse
-import json
 import os
+import sys
 import pandas as pd
 from datetime import datetime
 
+# 分块流式读取聊天导出与智能客服数据处理共用（smart_customer_agent/src/data_processing）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'smart_customer_agent'))
+from src.data_processing.ingestion import UnsortedInputError, iter_conversations
+from src.data_processing.records import RecordWriter
+
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='导入Excel格式的客服对话数据并转换为JSON格式')
     parser.add_argument('--source', required=True, help='源Excel文件路径')
-    parser.add_argument('--target', required=True, help='目标JSON文件路径')
+    parser.add_argument('--target', required=True, help='目标JSON文件路径，以.jsonl或.jsonl.zst结尾时写成JSON Lines')
     parser.add_argument('--limit', type=int, default=None, help='限制导入的行数，默认全部导入')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='每次读取的行数')
     return parser.parse_args()
 
 
-def excel_to_json(excel_path, json_path, limit=None):
+def convert_dates(df):
+    """把日期时间列转换为字符串"""
+    date_columns = ['user_start_time', 'user_end_time', 'create_time', 'send_time']
+    for col in date_columns:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col]).astype(str)
+    return df
+
+
+def build_conversation(touch_id, group):
+    """把一个对话的消息行组织为对话字典，消息按序号排序"""
+    records = group.to_dict(orient='records')
+    first = records[0]
+    conversation = {
+        'touch_id': first['touch_id'],
+        'user_name': first.get('user_name', ''),
+        'servicer_name': first.get('servicer_name', ''),
+        'group_name': first.get('group_name', ''),
+        'start_time': first.get('user_start_time', ''),
+        'end_time': first.get('user_end_time', ''),
+        'create_time': first.get('create_time', ''),
+        'messages': []
+    }
+    for record in records:
+        conversation['messages'].append({
+            'seq_no': record.get('seq_no', 0),
+            'send_time': record.get('send_time', ''),
+            'sender_type': record.get('sender_type', ''),
+            'content': record.get('send_content', '')
+        })
+    conversation['messages'].sort(key=lambda x: x['seq_no'])
+    return conversation
+
+
+def write_conversations(conversations, json_path):
+    """逐个写出对话，不需要在内存中保留全部对话
+    
+    路径以 .jsonl / .jsonl.zst 结尾时写成 JSON Lines，其余输出与 json.dump(列表, indent=2) 相同。
+    
+    返回:
+        (对话数, 消息行数)
+    """
+    rows = 0
+    with RecordWriter(json_path) as writer:
+        for conversation in conversations:
+            writer.write(conversation)
+            rows += len(conversation['messages'])
+    return writer.count, rows
+
+
+def excel_to_json(excel_path, json_path, limit=None, chunk_size=100000):
     """
     将Excel文件转换为JSON格式
     
+    按块流式读取，导出文件中同一对话的消息连续排列时，内存中只保留当前数据块和未结束的对话；
+    同一对话的消息不连续时自动改为读完整个文件后再分组。
+    
     参数:
-        excel_path (str): Excel文件路径
-        json_path (str): 输出JSON文件路径
+        excel_path (str): Excel或CSV文件路径
+        json_path (str): 输出JSON文件路径，以.jsonl或.jsonl.zst结尾时每行一个对话
         limit (int, optional): 限制读取的行数，用于测试
+        chunk_size (int): 每次读取的行数
     
     返回:
         bool: 转换是否成功
     """
     try:
         print(f"开始读取Excel文件: {excel_path}")
-        # 读取Excel文件
         if limit:
-            df = pd.read_excel(excel_path, nrows=limit)
             print(f"已限制读取前{limit}行数据")
-        else:
-            df = pd.read_excel(excel_path)
         
-        # 检查数据基本情况
-        total_rows = len(df)
-        unique_conversations = df['touch_id'].nunique()
-        print(f"总行数: {total_rows}")
-        print(f"唯一对话数: {unique_conversations}")
-        
-        # 检查并处理日期时间列
-        date_columns = ['user_start_time', 'user_end_time', 'create_time', 'send_time']
-        for col in date_columns:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col]).astype(str)
-        
-        # 将DataFrame转换为字典列表
-        records = df.to_dict(orient='records')
-        
-        # 按对话ID组织数据
-        conversations = {}
-        for record in records:
-            touch_id = record['touch_id']
-            if touch_id not in conversations:
-                conversations[touch_id] = {
-                    'touch_id': touch_id,
-                    'user_name': record.get('user_name', ''),
-                    'servicer_name': record.get('servicer_name', ''),
-                    'group_name': record.get('group_name', ''),
-                    'start_time': record.get('user_start_time', ''),
-                    'end_time': record.get('user_end_time', ''),
-                    'create_time': record.get('create_time', ''),
-                    'messages': []
-                }
-            
-            # 添加消息
-            message = {
-                'seq_no': record.get('seq_no', 0),
-                'send_time': record.get('send_time', ''),
-                'sender_type': record.get('sender_type', ''),
-                'content': record.get('send_content', '')
-            }
-            conversations[touch_id]['messages'].append(message)
+        # 创建目标目录（如果不存在）
+        os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
         
-        # 将对话按照消息序号排序
-        for touch_id, conversation in conversations.items():
-            conversation['messages'].sort(key=lambda x: x['seq_no'])
+        def conversations(assume_sorted):
+            for touch_id, group in iter_conversations(excel_path, chunk_size=chunk_size, nrows=limit,
+                                                      assume_sorted=assume_sorted, transform=convert_dates):
+                yield build_conversation(touch_id, group)
         
-        # 创建目标目录（如果不存在）
-        os.makedirs(os.path.dirname(json_path), exist_ok=True)
+        try:
+            unique_conversations, total_rows = write_conversations(conversations(True), json_path)
+        except UnsortedInputError as e:
+            print(f"{e}，改为读取整个文件后再分组")
+            unique_conversations, total_rows = write_conversations(conversations(False), json_path)
         
-        # 写入JSON文件
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(list(conversations.values()), f, ensure_ascii=False, indent=2)
+        # 检查数据基本情况
+        print(f"总行数: {total_rows}")
+        print(f"唯一对话数: {unique_conversations}")
         
         print(f"转换完成，共处理{unique_conversations}个对话，已保存到: {json_path}")
         return True
@@ -116,7 +140,7 @@ def main():
     start_time = datetime.now()
     print(f"开始时间: {start_time}")
     
-    success = excel_to_json(args.source, args.target, args.limit)
+    success = excel_to_json(args.source, args.target, args.limit, args.chunk_size)
     
     end_time = datetime.now()
     print(f"结束时间: {end_time}")
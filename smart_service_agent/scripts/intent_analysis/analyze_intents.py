@@ -10,6 +10,7 @@
 import argparse
 import json
 import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -19,13 +20,19 @@ import jieba.analyse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 from datetime import datetime
+from itertools import islice
 import re
 
+# 对话记录的流式读写与智能客服数据处理共用（smart_customer_agent/src/data_processing）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'smart_customer_agent'))
+from src.data_processing.records import iter_records
+
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='分析对话数据，提取常见用户问题和意图')
-    parser.add_argument('--input', required=True, help='输入JSON文件路径')
+    parser.add_argument('--input', required=True, help='输入JSON文件路径，也可以是.jsonl或.jsonl.zst')
     parser.add_argument('--output', required=True, help='输出目录路径')
     parser.add_argument('--limit', type=int, default=None, help='限制处理的对话数量，用于测试')
     parser.add_argument('--interactive', action='store_true', help='是否启用交互式模式')
@@ -36,6 +43,8 @@ def load_data(input_path, limit=None):
     """
     加载优化结构的对话数据
     
+    JSON Lines输入（.jsonl / .jsonl.zst）逐行读取，设置limit时读够limit个对话即停止。
+    
     参数:
         input_path: 输入JSON文件路径
         limit: 限制处理的对话数量
@@ -44,13 +53,11 @@ def load_data(input_path, limit=None):
         list: 对话列表
     """
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
+        conversations = list(islice(iter_records(input_path), limit or None))
         
         print(f"成功加载 {len(conversations)} 个对话")
         
-        if limit and limit < len(conversations):
-            conversations = conversations[:limit]
+        if limit and len(conversations) == limit:
             print(f"已限制处理前 {limit} 个对话")
         
         return conversations